@@ -1,18 +1,17 @@
 # src/main.py
 import argparse
-from src.graph.datadog_error_monitoring import dd_error_workflow, AnalysisState
-from pydantic import BaseModel, Field
-from typing import List, Optional
-from src.models.error_analysis_state import ErrorAnalysisOutput
-import questionary
+import asyncio
+import contextlib
+import json
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+from src.config import coalescing_config
+from src.models.error_analysis_state import ErrorAnalysisOutput, ErrorQuery
+from src.tools.single_flight import SingleFlight, incident_signature
 
-
-class ErrorQuery(BaseModel):
-    code: str = Field(..., description="Incoming Error Code")
-    message: str = Field(..., description="Incoming Error Message")
-    stack_trace: Optional[str] = Field(..., description="Incoming Stack Trace")
-    service: Optional[str] = Field(..., description="Incoming Service Name")
-    trace_id: Optional[str] = Field(..., description="Incoming Trace ID for Datadog Logs")
+# The workflow (langgraph, langchain, the Datadog SDK) is imported inside the
+# functions that run it, so `--help` and argument errors return immediately.
 
 
 def process_error(error_query: ErrorQuery):
@@ -22,25 +21,181 @@ def process_error(error_query: ErrorQuery):
     Args:
         error_query (ErrorQuery): The input query regarding an error or issue.
     """
+    from src.graph.datadog_error_monitoring import dd_error_workflow, initial_state
 
-    # Initialize state
-    initial_state = AnalysisState(error_code=error_query.code,
-                                  error_message=error_query.message,
-                                  stack_trace=error_query.stack_trace if error_query.stack_trace is not None else None,
-                                  trace_id=error_query.trace_id if error_query.trace_id is not None else None,
-                                  service=error_query.service if error_query.service is not None else None)
-
-    # Run the workflow
-    final_state = dd_error_workflow.invoke(initial_state)
+    # Run the workflow, printing the analysis fields as the LLM completes them
+    started = time.perf_counter()
+    final_state = {}
+    for mode, chunk in dd_error_workflow.stream(initial_state(error_query), stream_mode=["custom", "values"]):
+        if mode == "values":
+            final_state = chunk
+        elif chunk["field"] == "analysis":
+            print(f"Analysis: {chunk['text']}")
+        elif chunk["field"] == "possible_causes":
+            print(f"Possible cause: {chunk['text']}")
+        elif chunk["field"] == "recommendations":
+            print(f"Recommendation: {chunk['text']}")
+    total_ms = (time.perf_counter() - started) * 1000
 
-    # Output the analysis
+    # Output the full analysis
     print("Error Analysis and Suggested Resolutions:")
     print(final_state.get("analysis_output"))
 
+    # Output per-node timings so the parallel gather branches can be compared to the total
+    print(f"Workflow timings (ms, total {total_ms:.0f}):")
+    for node, elapsed_ms in final_state.get("node_timings", {}).items():
+        print(f"  {node}: {elapsed_ms:.0f}")
+
+
+def read_records(stream: TextIO) -> Iterator[Tuple[int, str]]:
+    """Yield (line number, raw line) for each non-blank line of a JSONL stream."""
+    for line_number, line in enumerate(stream, 1):
+        if line.strip():
+            yield line_number, line
+
+
+async def analyze_record(line_number: int, line: str, single_flight: Optional[SingleFlight] = None) -> Dict[str, Any]:
+    """
+    Analyze one JSONL record and return its result line.
+
+    The record's "id" is echoed back (the line number is used when it has none).
+    Failures are reported in the result instead of raised, so one bad record
+    never stops a batch. That includes analyses the workflow turned into its
+    placeholder failure output. With `single_flight`, records of the same error
+    share one analysis; failed ones are not cached for later records.
+    """
+    from src.graph.datadog_error_monitoring import dd_error_workflow, initial_state
+    from src.tools.error_analysis import analysis_failure_message
+    record_id: Any = line_number
+    started = time.perf_counter()
+
+    async def analyze(error_query: ErrorQuery) -> ErrorAnalysisOutput:
+        final_state = await dd_error_workflow.ainvoke(initial_state(error_query))
+        analysis_output = final_state.get("analysis_output")
+        if analysis_output is None:
+            raise RuntimeError("Workflow produced no analysis")
+        failure = analysis_failure_message(analysis_output)
+        if failure is not None:
+            raise RuntimeError(f"Analysis failed: {failure}")
+        return analysis_output
+
+    try:
+        record = json.loads(line)
+        record_id = record.get("id", line_number)
+        error_query = ErrorQuery(**record)
+        if single_flight is None:
+            analysis_output = await analyze(error_query)
+        else:
+            analysis_output = await single_flight.run(
+                incident_signature(error_query.code, error_query.message, error_query.service),
+                lambda: analyze(error_query)
+            )
+        return {
+            "id": record_id,
+            "status": "ok",
+            "analysis": analysis_output.model_dump(),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+    except Exception as e:
+        print(f"Error processing record {record_id}: {e}", file=sys.stderr)
+        return {
+            "id": record_id,
+            "status": "error",
+            "error": str(e),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+
+async def process_batch(records: Iterator[Tuple[int, str]], output: TextIO, workers: int = 4) -> Dict[str, int]:
+    """
+    Run records through the workflow with up to `workers` analyses in flight.
+
+    Results are written to `output` as JSONL in completion order, flushed as
+    each one finishes. Input is read lazily, so arbitrarily large files only
+    hold `workers` records in memory. Repeats of the same error (code,
+    normalized message, service) are coalesced into one analysis.
+    """
+    counts = {"ok": 0, "error": 0}
+    pending = set()
+    single_flight = (SingleFlight(coalescing_config.ttl_seconds, coalescing_config.max_entries)
+                     if coalescing_config.enabled else None)
+
+    def write(tasks) -> None:
+        for task in tasks:
+            result = task.result()
+            counts[result["status"]] += 1
+            output.write(json.dumps(result) + "\n")
+        output.flush()
+
+    try:
+        for line_number, line in records:
+            if len(pending) >= workers:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                write(done)
+            pending.add(asyncio.create_task(analyze_record(line_number, line, single_flight)))
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            write(done)
+    finally:
+        from src.tools.datadog_integration import get_datadog_fetcher
+        await get_datadog_fetcher().aclose()
+
+    return counts
+
+
+def run_batch(input_path: str, output_path: str, workers: int) -> None:
+    """Analyze every ErrorQuery in a JSONL file ("-" for stdin) into a JSONL results file ("-" for stdout)."""
+    input_stream = sys.stdin if input_path == "-" else open(input_path, "r")
+    output_stream = sys.stdout if output_path == "-" else open(output_path, "w")
+    started = time.perf_counter()
+    try:
+        # The tools report problems with print(); keep them out of JSONL written to stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            counts = asyncio.run(process_batch(read_records(input_stream), output_stream, workers))
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        if output_stream is not sys.stdout:
+            output_stream.close()
+
+    from src.tools.error_analysis import get_llm_cache, parse_stats
+    llm_cache = get_llm_cache()
+    elapsed = time.perf_counter() - started
+    total = counts["ok"] + counts["error"]
+    print(f"Analyzed {total} records ({counts['error']} failed) in {elapsed:.1f}s "
+          f"({total / elapsed if elapsed else 0:.2f} records/s)", file=sys.stderr)
+    if llm_cache is not None:
+        cache_stats = llm_cache.stats()
+        print(f"LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+              f"({cache_stats['hit_ratio']:.0%} hit ratio)", file=sys.stderr)
+    parse = parse_stats.stats()
+    print(f"Structured output: {parse['valid']} valid, {parse['repaired']} repaired locally, "
+          f"{parse['llm_repaired']} repaired by the LLM, {parse['failed']} unstructured "
+          f"({parse['parse_failure_rate']:.0%} parse-failure rate)", file=sys.stderr)
+
 
 if __name__ == "__main__":
-    
+    parser = argparse.ArgumentParser(description="Analyze errors and suggest resolutions")
+    parser.add_argument("--batch", metavar="PATH",
+                        help="JSONL file of ErrorQuery records (code, message, stack_trace, service, trace_id "
+                             "and an optional id) to analyze; '-' reads stdin")
+    parser.add_argument("--output", default="-", metavar="PATH", help="JSONL results file for --batch ('-' for stdout)")
+    parser.add_argument("--workers", type=int, default=4, help="Analyses run concurrently in --batch mode")
+    parser.add_argument("--serve", action="store_true",
+                        help="Run the resident HTTP analysis service (configured by ANALYSIS_SERVICE_* env vars)")
+    args = parser.parse_args()
+
+    if args.serve:
+        from src.service.analysis_service import run_service
+        run_service()
+        sys.exit(0)
+
+    if args.batch:
+        run_batch(args.batch, args.output, args.workers)
+        sys.exit(0)
 
+    import questionary  # For the interactive prompts below
     # error_code = questionary.text("Please enter the error code:").ask()
     # error_message = questionary.text("Please enter the error message:").ask()
     # stack_trace = questionary.text("Please enter the stack trace (optional):", default="").ask()
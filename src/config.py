@@ -1,16 +1,215 @@
-from datadog_api_client import Configuration
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import os
 from dotenv import load_dotenv
 
+from src.tools.lazy import lazy_singleton
+
 load_dotenv()
 
-# Datadog Configuration
-datadog_config = Configuration(
-    api_key={
-        'apiKeyAuth': os.getenv('DATADOG_API_KEY'),  # Datadog API key from env
-        'appKeyAuth': os.getenv('DATADOG_APP_KEY')   # Datadog application key from env
-    }
+# Datadog Configuration (built on first use: importing datadog_api_client is slow)
+@lazy_singleton
+def get_datadog_config():
+    from datadog_api_client import Configuration
+    return Configuration(
+        api_key={
+            'apiKeyAuth': os.getenv('DATADOG_API_KEY'),  # Datadog API key from env
+            'appKeyAuth': os.getenv('DATADOG_APP_KEY')   # Datadog application key from env
+        }
+    )
+
+# Datadog Fetch Configuration
+class DatadogFetchConfig(BaseModel):
+    """Tuning for paginated Datadog log retrieval and the pooled API client."""
+    page_size: int = 1000  # Datadog caps list_logs pages at 1000 entries
+    pool_size: int = 8     # Max pooled HTTP connections kept open to Datadog
+    keep_alive: bool = True  # Enable TCP keep-alive on pooled connections
+    summary_top: int = 10        # Values listed per facet (service, error type, code) in error summaries
+    summary_interval: str = "1h"  # Time bucket width of the error count timeline in error summaries
+    ingest_lag_seconds: float = 300  # Incremental ingest re-scans this far behind its watermark for late-indexed logs
+
+datadog_fetch_config = DatadogFetchConfig(
+    page_size=int(os.getenv('DATADOG_PAGE_SIZE', '1000')),
+    pool_size=int(os.getenv('DATADOG_POOL_SIZE', '8')),
+    keep_alive=os.getenv('DATADOG_KEEP_ALIVE', 'true').lower() == 'true',
+    summary_top=int(os.getenv('DATADOG_SUMMARY_TOP', '10')),
+    summary_interval=os.getenv('DATADOG_SUMMARY_INTERVAL', '1h'),
+    ingest_lag_seconds=float(os.getenv('DATADOG_INGEST_LAG_SECONDS', '300'))
+)
+
+# Trace Log Cache Configuration
+class TraceLogCacheConfig(BaseModel):
+    """Cache of trace id -> logs in DatadogLogFetcher, refreshed by querying only the uncovered time range."""
+    enabled: bool = True
+    refresh_seconds: float = 60    # Serve cached logs without querying Datadog for this long after a fetch
+    ttl_seconds: float = 3600      # Drop a trace this long after its last fetch (a later request refetches it all)
+    lag_seconds: float = 300       # Delta refreshes re-query this far back for logs Datadog indexes late
+    max_entries: int = 512         # LRU-evicted beyond this many traces
+    persist: bool = False          # Also keep entries in a SQLite file under the local state dir
+
+trace_log_cache_config = TraceLogCacheConfig(
+    enabled=os.getenv('TRACE_LOG_CACHE_ENABLED', 'true').lower() == 'true',
+    refresh_seconds=float(os.getenv('TRACE_LOG_CACHE_REFRESH_SECONDS', '60')),
+    ttl_seconds=float(os.getenv('TRACE_LOG_CACHE_TTL_SECONDS', '3600')),
+    lag_seconds=float(os.getenv('TRACE_LOG_CACHE_LAG_SECONDS', '300')),
+    max_entries=int(os.getenv('TRACE_LOG_CACHE_MAX_ENTRIES', '512')),
+    persist=os.getenv('TRACE_LOG_CACHE_PERSIST', 'false').lower() == 'true'
+)
+
+# Local State Configuration
+class LocalStateConfig(BaseModel):
+    """Location of local state files (ingest watermarks, caches, indexes)."""
+    state_dir: str = ".ai_oncall"
+
+local_state_config = LocalStateConfig(
+    state_dir=os.getenv('AI_ONCALL_STATE_DIR', '.ai_oncall')
+)
+
+# Vector Store Configuration
+class VectorStoreConfig(BaseModel):
+    """Which vector backend and embedding model VectorStore uses."""
+    backend: str = "pinecone"             # "pinecone" (remote) or "local" (in-process NumPy index)
+    local_path: str = ".ai_oncall/vector_index"
+    embedding_provider: str = "pinecone"  # "pinecone" or "ollama" (fully offline with the local backend)
+    embedding_model: str = "multilingual-e5-large"
+    # One vector per error fingerprint instead of per occurrence. This changes every vector id, so
+    # only enable it for a new (or emptied) index and re-ingest; existing vectors are not migrated.
+    fingerprinting: bool = False
+
+vector_store_config = VectorStoreConfig(
+    backend=os.getenv('VECTOR_BACKEND', 'pinecone'),
+    local_path=os.getenv('VECTOR_LOCAL_PATH', os.path.join(local_state_config.state_dir, 'vector_index')),
+    embedding_provider=os.getenv('EMBEDDING_PROVIDER', 'pinecone'),
+    embedding_model=os.getenv('EMBEDDING_MODEL', 'multilingual-e5-large'),
+    fingerprinting=os.getenv('ERROR_FINGERPRINTING', 'false').lower() == 'true'
+)
+
+# Hybrid Search Configuration
+class HybridSearchConfig(BaseModel):
+    """Fusion of dense and BM25 keyword results in VectorStore.hybrid_search."""
+    keyword_enabled: bool = True
+    dense_weight: float = 1.0
+    keyword_weight: float = 1.0
+    rrf_k: int = 60                # Reciprocal rank fusion damping constant
+    candidate_multiplier: int = 4  # Each retriever returns k * multiplier candidates before fusion
+
+hybrid_search_config = HybridSearchConfig(
+    keyword_enabled=os.getenv('HYBRID_KEYWORD_ENABLED', 'true').lower() == 'true',
+    dense_weight=float(os.getenv('HYBRID_DENSE_WEIGHT', '1.0')),
+    keyword_weight=float(os.getenv('HYBRID_KEYWORD_WEIGHT', '1.0'))
+)
+
+# Search Result Cache Configuration
+class QueryCacheConfig(BaseModel):
+    """TTL + LRU cache of hybrid_search results keyed by normalized error signature."""
+    enabled: bool = True
+    ttl_seconds: float = 300
+    max_entries: int = 1024
+
+query_cache_config = QueryCacheConfig(
+    enabled=os.getenv('QUERY_CACHE_ENABLED', 'true').lower() == 'true',
+    ttl_seconds=float(os.getenv('QUERY_CACHE_TTL_SECONDS', '300')),
+    max_entries=int(os.getenv('QUERY_CACHE_MAX_ENTRIES', '1024'))
+)
+
+# Request Coalescing Configuration
+class CoalescingConfig(BaseModel):
+    """Single-flight sharing of analyses for identical incoming errors."""
+    enabled: bool = True
+    ttl_seconds: float = 300  # How long a finished analysis answers repeats of the same error
+    max_entries: int = 1024
+
+coalescing_config = CoalescingConfig(
+    enabled=os.getenv('COALESCE_ENABLED', 'true').lower() == 'true',
+    ttl_seconds=float(os.getenv('COALESCE_TTL_SECONDS', '300')),
+    max_entries=int(os.getenv('COALESCE_MAX_ENTRIES', '1024'))
+)
+
+# Embedding Cache Configuration
+class EmbeddingCacheConfig(BaseModel):
+    """Local persistent cache in front of the embedding model."""
+    enabled: bool = True
+    max_entries: int = 200_000  # LRU-evicted beyond this many cached vectors
+
+embedding_cache_config = EmbeddingCacheConfig(
+    enabled=os.getenv('EMBEDDING_CACHE_ENABLED', 'true').lower() == 'true',
+    max_entries=int(os.getenv('EMBEDDING_CACHE_MAX_ENTRIES', '200000'))
+)
+
+# Analysis Context Budget Configuration
+class ContextBudgetConfig(BaseModel):
+    """Token budget for the variable sections of the analysis prompt."""
+    total_tokens: int = 3000        # Error message, stack trace, history, error summary and related logs combined
+    stack_trace_tokens: int = 500
+    historical_tokens: int = 800    # Unused history budget rolls over to related logs
+    max_stack_frames: int = 10
+
+context_budget_config = ContextBudgetConfig(
+    total_tokens=int(os.getenv('CONTEXT_TOTAL_TOKENS', '3000')),
+    stack_trace_tokens=int(os.getenv('CONTEXT_STACK_TRACE_TOKENS', '500')),
+    historical_tokens=int(os.getenv('CONTEXT_HISTORICAL_TOKENS', '800')),
+    max_stack_frames=int(os.getenv('CONTEXT_MAX_STACK_FRAMES', '10'))
+)
+
+# LLM Response Cache Configuration
+class LLMCacheConfig(BaseModel):
+    """Local persistent cache of LLM responses for byte-identical prompts."""
+    enabled: bool = True
+    max_entries: int = 10_000  # LRU-evicted beyond this many cached responses
+
+llm_cache_config = LLMCacheConfig(
+    enabled=os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true',
+    max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', '10000'))
+)
+
+# Structured Output Configuration
+class StructuredOutputConfig(BaseModel):
+    """Schema-constrained decoding of the analysis and repair of output that still fails validation."""
+    enabled: bool = True          # Pass the ErrorAnalysisOutput JSON schema as Ollama's `format` constraint
+    max_repair_attempts: int = 1  # Repair prompts sent for output that cannot be fixed locally
+
+structured_output_config = StructuredOutputConfig(
+    enabled=os.getenv('STRUCTURED_OUTPUT_ENABLED', 'true').lower() == 'true',
+    max_repair_attempts=int(os.getenv('STRUCTURED_OUTPUT_MAX_REPAIRS', '1'))
+)
+
+# Vector Ingest Pipeline Configuration
+class IngestPipelineConfig(BaseModel):
+    """Batching, concurrency and retry settings for VectorStore.store_vectors."""
+    embed_batch_size: int = 96    # Distinct chunk texts per embedding request
+    upsert_batch_size: int = 100  # Vectors per Pinecone upsert request
+    embed_workers: int = 2
+    upsert_workers: int = 4
+    max_retries: int = Field(default=3, ge=1)  # Attempts per batch before it is reported as failed
+    update_workers: int = 16      # Concurrent Pinecone requests of one metadata update batch (one request per id)
+
+ingest_pipeline_config = IngestPipelineConfig(
+    embed_batch_size=int(os.getenv('INGEST_EMBED_BATCH_SIZE', '96')),
+    upsert_batch_size=int(os.getenv('INGEST_UPSERT_BATCH_SIZE', '100')),
+    embed_workers=int(os.getenv('INGEST_EMBED_WORKERS', '2')),
+    upsert_workers=int(os.getenv('INGEST_UPSERT_WORKERS', '4')),
+    max_retries=int(os.getenv('INGEST_MAX_RETRIES', '3')),
+    update_workers=int(os.getenv('INGEST_UPDATE_WORKERS', '16'))
+)
+
+# Analysis Service Configuration
+class AnalysisServiceConfig(BaseModel):
+    """HTTP service mode: listening address, concurrency and backpressure limits."""
+    host: str = "127.0.0.1"
+    port: int = 8080
+    concurrency: int = 4            # Analyses run at once
+    queue_size: int = 64            # Requests waiting for a worker before new ones get 503
+    request_timeout_seconds: float = 300.0
+    drain_timeout_seconds: float = 120.0  # Time allowed for queued work to finish on shutdown
+    warm_up: bool = True            # Load the LLM into memory at startup
+
+analysis_service_config = AnalysisServiceConfig(
+    host=os.getenv('ANALYSIS_SERVICE_HOST', '127.0.0.1'),
+    port=int(os.getenv('ANALYSIS_SERVICE_PORT', '8080')),
+    concurrency=int(os.getenv('ANALYSIS_SERVICE_CONCURRENCY', '4')),
+    queue_size=int(os.getenv('ANALYSIS_SERVICE_QUEUE_SIZE', '64')),
+    request_timeout_seconds=float(os.getenv('ANALYSIS_SERVICE_REQUEST_TIMEOUT', '300')),
+    drain_timeout_seconds=float(os.getenv('ANALYSIS_SERVICE_DRAIN_TIMEOUT', '120')),
+    warm_up=os.getenv('ANALYSIS_SERVICE_WARM_UP', 'true').lower() == 'true'
 )
 
 # Pinecone Configuration
@@ -21,9 +220,21 @@ class PineconeConfig(BaseModel):
     index_name: str = "error-logs",
     host: str
 
-pinecone_config = PineconeConfig(
-    api_key=os.getenv('PINECONE_API_KEY'),
-    environment=os.getenv('PINECONE_ENVIRONMENT'),
-    index_name=os.getenv('PINECONE_INDEX_NAME', 'error-logs'),
-    host=os.getenv('PINECONE_HOST')
-)
\ No newline at end of file
+# Validated on first use, so the local backend runs without Pinecone settings
+@lazy_singleton
+def get_pinecone_config() -> PineconeConfig:
+    return PineconeConfig(
+        api_key=os.getenv('PINECONE_API_KEY'),
+        environment=os.getenv('PINECONE_ENVIRONMENT'),
+        index_name=os.getenv('PINECONE_INDEX_NAME', 'error-logs'),
+        host=os.getenv('PINECONE_HOST')
+    )
+
+
+def __getattr__(name: str):
+    # `datadog_config` and `pinecone_config` stay importable by name but are only built when accessed
+    if name == "datadog_config":
+        return get_datadog_config()
+    if name == "pinecone_config":
+        return get_pinecone_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,114 +1,326 @@
-from typing import Optional, List
+from typing import Annotated, Callable, Dict, Optional, List, Union
 
+from langchain_core.runnables import RunnableLambda
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, START, END
-from pydantic import Field, BaseModel
+from pydantic import ConfigDict, Field, BaseModel
 
 
+import asyncio
+import functools
+import time
 from datetime import datetime, timedelta
-from src.tools.datadog_integration import DatadogLogFetcher
-from src.models.error_analysis_state import ErrorAnalysisInput, ErrorAnalysisOutput
-from src.tools.error_analysis import analyze_error
+from src.tools.datadog_integration import get_datadog_fetcher
+from src.tools.log_batch import LogBatch
+from src.models.error_analysis_state import ErrorAnalysisInput, ErrorAnalysisOutput, ErrorLogSummary, ErrorQuery
+from src.tools.error_analysis import (astream_analysis, asearch_historical_errors, search_historical_errors,
+                                     stream_analysis)
 
-from src.tools.tool_selection import select_tools
+from src.tools.tool_selection import get_tool_router
+
+
+def merge_timings(left: Dict[str, float], right: Dict[str, float]) -> Dict[str, float]:
+    """Reducer merging per-node timings written by parallel branches."""
+    return {**(left or {}), **(right or {})}
 
 
 class AnalysisState(BaseModel):
     """State model for error analysis workflow."""
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     selected_tools: List[str] = Field(default_factory=list, description="List of selected tools")
     error_code: str = Field(description="Error code")
     error_message: str = Field(description="Error message")
     stack_trace: Optional[str] = Field(default=None, description="Stack trace")
     service: Optional[str] = Field(default=None, description="Service name")
     trace_id: Optional[str] = Field(default=None, description="Trace ID")
-    related_logs: List[dict] = Field(default_factory=list, description="Related logs")
+    related_logs: Union[LogBatch, List[dict]] = Field(
+        default_factory=list, description="Related logs, kept as a columnar LogBatch once fetched"
+    )
+    log_summary: Optional[ErrorLogSummary] = Field(
+        default=None, description="Counts of recent error logs, when no trace logs were found"
+    )
     service_docs: Optional[dict] = Field(default=None, description="Service documentation")
+    historical_results: Optional[List[dict]] = Field(default=None, description="Similar historical errors")
+    use_llm_cache: bool = Field(default=True, description="Answer identical analysis prompts from the LLM response cache")
     analysis_output: Optional[ErrorAnalysisOutput] = Field(default=None)
+    node_timings: Annotated[Dict[str, float], merge_timings] = Field(
+        default_factory=dict, description="Wall-clock milliseconds spent in each node"
+    )
+
+
+def initial_state(error_query: ErrorQuery) -> AnalysisState:
+    """Build the workflow's initial state for an incoming error."""
+    return AnalysisState(error_code=error_query.code,
+                         error_message=error_query.message,
+                         stack_trace=error_query.stack_trace,
+                         trace_id=error_query.trace_id,
+                         service=error_query.service)
 
 
 TASK_DESCRIPTION = """
 Analyze error incidents using Datadog logs and service documentation.
 """
 
-# Initialize clients
-datadog_client = DatadogLogFetcher()
+# Clients (the pooled Datadog fetcher, the vector store, the LLMs) are shared
+# across modules and created on first use, so building the graph connects to nothing
+
+
+def timed(name: str) -> Callable:
+    """Record a node's wall-clock time in `node_timings` alongside its state update."""
+    def decorator(node: Callable[[AnalysisState], dict]) -> Callable[[AnalysisState], dict]:
+        if asyncio.iscoroutinefunction(node):
+            @functools.wraps(node)
+            async def async_wrapper(state: AnalysisState) -> dict:
+                started = time.perf_counter()
+                update = await node(state) or {}
+                update["node_timings"] = {name: (time.perf_counter() - started) * 1000}
+                return update
+            return async_wrapper
+
+        @functools.wraps(node)
+        def wrapper(state: AnalysisState) -> dict:
+            started = time.perf_counter()
+            update = node(state) or {}
+            update["node_timings"] = {name: (time.perf_counter() - started) * 1000}
+            return update
+        return wrapper
+    return decorator
 
 
-# Declare all nodes
-def tool_selection(state: AnalysisState) -> AnalysisState:
-    """Select appropriate tools based on the query"""
-    state.selected_tools = select_tools(TASK_DESCRIPTION)
-    return state
+# Declare all nodes. Nodes return partial updates so parallel branches never
+# write the same keys; `node_timings` is merged by its reducer. Each node has an
+# async twin used by `dd_error_workflow.ainvoke`, which awaits LLM and Datadog
+# I/O instead of blocking a thread.
+@timed("tool_selection")
+def tool_selection(state: AnalysisState) -> dict:
+    """Select appropriate tools based on the query (rule-based or memoized, LLM only when ambiguous)"""
+    return {"selected_tools": get_tool_router().route(
+        TASK_DESCRIPTION,
+        trace_id=state.trace_id,
+        service=state.service
+    )}
 
 
-def gather_datadog_logs(state: AnalysisState) -> AnalysisState:
+@timed("tool_selection")
+async def atool_selection(state: AnalysisState) -> dict:
+    return {"selected_tools": await get_tool_router().aroute(
+        TASK_DESCRIPTION,
+        trace_id=state.trace_id,
+        service=state.service
+    )}
+
+
+@timed("gather_history")
+def gather_historical_errors(state: AnalysisState) -> dict:
+    """Search similar historical errors if selected; needs only the error message"""
+    if "vector_store" not in state.selected_tools:
+        return {}
+    try:
+        return {"historical_results": search_historical_errors(state.error_message, state.service)}
+    except Exception as e:
+        print(f"Error searching historical errors: {e}")
+        return {}
+
+
+@timed("gather_history")
+async def agather_historical_errors(state: AnalysisState) -> dict:
+    if "vector_store" not in state.selected_tools:
+        return {}
+    try:
+        return {"historical_results": await asearch_historical_errors(state.error_message, state.service)}
+    except Exception as e:
+        print(f"Error searching historical errors: {e}")
+        return {}
+
+
+@timed("gather_datadog")
+def gather_datadog_logs(state: AnalysisState) -> dict:
     """Gather logs from Datadog if selected"""
-    if "datadog" in state.selected_tools:
-        try:
-            # Fetch logs by trace ID if available
-            if state.trace_id:
-                logs = datadog_client.fetch_logs_by_trace_id(
-                    trace_id=state.trace_id,
-                    hours=72
-                )
-                if logs:
-                    state.related_logs = [log.dict() for log in logs]
+    if "datadog" not in state.selected_tools:
+        return {}
+    try:
+        related_logs = []
+        # Fetch logs by trace ID if available
+        if state.trace_id:
+            related_logs = get_datadog_fetcher().fetch_logs_by_trace_id(
+                trace_id=state.trace_id,
+                hours=72
+            )
+        
+        # If no trace ID or no logs found, summarize recent error logs server side instead of pulling them
+        if not related_logs:
+            return _log_summary_update(state, get_datadog_fetcher().summarize_error_logs(hours=24))
+        
+        return _related_logs_update(state, related_logs)
             
-            # If no trace ID or no logs found, fetch recent error logs
-            if not state.related_logs:
-                logs = datadog_client.fetch_past_error_logs_and_store(hours=24)
-                if logs:
-                    state.related_logs = [log.dict() for log in logs]
-                    
-            # Extract service name if not provided
-            if not state.service and state.related_logs:
-                state.service = state.related_logs[0].get('service')
-                
-        except Exception as e:
-            print(f"Error gathering Datadog logs: {e}")
+    except Exception as e:
+        print(f"Error gathering Datadog logs: {e}")
     
-    return state
+    return {}
+
+
+@timed("gather_datadog")
+async def agather_datadog_logs(state: AnalysisState) -> dict:
+    if "datadog" not in state.selected_tools:
+        return {}
+    try:
+        related_logs = []
+        if state.trace_id:
+            related_logs = await get_datadog_fetcher().afetch_logs_by_trace_id(
+                trace_id=state.trace_id,
+                hours=72
+            )
+
+        if not related_logs:
+            return _log_summary_update(state, await get_datadog_fetcher().asummarize_error_logs(hours=24))
+
+        return _related_logs_update(state, related_logs)
+
+    except Exception as e:
+        print(f"Error gathering Datadog logs: {e}")
 
+    return {}
 
-def gather_service_docs(state: AnalysisState) -> AnalysisState:
+
+def _related_logs_update(state: AnalysisState, logs: List) -> dict:
+    """State update for the fetched Datadog logs, filling in the service if it was not provided."""
+    update = {}
+    related_logs = LogBatch.from_logs(logs or [])
+    if related_logs:
+        update["related_logs"] = related_logs
+
+    # Extract service name if not provided
+    if not state.service and related_logs:
+        update["service"] = related_logs.row(0)['service']
+    return update
+
+
+def _log_summary_update(state: AnalysisState, summary: Optional[ErrorLogSummary]) -> dict:
+    """State update for an error log summary, taking the top service if none was provided."""
+    if summary is None:
+        return {}
+    update = {"log_summary": summary}
+    if not state.service and summary.services:
+        update["service"] = summary.services[0].value
+    return update
+
+
+@timed("gather_service_docs")
+def gather_service_docs(state: AnalysisState) -> dict:
     """Gather service documentation if selected"""
-    pass
+    return {}
+
+
+@timed("gather_service_docs")
+async def agather_service_docs(state: AnalysisState) -> dict:
+    return {}
 
 
-def perform_analysis(state: AnalysisState) -> AnalysisState:
-    """Perform error analysis"""
+@timed("analysis")
+def perform_analysis(state: AnalysisState) -> dict:
+    """
+    Perform error analysis.
+
+    The LLM output is streamed: each completed field is written to the graph's
+    "custom" stream as it arrives, so callers using stream_mode="custom" can show
+    the analysis before the full answer is parsed.
+    """
     try:
-        error_analysis_input = ErrorAnalysisInput(
-            error_code=state.error_code,
-            error_message=state.error_message,
-            stack_trace=state.stack_trace,
-            trace_id=state.trace_id,
-            service=state.service,
-            related_logs=state.related_logs,
-            service_docs=state.service_docs
-        )
-        state.analysis_output = analyze_error(error_analysis_input)
+        writer = _stream_writer()
+        for event in stream_analysis(_analysis_input(state), use_cache=state.use_llm_cache):
+            if event.field == "result":
+                return {"analysis_output": event.output}
+            writer(event.model_dump(exclude_none=True))
     except Exception as e:
         print(f"Error performing analysis: {e}")
         
-    return state
+    return {}
+
+
+@timed("analysis")
+async def aperform_analysis(state: AnalysisState) -> dict:
+    try:
+        writer = _stream_writer()
+        async for event in astream_analysis(_analysis_input(state), use_cache=state.use_llm_cache):
+            if event.field == "result":
+                return {"analysis_output": event.output}
+            writer(event.model_dump(exclude_none=True))
+    except Exception as e:
+        print(f"Error performing analysis: {e}")
+
+    return {}
+
+
+def _stream_writer() -> Callable[[dict], None]:
+    """The graph's custom stream writer, or a no-op when the graph is not being streamed."""
+    try:
+        return get_stream_writer()
+    except KeyError:
+        return lambda chunk: None
+
+
+def _analysis_input(state: AnalysisState) -> ErrorAnalysisInput:
+    return ErrorAnalysisInput(
+        error_code=state.error_code,
+        error_message=state.error_message,
+        stack_trace=state.stack_trace,
+        trace_id=state.trace_id,
+        service=state.service,
+        related_logs=list(state.related_logs),
+        log_summary=state.log_summary,
+        service_docs=state.service_docs,
+        historical_results=state.historical_results
+    )
+
+
+def node(func: Callable, afunc: Callable) -> RunnableLambda:
+    """Node running `func` under invoke and `afunc` under ainvoke."""
+    return RunnableLambda(func, afunc=afunc, name=func.__name__)
 
 
 # Define the workflow graph
 dd_error_monitoring_workflow = StateGraph(AnalysisState)
 
 # Add nodes to the graph
-dd_error_monitoring_workflow.add_node("tool_selection", tool_selection)
-dd_error_monitoring_workflow.add_node("gather_datadog", gather_datadog_logs)
-dd_error_monitoring_workflow.add_node("gather_service_docs", gather_service_docs)
-dd_error_monitoring_workflow.add_node("analysis", perform_analysis)
+dd_error_monitoring_workflow.add_node("tool_selection", node(tool_selection, atool_selection))
+dd_error_monitoring_workflow.add_node("gather_history", node(gather_historical_errors, agather_historical_errors))
+dd_error_monitoring_workflow.add_node("gather_datadog", node(gather_datadog_logs, agather_datadog_logs))
+dd_error_monitoring_workflow.add_node("gather_service_docs", node(gather_service_docs, agather_service_docs))
+dd_error_monitoring_workflow.add_node("analysis", node(perform_analysis, aperform_analysis))
 
 
-# Define the edges
+# Define the edges. The gather nodes are independent, so they fan out after
+# tool selection and run in the same step; analysis waits on their join.
 dd_error_monitoring_workflow.add_edge(START, "tool_selection")
+dd_error_monitoring_workflow.add_edge("tool_selection", "gather_history")
 dd_error_monitoring_workflow.add_edge("tool_selection", "gather_datadog")
-dd_error_monitoring_workflow.add_edge("gather_datadog", "gather_service_docs")
-dd_error_monitoring_workflow.add_edge("gather_service_docs", "analysis")
+dd_error_monitoring_workflow.add_edge("tool_selection", "gather_service_docs")
+dd_error_monitoring_workflow.add_edge(["gather_history", "gather_datadog", "gather_service_docs"], "analysis")
 dd_error_monitoring_workflow.add_edge("analysis", END)
 
 # Compile the graph
 dd_error_workflow = dd_error_monitoring_workflow.compile()
+
+
+async def arun_analyses(states: List[AnalysisState], max_concurrency: int = 10) -> List[dict]:
+    """
+    Analyze many incidents on the current event loop.
+
+    At most `max_concurrency` workflows are in flight at once; results are
+    returned in the order of `states`.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(state: AnalysisState) -> dict:
+        async with semaphore:
+            return await dd_error_workflow.ainvoke(state)
+
+    return await asyncio.gather(*(run(state) for state in states))
+
+
+def __getattr__(name: str):
+    # `datadog_client` stays importable by name but the fetcher is only built when accessed
+    if name == "datadog_client":
+        return get_datadog_fetcher()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -17,6 +17,39 @@ class LogData(BaseModel):
     resolution: Optional[str] = Field(default="unknown")
 
 
+# Number of error logs sharing one value of a facet (service, error type, error code)
+class FacetCount(BaseModel):
+    value: str = Field(description="Facet value")
+    count: int = Field(default=0, description="Matching logs in the window")
+
+
+# Error log count in one time bucket
+class TimeBucket(BaseModel):
+    time: str = Field(description="Bucket start (ISO 8601)")
+    count: int = Field(default=0, description="Matching logs in the bucket")
+
+
+# Server-side aggregate of the error logs in a window, used as context instead of raw logs
+class ErrorLogSummary(BaseModel):
+    query: str = Field(description="Datadog logs query that was aggregated")
+    hours: int = Field(description="Window length, ending now")
+    total: int = Field(default=0, description="Matching logs in the window")
+    services: List[FacetCount] = Field(default_factory=list, description="Top services by error count")
+    error_types: List[FacetCount] = Field(default_factory=list, description="Top error types by count")
+    error_codes: List[FacetCount] = Field(default_factory=list, description="Top error codes by count")
+    interval: str = Field(default="1h", description="Width of the timeline buckets")
+    timeline: List[TimeBucket] = Field(default_factory=list, description="Error count per time bucket, oldest first")
+
+
+# Incoming error report (CLI, batch file or HTTP service)
+class ErrorQuery(BaseModel):
+    code: str = Field(..., description="Incoming Error Code")
+    message: str = Field(..., description="Incoming Error Message")
+    stack_trace: Optional[str] = Field(None, description="Incoming Stack Trace")
+    service: Optional[str] = Field(None, description="Incoming Service Name")
+    trace_id: Optional[str] = Field(None, description="Incoming Trace ID for Datadog Logs")
+
+
 # Input Model for the Error Analysis Graph
 class ErrorAnalysisInput(BaseModel):
     error_code: str = Field(description="The error code for the incident")
@@ -25,7 +58,9 @@ class ErrorAnalysisInput(BaseModel):
     trace_id: Optional[str] = Field(None, description="Optional trace ID for fetching related logs")
     service: Optional[str] = Field(None, description="Service name")
     related_logs: Optional[List[LogData]] = Field(None, description="List of recent logs")
+    log_summary: Optional[ErrorLogSummary] = Field(None, description="Aggregate of recent error logs")
     service_docs: Optional[dict] = Field(None, description="Service documentation")
+    historical_results: Optional[List[dict]] = Field(None, description="Similar historical errors, if already retrieved")
 
 
 # Output Model for the Error Analysis Graph
@@ -65,3 +100,12 @@ class ErrorAnalysisOutput(BaseModel):
     }
 
 
+
+
+# Incremental piece of an analysis, emitted while the LLM is still writing it
+class AnalysisStreamEvent(BaseModel):
+    field: str = Field(
+        description="analysis, possible_causes or recommendations for a completed value; result for the final output"
+    )
+    text: Optional[str] = Field(None, description="The completed analysis text or list item")
+    output: Optional[ErrorAnalysisOutput] = Field(None, description="The full output, on the result event")
@@ -0,0 +1,34 @@
+"""
+Backfill the BM25 keyword index from the chunks already in the vector store.
+
+hybrid_search fuses dense results with the local keyword index, which is only
+fed by store_vectors. Vectors stored before hybrid search was added (or from
+another machine) have no keyword entries, so run this once per index and
+backend instead of re-ingesting. Re-running it is safe.
+
+Usage:
+    python -m src.scripts.backfill_keyword_index
+    python -m src.scripts.backfill_keyword_index --batch-size 500
+"""
+
+import argparse
+import time
+
+from src.tools.vector_store import get_vector_store
+
+
+def backfill_keyword_index(batch_size: int) -> None:
+    try:
+        started = time.perf_counter()
+        indexed = get_vector_store().backfill_keyword_index(batch_size=batch_size)
+        print(f"Indexed {indexed} chunks for keyword search in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        print(f"Error backfilling the keyword index: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add chunks already in the vector store to the keyword index")
+    parser.add_argument("--batch-size", type=int, default=100, help="Chunks fetched from the backend per request")
+    args = parser.parse_args()
+
+    backfill_keyword_index(args.batch_size)
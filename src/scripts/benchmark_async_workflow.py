@@ -0,0 +1,124 @@
+"""
+Load test the error analysis workflow at increasing concurrency.
+
+Every external dependency is replaced by a local stub: Datadog by
+DatadogStubServer, Ollama (chat and embeddings) by OllamaStubServer, and the
+vector database by a throwaway local backend. Each stub request waits a fixed
+delay standing in for real service latency, so the numbers show how well one
+process overlaps I/O, not how fast the services are.
+
+For each concurrency level the same batch of incidents is run through
+`dd_error_workflow.ainvoke` on one event loop (via `arun_analyses`), and the
+throughput is compared to the synchronous `invoke` path run one incident at
+a time.
+
+Usage:
+    python -m src.scripts.benchmark_async_workflow --incidents 200 --concurrency 1 10 100
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import List
+
+from src.scripts.stub_servers import DatadogStubServer, OllamaStubServer
+
+
+def _configure_environment(ollama_url: str, state_dir: str, pool_size: int) -> None:
+    """Point the tools at the stubs. Must run before the workflow modules are imported."""
+    os.environ["OLLAMA_HOST"] = ollama_url
+    os.environ["VECTOR_BACKEND"] = "local"
+    os.environ["VECTOR_LOCAL_PATH"] = os.path.join(state_dir, "vector_index")
+    os.environ["EMBEDDING_PROVIDER"] = "ollama"
+    os.environ["AI_ONCALL_STATE_DIR"] = state_dir
+    os.environ["DATADOG_POOL_SIZE"] = str(pool_size)
+    os.environ["LLM_CACHE_ENABLED"] = "false"  # Every level must reach the (stub) LLM
+    os.environ.setdefault("DATADOG_API_KEY", "stub")
+    os.environ.setdefault("DATADOG_APP_KEY", "stub")
+
+
+def _incidents(count: int) -> List:
+    from src.graph.datadog_error_monitoring import AnalysisState
+    return [
+        AnalysisState(
+            error_code="ETIMEDOUT",
+            error_message=f"Connection timed out after {30000 + i}ms",
+            stack_trace="Traceback (most recent call last):\n  File \"network.py\", line 8, in connect_to_service",
+            service="api_service",
+            trace_id=f"stub-trace-{i}",
+        )
+        for i in range(count)
+    ]
+
+
+async def _run_async(states: List, concurrency: int) -> float:
+    from src.graph.datadog_error_monitoring import arun_analyses
+    started = time.perf_counter()
+    results = await arun_analyses(states, max_concurrency=concurrency)
+    elapsed = time.perf_counter() - started
+    failed = sum(1 for result in results if result.get("analysis_output") is None)
+    if failed:
+        print(f"  warning: {failed} incidents produced no analysis")
+    return elapsed
+
+
+async def _run_levels(states: List, levels: List[int]) -> List[float]:
+    """Run every level on one event loop; the LLM's async HTTP client is bound to the loop it first ran on."""
+    from src.tools.datadog_integration import get_datadog_fetcher
+    try:
+        await _run_async(states[:1], 1)  # Warm up connections, caches and the local index
+        return [await _run_async(states, concurrency) for concurrency in levels]
+    finally:
+        await get_datadog_fetcher().aclose()
+
+
+def _run_sync(states: List) -> float:
+    from src.graph.datadog_error_monitoring import dd_error_workflow
+    started = time.perf_counter()
+    for state in states:
+        dd_error_workflow.invoke(state)
+    return time.perf_counter() - started
+
+
+def run_benchmark(incidents: int, levels: List[int], llm_latency_ms: float,
+                  datadog_latency_ms: float, sync_incidents: int) -> None:
+    with DatadogStubServer(latency_ms=datadog_latency_ms) as datadog_stub, \
+            OllamaStubServer(latency_ms=llm_latency_ms) as ollama_stub, \
+            tempfile.TemporaryDirectory() as state_dir:
+        _configure_environment(ollama_stub.url, state_dir, pool_size=max(levels))
+
+        from src.tools.datadog_integration import get_datadog_fetcher
+        get_datadog_fetcher().config.host = datadog_stub.url
+
+        states = _incidents(incidents)
+
+        print(f"{incidents} incidents, stub latency: LLM {llm_latency_ms:.0f}ms, Datadog {datadog_latency_ms:.0f}ms")
+        if sync_incidents:
+            _run_sync(states[:1])  # Warm up
+            elapsed = _run_sync(states[:sync_incidents])
+            print(f"sync invoke     x1    {sync_incidents / elapsed:8.2f} incidents/s "
+                  f"({elapsed / sync_incidents * 1000:7.1f}ms each)")
+
+        throughputs = []
+        for concurrency, elapsed in zip(levels, asyncio.run(_run_levels(states, levels))):
+            throughputs.append(incidents / elapsed)
+            print(f"async ainvoke   x{concurrency:<4} {incidents / elapsed:8.2f} incidents/s "
+                  f"({elapsed:6.2f}s total)")
+        if len(throughputs) > 1:
+            print(f"speedup x{levels[-1]} over x{levels[0]}: {throughputs[-1] / throughputs[0]:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the async workflow against local stubs")
+    parser.add_argument("--incidents", type=int, default=200, help="Incidents analyzed per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 100], help="Concurrency levels")
+    parser.add_argument("--llm-latency-ms", type=float, default=200, help="Delay of each stub LLM call")
+    parser.add_argument("--datadog-latency-ms", type=float, default=50, help="Delay of each stub Datadog call")
+    parser.add_argument("--sync-incidents", type=int, default=20,
+                        help="Incidents for the sequential sync baseline (0 to skip)")
+    args = parser.parse_args()
+
+    run_benchmark(args.incidents, args.concurrency, args.llm_latency_ms,
+                  args.datadog_latency_ms, args.sync_incidents)
@@ -0,0 +1,79 @@
+"""
+Benchmark per-query Datadog latency with a fresh ApiClient per query versus the
+pooled, long-lived client held by DatadogLogFetcher.
+
+Runs against a local stub server over plain HTTP and over TLS, so the cost of
+TCP and TLS handshakes shows up as the gap between the two client modes.
+
+Usage:
+    python -m src.scripts.benchmark_datadog_client --queries 200
+"""
+
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+import urllib3
+from datadog_api_client import Configuration
+
+from src.scripts.stub_servers import DatadogStubServer
+from src.tools.datadog_integration import DatadogLogFetcher
+
+
+def _stub_config(url: str) -> Configuration:
+    config = Configuration(host=url, api_key={"apiKeyAuth": "stub", "appKeyAuth": "stub"})
+    config.verify_ssl = False
+    return config
+
+
+def _time_queries(run_query: Callable[[], None], queries: int) -> List[float]:
+    timings = []
+    for _ in range(queries):
+        started = time.perf_counter()
+        run_query()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def _report(label: str, timings: List[float]) -> None:
+    ordered = sorted(timings)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(f"{label:<28} mean={statistics.mean(timings):7.2f}ms "
+          f"p50={statistics.median(timings):7.2f}ms p95={p95:7.2f}ms")
+
+
+def run_benchmark(queries: int, tls: bool) -> None:
+    start_time = datetime.utcnow() - timedelta(hours=1)
+
+    with DatadogStubServer(tls=tls) as server:
+        config = _stub_config(server.url)
+
+        def fresh_client_query():
+            with DatadogLogFetcher(config=config) as fetcher:
+                fetcher._execute_query("@status:error", start_time)
+
+        pooled = DatadogLogFetcher(config=config)
+        try:
+            pooled._execute_query("@status:error", start_time)  # Warm the pool once
+
+            scheme = "https" if tls else "http"
+            _report(f"{scheme} fresh client/query", _time_queries(fresh_client_query, queries))
+            _report(f"{scheme} pooled client", _time_queries(
+                lambda: pooled._execute_query("@status:error", start_time), queries
+            ))
+        finally:
+            pooled.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pooled vs per-query Datadog clients")
+    parser.add_argument("--queries", type=int, default=100, help="Queries per mode")
+    parser.add_argument("--no-tls", action="store_true", help="Skip the TLS run (e.g. when openssl is unavailable)")
+    args = parser.parse_args()
+
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    run_benchmark(args.queries, tls=False)
+    if not args.no_tls:
+        run_benchmark(args.queries, tls=True)
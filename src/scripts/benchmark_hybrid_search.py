@@ -0,0 +1,141 @@
+"""
+Benchmark recall@k of dense-only, keyword-only and hybrid retrieval on a labeled
+set of historical errors.
+
+The corpus is indexed into a throwaway local vector backend using the configured
+embedding provider (set EMBEDDING_PROVIDER=ollama to run fully offline). A query
+counts as a hit when any of its top-k results belongs to one of its relevant
+trace ids.
+
+Usage:
+    python -m src.scripts.benchmark_hybrid_search --k 1 3 5
+    python -m src.scripts.benchmark_hybrid_search --labeled my_errors.jsonl
+
+A labeled file is JSONL where each line is either a log
+    {"log": {...LogData fields...}}
+or a query
+    {"query": "...", "service": "optional-filter", "relevant": ["trace-id", ...]}
+"""
+
+import argparse
+import json
+import os
+import tempfile
+from typing import Dict, List, Tuple
+
+from src.config import HybridSearchConfig, VectorStoreConfig, vector_store_config
+from src.models.error_analysis_state import LogData
+from src.tools.vector_store import VectorStore
+
+
+SAMPLE_LOGS = [
+    LogData(trace_id="t-db-auth", service="database-service", error_code="500", error_type="DatabaseError",
+            message="Database connection failed due to invalid credentials",
+            stack_trace="Error: DatabaseError: Invalid credentials\n    at Database.connect (/src/database.js:123)\n    at processRequest (/src/api/middleware.js:45)"),
+    LogData(trace_id="t-db-timeout", service="database-service", error_code="ETIMEDOUT", error_type="TimeoutError",
+            message="Connection timeout while connecting to database",
+            stack_trace="Error: TimeoutError: Connection timed out after 30s\n    at Pool.connect (/src/db/pool.js:89)\n    at ApiHandler.query (/src/handlers/api.js:211)"),
+    LogData(trace_id="t-user-lookup", service="user-management-service", error_code="500", error_type="ReferenceError",
+            message="user is not defined",
+            stack_trace="ReferenceError: user is not defined\n    at UserModel.findOne (/src/models/user.js:42)\n    at UserController.get (/src/controllers/user.js:17)"),
+    LogData(trace_id="t-email-unique", service="user-management-service", error_code="23505", error_type="UniqueViolationError",
+            message="duplicate key value violates unique constraint users.email",
+            stack_trace="SequelizeUniqueConstraintError: Validation error\n    at Query.formatError (/node_modules/sequelize/lib/dialects/postgres/query.js:313)\n    at UserService.create (/src/services/user.js:58)"),
+    LogData(trace_id="t-rate-limit", service="api-gateway", error_code="429", error_type="RateLimitError",
+            message="API rate limit exceeded",
+            stack_trace="Error: RateLimitError: Too many requests\n    at RateLimiter.check (/src/middleware/rate-limit.js:78)\n    at processRequest (/src/api/gateway.js:156)"),
+    LogData(trace_id="t-jwt", service="auth-service", error_code="401", error_type="AuthenticationError",
+            message="Invalid JWT token in authorization header",
+            stack_trace="Error: AuthenticationError: Invalid token\n    at JwtVerifier.verify (/src/auth/jwt.js:45)\n    at AuthMiddleware.authenticate (/src/middleware/auth.js:23)"),
+    LogData(trace_id="t-redis", service="cache-service", error_code="ECONNREFUSED", error_type="ConnectionError",
+            message="Failed to connect to Redis cache server",
+            stack_trace="Error: connect ECONNREFUSED 10.0.3.12:6379\n    at RedisClient.connect (/src/cache/redis.js:156)\n    at CacheManager.initialize (/src/managers/cache.js:45)"),
+    LogData(trace_id="t-pg-refused", service="order-service", error_code="ECONNREFUSED", error_type="ConnectionError",
+            message="Could not connect to PostgreSQL database: connection refused",
+            stack_trace="Error: connect ECONNREFUSED 10.0.1.5:5432\n    at TCPConnectWrap.afterConnect (net.js:1141)\n    at OrderRepository.save (/src/repositories/order.js:77)"),
+    LogData(trace_id="t-payment-timeout", service="payment-service", error_code="ETIMEDOUT", error_type="ConnectTimeoutError",
+            message="Request to payment provider timed out",
+            stack_trace="ConnectTimeoutError: Connect Timeout Error\n    at StripeClient.charge (/src/payments/stripe.js:88)\n    at PaymentHandler.process (/src/handlers/payment.js:89)"),
+    LogData(trace_id="t-oom", service="image-service", error_code="507", error_type="OutOfMemoryError",
+            message="Memory allocation failed during image processing",
+            stack_trace="Error: OutOfMemoryError: Failed to allocate 2GB\n    at ImageProcessor.resize (/src/services/image.js:234)\n    at BatchProcessor.process (/src/batch/processor.js:78)"),
+    LogData(trace_id="t-kafka", service="streaming-service", error_code="500", error_type="KafkaError",
+            message="Kafka consumer group rebalancing failed",
+            stack_trace="Error: KafkaError: Consumer group rebalance timeout\n    at ConsumerGroup.join (/src/kafka/consumer.js:278)\n    at MessageProcessor.start (/src/processors/message.js:67)"),
+    LogData(trace_id="t-s3", service="storage-service", error_code="403", error_type="AccessDeniedError",
+            message="S3 bucket permission denied during file upload",
+            stack_trace="Error: AccessDeniedError: Access Denied to bucket 'user-uploads'\n    at S3Client.putObject (/src/aws/s3.js:145)\n    at FileUploader.upload (/src/services/uploader.js:89)"),
+]
+
+SAMPLE_QUERIES = [
+    {"query": "ETIMEDOUT", "relevant": ["t-db-timeout", "t-payment-timeout"]},
+    {"query": "UserModel.findOne", "relevant": ["t-user-lookup"]},
+    {"query": "users.email constraint", "relevant": ["t-email-unique"]},
+    {"query": "pool.js connect timed out", "relevant": ["t-db-timeout"]},
+    {"query": "ECONNREFUSED 5432", "relevant": ["t-pg-refused"]},
+    {"query": "redis.js ECONNREFUSED", "relevant": ["t-redis"]},
+    {"query": "too many requests from client", "relevant": ["t-rate-limit"]},
+    {"query": "JwtVerifier.verify failed", "relevant": ["t-jwt"]},
+    {"query": "process ran out of memory resizing pictures", "relevant": ["t-oom"]},
+    {"query": "ConnectTimeoutError", "service": "payment-service", "relevant": ["t-payment-timeout"]},
+    {"query": "consumer rebalance", "relevant": ["t-kafka"]},
+    {"query": "putObject access denied", "relevant": ["t-s3"]},
+]
+
+
+def load_labeled(path: str) -> Tuple[List[LogData], List[Dict]]:
+    logs, queries = [], []
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "log" in record:
+                logs.append(LogData(**record["log"]))
+            else:
+                queries.append(record)
+    return logs, queries
+
+
+def recall_at_k(store: VectorStore, queries: List[Dict], k: int, config: HybridSearchConfig) -> float:
+    hits = 0
+    for labeled in queries:
+        metadata_filter = {"service": labeled["service"]} if labeled.get("service") else None
+        results = store.hybrid_search(labeled["query"], metadata_filter=metadata_filter, k=k, config=config)
+        if any(result.get("trace_id") in labeled["relevant"] for result in results):
+            hits += 1
+    return hits / len(queries) if queries else 0.0
+
+
+def run_benchmark(logs: List[LogData], queries: List[Dict], ks: List[int]) -> None:
+    modes = {
+        "dense": HybridSearchConfig(keyword_enabled=False),
+        "keyword": HybridSearchConfig(dense_weight=0.0),
+        "hybrid": HybridSearchConfig(),
+    }
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        config = VectorStoreConfig(
+            backend="local",
+            local_path=os.path.join(state_dir, "vector_index"),
+            embedding_provider=vector_store_config.embedding_provider,
+            embedding_model=vector_store_config.embedding_model,
+        )
+        store = VectorStore(index_name="benchmark", config=config, state_dir=state_dir)
+        store.store_vectors(logs)
+
+        print(f"{len(logs)} logs, {len(queries)} labeled queries")
+        print("mode     " + " ".join(f"recall@{k:<3}" for k in ks))
+        for name, mode_config in modes.items():
+            recalls = [recall_at_k(store, queries, k, mode_config) for k in ks]
+            print(f"{name:<8} " + " ".join(f"{recall:<10.2f}" for recall in recalls))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark recall@k of dense, keyword and hybrid search")
+    parser.add_argument("--labeled", help="JSONL file of logs and labeled queries (defaults to a built-in sample)")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5], help="Cutoffs to report")
+    args = parser.parse_args()
+
+    logs, queries = load_labeled(args.labeled) if args.labeled else (SAMPLE_LOGS, SAMPLE_QUERIES)
+    run_benchmark(logs, queries, args.k)
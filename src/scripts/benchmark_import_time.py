@@ -0,0 +1,101 @@
+"""
+Measure the cold-start import time of each entry point.
+
+Every entry point is started in a fresh interpreter with `-X importtime`, so
+nothing is shared between runs. For each one the script reports the wall
+clock time of the whole process, the total time spent importing (the sum of
+the per-module self times) and the top-level packages that account for most
+of it. The median over `--repeat` runs is reported. An empty interpreter is
+included as the floor.
+
+Usage:
+    python -m src.scripts.benchmark_import_time
+    python -m src.scripts.benchmark_import_time --repeat 10 --top 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (name, interpreter arguments after `-X importtime`)
+ENTRY_POINTS = [
+    ("python (empty)", ["-c", "pass"]),
+    ("main.py --help", ["main.py", "--help"]),
+    ("import src.tools.error_analysis", ["-c", "import src.tools.error_analysis"]),
+    ("import src.graph.datadog_error_monitoring", ["-c", "import src.graph.datadog_error_monitoring"]),
+    ("import src.service.analysis_service", ["-c", "import src.service.analysis_service"]),
+    ("import src.scripts.load_vectordb", ["-c", "import src.scripts.load_vectordb"]),
+    ("import src.scripts.load_dummy_dd_logs", ["-c", "import src.scripts.load_dummy_dd_logs"]),
+]
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """Self import time in microseconds per module, from `-X importtime` output."""
+    self_us = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        self_us[fields[2].strip()] = int(fields[0])
+    return self_us
+
+
+def measure(args: List[str]) -> Optional[Tuple[float, Dict[str, int]]]:
+    """Run one entry point in a fresh interpreter; None if it exits with an error."""
+    started = time.perf_counter()
+    process = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=REPO_ROOT,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - started
+    if process.returncode != 0:
+        last_line = next((line for line in reversed(process.stderr.splitlines())
+                          if not line.startswith("import time:")), "")
+        print(f"  failed: {last_line}")
+        return None
+    return elapsed, parse_importtime(process.stderr)
+
+
+def heaviest_packages(self_us: Dict[str, int], top: int) -> List[Tuple[str, int]]:
+    """Top-level packages ranked by the import time of all their modules."""
+    by_package = defaultdict(int)
+    for module, us in self_us.items():
+        by_package[module.split(".")[0]] += us
+    return sorted(by_package.items(), key=lambda item: -item[1])[:top]
+
+
+def run_benchmark(repeat: int, top: int) -> None:
+    print(f"median of {repeat} cold starts per entry point")
+    print(f"{'entry point':<44} {'wall':>8} {'imports':>8}  heaviest packages")
+    for name, args in ENTRY_POINTS:
+        runs = []
+        for _ in range(repeat):
+            result = measure(args)
+            if result is None:
+                break
+            runs.append(result)
+        if not runs:
+            print(f"{name:<44} {'failed':>8}")
+            continue
+
+        wall_ms = statistics.median(elapsed for elapsed, _ in runs) * 1000
+        median_run = sorted(runs, key=lambda run: sum(run[1].values()))[len(runs) // 2][1]
+        import_ms = sum(median_run.values()) / 1000
+        packages = ", ".join(f"{package} {us / 1000:.0f}ms" for package, us in heaviest_packages(median_run, top))
+        print(f"{name:<44} {wall_ms:7.0f}ms {import_ms:7.0f}ms  {packages}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of each entry point")
+    parser.add_argument("--repeat", type=int, default=5, help="Cold starts per entry point (the median is reported)")
+    parser.add_argument("--top", type=int, default=3, help="Heaviest top-level packages listed per entry point")
+    args = parser.parse_args()
+
+    run_benchmark(args.repeat, args.top)
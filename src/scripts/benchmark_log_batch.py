@@ -0,0 +1,157 @@
+"""
+Compare memory and throughput of bulk log handling as LogData objects versus a
+columnar LogBatch.
+
+Synthetic Datadog records (a realistic mix of services, hosts, environments
+and repeating stack traces) are run through three stages:
+
+- build: records to logs (a validated LogData per record, or one LogBatch)
+- ingest prep: the per-log work store_vectors does before embedding
+  (vector ids and chunks)
+- analysis hand-off: logs to the related logs of an ErrorAnalysisInput
+
+Every path and size runs in a fresh interpreter. Records are generated lazily,
+so "held" is the resident memory taken by the built logs alone and "peak" the
+highest resident memory over all stages, both above the process's baseline.
+
+Usage:
+    python -m src.scripts.benchmark_log_batch
+    python -m src.scripts.benchmark_log_batch --sizes 10000 100000
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Dict, Iterator
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PATHS = ("logdata", "logbatch")
+
+_SERVICES = [f"service-{i}" for i in range(20)]
+_HOSTS = [f"ip-10-0-{i // 10}-{i % 10}.ec2.internal" for i in range(50)]
+_ENVIRONMENTS = ["prod", "staging", "dev"]
+_ERRORS = [
+    (f"Error{i}", str(400 + i % 100),
+     "Traceback (most recent call last):\n"
+     + "".join(f'  File "app/module_{i}_{frame}.py", line {10 + frame}, in handler_{frame}\n' for frame in range(8))
+     + f"Error{i}: request failed")
+    for i in range(30)
+]
+
+
+def _records(count: int) -> Iterator[SimpleNamespace]:
+    """Datadog-like log records, made one at a time."""
+    for i in range(count):
+        error_type, error_code, stack = _ERRORS[i % len(_ERRORS)]
+        yield SimpleNamespace(attributes={
+            "trace_id": f"{i:032x}",
+            "message": f"Request {i} to upstream failed after {i % 5000}ms",
+            "timestamp": f"2024-02-15T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z",
+            "service": _SERVICES[i % len(_SERVICES)],
+            "error.code": error_code,
+            "error.type": error_type,
+            "error.stack": stack,
+            "hostname": _HOSTS[i % len(_HOSTS)],
+            "env": _ENVIRONMENTS[i % len(_ENVIRONMENTS)],
+        })
+
+
+def _rss_mb() -> float:
+    """Current resident memory, from /proc on Linux and the peak elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return _peak_rss_mb()
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def run_worker(path: str, size: int) -> Dict[str, float]:
+    """Run the three stages for one path and size in this process."""
+    os.environ.setdefault("DATADOG_API_KEY", "stub")
+    os.environ.setdefault("DATADOG_APP_KEY", "stub")
+    from src.config import VectorStoreConfig
+    from src.models.error_analysis_state import ErrorAnalysisInput, LogData
+    from src.tools.datadog_integration import DatadogLogFetcher
+    from src.tools.vector_store import VectorStore
+
+    state_dir = tempfile.mkdtemp()
+    store = VectorStore(config=VectorStoreConfig(backend="local", local_path=os.path.join(state_dir, "index"),
+                                                 embedding_provider="ollama"),
+                        state_dir=state_dir)
+    fetcher = DatadogLogFetcher()
+    baseline, baseline_peak = _rss_mb(), _peak_rss_mb()
+    result = {}
+
+    started = time.perf_counter()
+    if path == "logdata":
+        logs = [LogData(**fetcher._to_log_row(record)) for record in _records(size)]
+    else:
+        logs = fetcher._to_log_batch(SimpleNamespace(data=_records(size)))
+    result["build_s"] = time.perf_counter() - started
+    result["held_mb"] = _rss_mb() - baseline
+
+    started = time.perf_counter()
+    if path == "logdata":
+        prepared = [(store._generate_vector_id(log.dict()), log) for log in logs]
+        chunks = sum(len(store._prepare_chunks(log.dict())) for _, log in prepared)
+    else:
+        prepared = [(store._generate_vector_id(row), row) for row in logs.rows()]
+        chunks = sum(len(store._prepare_chunks(row)) for _, row in prepared)
+    result["prep_s"] = time.perf_counter() - started
+    del prepared
+
+    started = time.perf_counter()
+    related_logs = [log.dict() for log in logs] if path == "logdata" else list(logs)
+    ErrorAnalysisInput(error_code="500", error_message="request failed", related_logs=related_logs)
+    result["handoff_s"] = time.perf_counter() - started
+
+    result["peak_mb"] = _peak_rss_mb() - baseline_peak
+    result["chunks"] = chunks
+    return result
+
+
+def measure(path: str, size: int) -> Dict[str, float]:
+    process = subprocess.run([sys.executable, "-m", "src.scripts.benchmark_log_batch", "--worker", path, str(size)],
+                             cwd=REPO_ROOT, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "worker failed")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(sizes) -> None:
+    print(f"{'logs':>9} {'path':<9} {'build':>8} {'prep':>8} {'handoff':>8} {'logs/s':>9} {'held':>9} {'peak':>9}")
+    for size in sizes:
+        for path in PATHS:
+            try:
+                result = measure(path, size)
+            except RuntimeError as e:
+                print(f"{size:>9} {path:<9} failed: {e}")
+                continue
+            total = result["build_s"] + result["prep_s"] + result["handoff_s"]
+            print(f"{size:>9} {path:<9} {result['build_s']:7.2f}s {result['prep_s']:7.2f}s "
+                  f"{result['handoff_s']:7.2f}s {size / total:9.0f} "
+                  f"{result['held_mb']:7.0f}MB {result['peak_mb']:7.0f}MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare LogData lists with a columnar LogBatch")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Batch sizes (logs) to measure")
+    parser.add_argument("--worker", nargs=2, metavar=("PATH", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker[0], int(args.worker[1]))))
+    else:
+        run_benchmark(args.sizes)
@@ -0,0 +1,129 @@
+"""
+Benchmark closing an incident: setting the resolution of many log entries one
+by one through a metadata filter versus one bulk `update_resolutions` call.
+
+A throwaway local index is filled with `--indexed` fingerprints of three chunks
+each (random vectors, nothing is embedded). The per-id filter path, which
+scans the index for every vector id, is timed on a sample of `--sample` ids
+and extrapolated; the bulk path resolves every id to its chunk ids through
+the local id index and updates them in batches. Both local paths run inside
+`backend.batch()`, so neither pays for persisting the index per update and
+the comparison measures the filter scans against the id index.
+
+The same runs are then repeated against a simulated Pinecone index that
+sleeps `--pinecone-latency-ms` per request. The per-id path sends one filter
+update per id, one after another; the bulk path sends one update per chunk
+(Pinecone has no multi-id update), `--update-workers` at a time.
+
+Usage:
+    python -m src.scripts.benchmark_resolution_update
+    python -m src.scripts.benchmark_resolution_update --indexed 20000 --resolve 1000 5000
+    python -m src.scripts.benchmark_resolution_update --pinecone-latency-ms 50 --pinecone-resolve 500
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from src.config import VectorStoreConfig
+from src.tools.vector_backends import PineconeBackend
+from src.tools.vector_store import VectorStore
+
+CHUNKS_PER_LOG = 3
+
+
+class SimulatedPineconeIndex:
+    """Stand-in for a pinecone Index whose update requests take a fixed round-trip time."""
+
+    def __init__(self, latency_ms: float):
+        self.latency_ms = latency_ms
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def update(self, id=None, set_metadata=None, filter=None, metadata=None):
+        with self._lock:
+            self.requests += 1
+        time.sleep(self.latency_ms / 1000)
+
+
+def _build_store(state_dir: str, indexed: int, dimension: int) -> VectorStore:
+    store = VectorStore(config=VectorStoreConfig(backend="local", local_path=os.path.join(state_dir, "index"),
+                                                 embedding_provider="ollama"),
+                        state_dir=state_dir)
+    vectors, documents = [], []
+    for n in range(indexed):
+        vector_id = f"fingerprint-{n}"
+        for i in range(CHUNKS_PER_LOG):
+            chunk_id = f"{vector_id}_{i}"
+            metadata = {"vector_id": vector_id, "chunk_id": chunk_id, "service": f"service-{n % 20}",
+                        "resolution_status": "pending", "resolution_notes": "", "text": f"error {n} chunk {i}"}
+            vectors.append((chunk_id, [random.random() for _ in range(dimension)], metadata))
+            documents.append((chunk_id, metadata["text"], metadata))
+    store.backend.upsert(vectors)
+    store.dedup_index.record([(f"fingerprint-{n}", CHUNKS_PER_LOG) for n in range(indexed)], [])
+    store.keyword_index.add(documents)
+    return store
+
+
+def _per_id_seconds(store: VectorStore, vector_ids, sample: int) -> float:
+    """Seconds per id of the filter path (a metadata filter update per vector id)."""
+    sampled = vector_ids[:sample]
+    started = time.perf_counter()
+    with store.backend.batch():
+        for vector_id in sampled:
+            update = {"resolution_status": "resolved", "resolution_notes": "per-id",
+                      "resolution_timestamp": datetime.utcnow().isoformat()}
+            store.backend.update_metadata({"vector_id": vector_id}, update)
+            store.keyword_index.update_metadata(vector_id, update)
+    return (time.perf_counter() - started) / len(sampled)
+
+
+def _report(store: VectorStore, vector_ids, resolve_counts, per_id: float, index=None) -> None:
+    print(f"{'resolved':>9} {'per-id filter':>14} {'bulk':>8} {'speedup':>8}")
+    for count in resolve_counts:
+        entries = [(vector_id, "resolved", "bulk") for vector_id in random.sample(vector_ids, count)]
+        requests_before = index.requests if index else 0
+        summary = store.update_resolutions(entries)
+        baseline = per_id * count
+        requests = f", {index.requests - requests_before} requests" if index else ""
+        print(f"{count:>9} {baseline:13.2f}s {summary.seconds:7.2f}s {baseline / summary.seconds:7.1f}x"
+              f"  ({summary.count('updated')} updated, {summary.count('failed')} failed{requests})")
+
+
+def run_benchmark(indexed: int, resolve_counts, sample: int, dimension: int,
+                  pinecone_latency_ms: float, pinecone_resolve_counts, update_workers: int) -> None:
+    with tempfile.TemporaryDirectory() as state_dir:
+        print(f"Indexing {indexed} fingerprints ({indexed * CHUNKS_PER_LOG} chunks)...")
+        store = _build_store(state_dir, indexed, dimension)
+        vector_ids = [f"fingerprint-{n}" for n in range(indexed)]
+
+        print("Local backend (both paths persist once per run):")
+        _report(store, vector_ids, resolve_counts, _per_id_seconds(store, vector_ids, sample))
+
+        if pinecone_resolve_counts:
+            index = SimulatedPineconeIndex(pinecone_latency_ms)
+            store.backend = PineconeBackend(index, update_workers=update_workers)
+            print(f"Simulated Pinecone ({pinecone_latency_ms:.0f}ms per request, {update_workers} update workers):")
+            _report(store, vector_ids, pinecone_resolve_counts,
+                    _per_id_seconds(store, vector_ids, min(sample, 20)), index)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark bulk resolution updates against per-id filter updates")
+    parser.add_argument("--indexed", type=int, default=10_000, help="Fingerprints in the index")
+    parser.add_argument("--resolve", type=int, nargs="+", default=[100, 1000, 5000],
+                        help="Fingerprints resolved per run")
+    parser.add_argument("--sample", type=int, default=50, help="Ids timed on the per-id path (then extrapolated)")
+    parser.add_argument("--dimension", type=int, default=32, help="Vector dimension of the synthetic index")
+    parser.add_argument("--pinecone-latency-ms", type=float, default=20, help="Simulated Pinecone round-trip time")
+    parser.add_argument("--pinecone-resolve", type=int, nargs="*", default=[100, 1000],
+                        help="Fingerprints resolved per simulated Pinecone run (none to skip)")
+    parser.add_argument("--update-workers", type=int, default=16, help="Concurrent Pinecone update requests")
+    args = parser.parse_args()
+
+    run_benchmark(args.indexed, args.resolve, args.sample, args.dimension,
+                  args.pinecone_latency_ms, args.pinecone_resolve, args.update_workers)
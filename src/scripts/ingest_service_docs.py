@@ -6,7 +6,7 @@ import re
 from datetime import datetime
 
 from src.models.service_documentation import ServiceDocumentation
-from src.tools.vector_store import vector_store
+from src.tools.vector_store import get_vector_store
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -58,7 +58,7 @@ def ingest_service_docs(docs_dir: str):
                 ))
             
             # Store in vector database
-            vector_store.store_vectors(service_docs)
+            get_vector_store().store_vectors(service_docs)
             logger.info(f"Successfully ingested documentation for {file_path.stem}")
             
     except Exception as e:
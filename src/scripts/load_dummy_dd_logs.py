@@ -7,9 +7,8 @@ from dotenv import load_dotenv
 import ddtrace
 load_dotenv()
 
-from datadog_api_client import ApiClient
 from datadog_api_client.v2.api.logs_api import LogsApi
-from ..config import datadog_config
+from ..tools.datadog_integration import get_datadog_fetcher
 from ..models.error_analysis_state import LogData
 from datetime import datetime
 import logging
@@ -173,9 +172,10 @@ def load_dummy_logs():
         )
     ]
 
-    # First submit logs to Datadog
-    with ApiClient(datadog_config) as api_client:
-        api_instance = LogsApi(api_client)
+    # First submit logs to Datadog over the shared pooled client
+    datadog_fetcher = get_datadog_fetcher()
+    with datadog_fetcher:
+        api_instance = LogsApi(datadog_fetcher.api_client)
         try:
             for log in dummy_logs:
                 # Convert to Datadog log format
@@ -201,8 +201,8 @@ def load_dummy_logs():
                 print(f"Log submitted successfully to Datadog: {log.trace_id}")
 
             # Store logs in vector database for analysis
-            from src.tools.vector_store import vector_store
-            vector_store.store_vectors(dummy_logs)
+            from src.tools.vector_store import get_vector_store
+            get_vector_store().store_vectors(dummy_logs)
             print("Logs stored in vector database for analysis")
                 
         except Exception as e:
@@ -8,7 +8,7 @@ from datetime import datetime, timedelta
 import logging
 from dotenv import load_dotenv
 import ddtrace
-from ..tools.datadog_integration import DatadogLogFetcher
+from ..tools.datadog_integration import get_datadog_fetcher
 
 load_dotenv()
 ddtrace.patch(logging=True)
@@ -17,22 +17,23 @@ def load_logs_to_vectordb():
     """
     Fetch error logs from Datadog and store them in the vector database.
     This function:
-    1. Fetches error logs from the past 24 hours
+    1. Fetches error logs newer than the last successful ingest (or the past 5 hours on the first run)
     2. Converts them to LogData format
-    3. Stores them in Pinecone vector database for analysis
+    3. Stores them in Pinecone vector database for analysis, committing the
+       ingest watermark after each page so a crashed run resumes where it stopped
     """
     try:
-        datadog_fetcher = DatadogLogFetcher()
-        # Fetch and store logs from the past 24 hours
-        logs = datadog_fetcher.fetch_past_error_logs_and_store(hours=5)
+        stored = get_datadog_fetcher().store_new_error_logs(default_hours=5)
         
-        if logs:
-            print(f"Successfully loaded {len(logs)} logs into vector database")
+        if stored:
+            print(f"Successfully loaded {stored} logs into vector database")
         else:
-            print("No logs found in the specified time period")
+            print("No new logs since the last ingest")
             
     except Exception as e:
         print(f"Error loading logs into vector database: {e}")
+    finally:
+        get_datadog_fetcher().close()
 
 if __name__ == "__main__":
     load_logs_to_vectordb()
@@ -0,0 +1,249 @@
+"""
+Local stub HTTP servers used by the benchmark scripts.
+
+The stubs answer the handful of Datadog and Ollama endpoints the tools call with
+small, canned JSON payloads, so latency measurements only reflect client-side
+cost (connection setup, TLS handshakes, serialization, concurrency) and not the
+real services. An optional fixed delay per request stands in for their latency.
+"""
+
+import hashlib
+import json
+import os
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+def _stub_log(index: int) -> dict:
+    # Stamped now, so the log falls inside whatever window was queried
+    timestamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    return {
+        "id": f"stub-log-{index}",
+        "type": "log",
+        "attributes": {
+            "message": "Connection timed out",
+            "service": "api_service",
+            "host": "stub-host",
+            "timestamp": timestamp,
+            "attributes": {
+                "trace_id": "stub-trace",
+                "error": {"code": "ETIMEDOUT", "type": "TimeoutError", "stack": "at connect (network.py:8)"},
+            },
+        },
+    }
+
+
+def _stub_buckets(request: dict) -> list:
+    """Aggregate buckets: a few values per grouped facet, or an hourly timeline and total when ungrouped."""
+    group_by = request.get("group_by") or []
+    if group_by:
+        facet = group_by[0]["facet"]
+        limit = group_by[0].get("limit", 10)
+        return [{"by": {facet: f"stub-{facet.lstrip('@')}-{i}"}, "computes": {"c0": 100 // (i + 1)}}
+                for i in range(min(limit, 3))]
+    hour = int(time.time()) // 3600 * 3600
+    timeline = [{"time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(hour - 3600 * i)), "value": 50 + i}
+                for i in reversed(range(4))]
+    return [{"by": {}, "computes": {"c0": timeline, "c1": sum(point["value"] for point in timeline)}}]
+
+
+class _DatadogStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Allow keep-alive so pooled clients can reuse connections
+    disable_nagle_algorithm = True  # Avoid delayed-ACK stalls on reused connections
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}") if length else {}
+        _delay(self.server)
+
+        if self.path.startswith("/api/v2/logs/events/search"):
+            with self.server.counter_lock:
+                self.server.search_requests += 1
+            body = {"data": [_stub_log(0)], "meta": {"page": {}}}
+            self._send_json(200, body)
+        elif self.path.startswith("/api/v2/logs/analytics/aggregate"):
+            self._send_json(200, {"data": {"buckets": _stub_buckets(request)}, "meta": {"status": "done"}})
+        elif self.path.startswith("/api/v2/logs"):
+            self._send_json(202, {})
+        else:
+            self._send_json(404, {"errors": [f"Unknown stub path {self.path}"]})
+
+    def _send_json(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _OllamaStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    ANALYSIS = json.dumps({
+        "analysis": "Stub analysis of the error.",
+        "possible_causes": ["Stub cause"],
+        "recommendations": ["Stub recommendation"],
+    })
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}") if length else {}
+        _delay(self.server)
+
+        if self.path.startswith("/api/chat"):
+            self._chat(request)
+        elif self.path.startswith("/api/embed"):
+            inputs = request.get("input") or []
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            self._send_json({"model": request.get("model"), "embeddings": [self._embed(text) for text in inputs]})
+        else:
+            self._send_json({"error": f"Unknown stub path {self.path}"}, status=404)
+
+    def _chat(self, request: dict) -> None:
+        message = {"model": request.get("model"), "created_at": "2024-02-15T12:34:56Z",
+                   "message": {"role": "assistant", "content": self.ANALYSIS}}
+        done = {"model": request.get("model"), "created_at": "2024-02-15T12:34:56Z",
+                "message": {"role": "assistant", "content": ""}, "done": True, "done_reason": "stop"}
+        if not request.get("stream", True):
+            self._send_json({**message, "done": True, "done_reason": "stop"})
+            return
+        # Streamed chat responses are newline-delimited JSON chunks, a few characters each like real tokens
+        pieces = [self.ANALYSIS[i:i + 8] for i in range(0, len(self.ANALYSIS), 8)]
+        lines = [json.dumps({**message, "message": {"role": "assistant", "content": piece}, "done": False})
+                 for piece in pieces]
+        payload = ("\n".join(lines + [json.dumps(done)]) + "\n").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _embed(self, text: str) -> list:
+        """Deterministic pseudo-embedding so identical texts map to identical vectors."""
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [(byte - 128) / 128 for byte in digest[:self.server.dimension]]
+
+    def _send_json(self, body: dict, status: int = 200) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _delay(server) -> None:
+    latency_ms = getattr(server, "latency_ms", 0)
+    if latency_ms:
+        time.sleep(latency_ms / 1000)
+
+
+def _self_signed_context(workdir: str) -> ssl.SSLContext:
+    """Create a throwaway self-signed certificate for 127.0.0.1 using openssl."""
+    cert_path = os.path.join(workdir, "cert.pem")
+    key_path = os.path.join(workdir, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+         "-keyout", key_path, "-out", cert_path, "-days", "1", "-subj", "/CN=127.0.0.1"],
+        check=True,
+        capture_output=True,
+    )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path, key_path)
+    return context
+
+
+class _ThreadingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Accept bursts of concurrent connections without resets
+
+
+class _StubServer:
+    """Threaded stub HTTP server on an ephemeral port, optionally served over TLS."""
+
+    handler = BaseHTTPRequestHandler
+
+    def __init__(self, tls: bool = False, latency_ms: float = 0):
+        self.tls = tls
+        self.latency_ms = latency_ms
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._workdir: Optional[tempfile.TemporaryDirectory] = None
+
+    @property
+    def url(self) -> str:
+        scheme = "https" if self.tls else "http"
+        host, port = self._server.server_address[:2]
+        return f"{scheme}://{host}:{port}"
+
+    def start(self):
+        self._server = _ThreadingServer(("127.0.0.1", 0), self.handler)
+        self._configure(self._server)
+        if self.tls:
+            self._workdir = tempfile.TemporaryDirectory()
+            context = _self_signed_context(self._workdir.name)
+            self._server.socket = context.wrap_socket(self._server.socket, server_side=True)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def _configure(self, server: ThreadingHTTPServer) -> None:
+        server.latency_ms = self.latency_ms
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._workdir is not None:
+            self._workdir.cleanup()
+            self._workdir = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+
+class DatadogStubServer(_StubServer):
+    """Threaded stub of the Datadog logs API, optionally served over TLS."""
+
+    handler = _DatadogStubHandler
+
+    def _configure(self, server: ThreadingHTTPServer) -> None:
+        super()._configure(server)
+        server.search_requests = 0
+        server.counter_lock = threading.Lock()
+
+    @property
+    def search_requests(self) -> int:
+        """Log search requests served so far."""
+        return self._server.search_requests
+
+
+class OllamaStubServer(_StubServer):
+    """Threaded stub of the Ollama chat and embed endpoints."""
+
+    handler = _OllamaStubHandler
+
+    def __init__(self, latency_ms: float = 0, dimension: int = 32):
+        super().__init__(tls=False, latency_ms=latency_ms)
+        self.dimension = dimension
+
+    def _configure(self, server: ThreadingHTTPServer) -> None:
+        super()._configure(server)
+        server.dimension = self.dimension
@@ -0,0 +1,279 @@
+# src/service/analysis_service.py
+
+"""
+Resident HTTP service that keeps the analysis stack warm between requests.
+
+The compiled workflow, the LLM clients, the pooled Datadog fetcher and the
+vector store are created once at startup, so a request only pays for the
+analysis itself. Requests wait in a bounded queue served by a fixed number of
+workers; when the queue is full new requests are rejected with 503 instead of
+piling up. On shutdown the service stops accepting work and drains the queue.
+
+Identical errors (same code, normalized message and service) are coalesced
+before they are queued: concurrent repeats share one in-flight analysis and
+repeats within the coalescing TTL get its finished result, so an alert storm
+costs one LLM call per distinct error.
+
+Endpoints:
+    POST /analyze          ErrorQuery JSON -> ErrorAnalysisOutput JSON
+    POST /analyze/stream   ErrorQuery JSON -> NDJSON events: the analysis and each
+                           possible cause / recommendation as the LLM completes
+                           them, then {"field": "result", "output": ...}
+    GET  /health           Status, queue depth and counters (503 while draining)
+"""
+
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+from pydantic import ValidationError
+
+from src.config import AnalysisServiceConfig, CoalescingConfig, analysis_service_config, coalescing_config
+from src.graph.datadog_error_monitoring import dd_error_workflow, initial_state
+from src.models.error_analysis_state import ErrorAnalysisOutput, ErrorQuery
+from src.tools.datadog_integration import get_datadog_fetcher
+from src.tools.error_analysis import analysis_failure_message, get_chain, get_llm, parse_stats
+from src.tools.single_flight import SingleFlight, incident_signature
+from src.tools.tool_selection import get_tool_router
+from src.tools.vector_store import get_vector_store
+
+
+class ServiceBusy(Exception):
+    """Raised when a request cannot be queued (queue full or service draining)."""
+
+
+class AnalysisService:
+    """Bounded request queue in front of a fixed pool of workflow workers."""
+
+    def __init__(self,
+                 config: AnalysisServiceConfig = analysis_service_config,
+                 coalescing: CoalescingConfig = coalescing_config):
+        self.config = config
+        self.single_flight = SingleFlight(coalescing.ttl_seconds, coalescing.max_entries) if coalescing.enabled else None
+        self.draining = False
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.started_at: Optional[float] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self, app: Optional[web.Application] = None) -> None:
+        """Build the shared clients, start the workers (on the serving event loop) and warm up the LLM."""
+        # Clients are created lazily on first use; build them now so the first request does not pay for it
+        await asyncio.to_thread(_build_clients)
+        self._queue = asyncio.Queue(maxsize=self.config.queue_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.config.concurrency)]
+        self.started_at = time.time()
+        if self.config.warm_up:
+            await self._warm_up()
+
+    async def submit(self, error_query: ErrorQuery) -> ErrorAnalysisOutput:
+        """Queue an analysis (or join an identical one) and wait for its result, up to the request timeout."""
+        if self.draining:
+            self.rejected += 1
+            raise ServiceBusy("Service is shutting down")
+
+        if self.single_flight is None:
+            analysis = self._enqueue(error_query)
+        else:
+            key = incident_signature(error_query.code, error_query.message, error_query.service)
+            analysis = self.single_flight.run(key, lambda: self._enqueue(error_query))
+        return await asyncio.wait_for(analysis, timeout=self.config.request_timeout_seconds)
+
+    async def submit_streaming(self, error_query: ErrorQuery) -> Tuple[asyncio.Future, asyncio.Queue]:
+        """
+        Queue an analysis whose partial output is pushed to an event queue.
+
+        Returns the result future and the queue of stream events, which ends with
+        None once the analysis has finished. Streaming requests are not coalesced.
+        """
+        if self.draining:
+            self.rejected += 1
+            raise ServiceBusy("Service is shutting down")
+
+        events: asyncio.Queue = asyncio.Queue()
+        future = self._put(error_query, events)
+        return future, events
+
+    async def _enqueue(self, error_query: ErrorQuery) -> ErrorAnalysisOutput:
+        return await self._put(error_query)
+
+    def _put(self, error_query: ErrorQuery, events: Optional[asyncio.Queue] = None) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((error_query, future, events))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise ServiceBusy(f"Analysis queue is full ({self.config.queue_size} waiting)")
+        return future
+
+    async def drain(self, app: Optional[web.Application] = None) -> None:
+        """Stop accepting work, let queued and running analyses finish, then stop the workers."""
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.config.drain_timeout_seconds)
+        except asyncio.TimeoutError:
+            print(f"Error draining analysis queue: {self._queue.qsize()} queued and "
+                  f"{self.in_flight} running analyses abandoned")
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await get_datadog_fetcher().aclose()
+
+    def health(self) -> Dict:
+        return {
+            "status": "draining" if self.draining else "ok",
+            "queued": self._queue.qsize() if self._queue else 0,
+            "in_flight": self.in_flight,
+            "concurrency": self.config.concurrency,
+            "queue_size": self.config.queue_size,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "uptime_seconds": round(time.time() - self.started_at, 1) if self.started_at else 0.0,
+            "coalescing": self.single_flight.stats() if self.single_flight else None,
+            "structured_output": parse_stats.stats(),
+            "trace_log_cache": self._trace_cache_stats(),
+        }
+
+    def _trace_cache_stats(self) -> Optional[Dict]:
+        if not get_datadog_fetcher.built() or get_datadog_fetcher().trace_cache is None:
+            return None
+        return get_datadog_fetcher().trace_cache.stats()
+
+    async def _worker(self) -> None:
+        while True:
+            error_query, future, events = await self._queue.get()
+            try:
+                if future.done():  # Abandoned while queued
+                    continue
+                self.in_flight += 1
+                try:
+                    final_state = await self._run(error_query, events)
+                    analysis_output = final_state.get("analysis_output")
+                    if analysis_output is None:
+                        raise RuntimeError("Workflow produced no analysis")
+                    # The workflow turns analysis errors into a placeholder output; fail the request
+                    # instead, so it is counted as failed and never cached for coalesced repeats
+                    failure = analysis_failure_message(analysis_output)
+                    if failure is not None:
+                        raise RuntimeError(failure)
+                    self.completed += 1
+                    if not future.done():
+                        future.set_result(analysis_output)
+                except Exception as e:
+                    self.failed += 1
+                    print(f"Error analyzing queued error: {e}")
+                    if not future.done():
+                        future.set_exception(e)
+                finally:
+                    self.in_flight -= 1
+                    if events is not None:
+                        events.put_nowait(None)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, error_query: ErrorQuery, events: Optional[asyncio.Queue]) -> Dict:
+        """Run the workflow, forwarding its partial analysis to `events` when streaming."""
+        if events is None:
+            return await dd_error_workflow.ainvoke(initial_state(error_query))
+
+        final_state = {}
+        async for mode, chunk in dd_error_workflow.astream(initial_state(error_query),
+                                                           stream_mode=["custom", "values"]):
+            if mode == "values":
+                final_state = chunk
+            else:
+                events.put_nowait(chunk)
+        return final_state
+
+    async def _warm_up(self) -> None:
+        """Load the model into memory so the first real request does not pay for it."""
+        try:
+            await get_llm().ainvoke("Reply with OK.")
+        except Exception as e:
+            print(f"Error warming up the LLM: {e}")
+
+
+def _build_clients() -> None:
+    get_chain()
+    get_tool_router()
+    get_datadog_fetcher()
+    get_vector_store()
+
+
+def create_app(service: Optional[AnalysisService] = None) -> web.Application:
+    """Build the aiohttp application around an AnalysisService."""
+    service = service or AnalysisService()
+    routes = web.RouteTableDef()
+
+    @routes.post("/analyze")
+    async def analyze(request: web.Request) -> web.Response:
+        try:
+            error_query = ErrorQuery(**await request.json())
+        except (json.JSONDecodeError, ValidationError, TypeError) as e:
+            return web.json_response({"error": f"Invalid ErrorQuery: {e}"}, status=400)
+
+        try:
+            analysis_output = await service.submit(error_query)
+        except ServiceBusy as e:
+            return web.json_response({"error": str(e)}, status=503, headers={"Retry-After": "1"})
+        except asyncio.TimeoutError:
+            return web.json_response({"error": "Analysis timed out"}, status=504)
+        except Exception as e:
+            return web.json_response({"error": f"Analysis failed: {e}"}, status=500)
+        return web.json_response(analysis_output.model_dump())
+
+    @routes.post("/analyze/stream")
+    async def analyze_stream(request: web.Request) -> web.StreamResponse:
+        try:
+            error_query = ErrorQuery(**await request.json())
+        except (json.JSONDecodeError, ValidationError, TypeError) as e:
+            return web.json_response({"error": f"Invalid ErrorQuery: {e}"}, status=400)
+
+        try:
+            future, events = await service.submit_streaming(error_query)
+        except ServiceBusy as e:
+            return web.json_response({"error": str(e)}, status=503, headers={"Retry-After": "1"})
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        try:
+            async with asyncio.timeout(service.config.request_timeout_seconds):
+                while (event := await events.get()) is not None:
+                    await response.write((json.dumps(event) + "\n").encode())
+                analysis_output = await future
+            final = {"field": "result", "output": analysis_output.model_dump()}
+        except asyncio.TimeoutError:
+            final = {"field": "error", "error": "Analysis timed out"}
+        except Exception as e:
+            final = {"field": "error", "error": f"Analysis failed: {e}"}
+        finally:
+            if not future.done():
+                future.cancel()  # Client went away or timed out; let the worker skip it
+        await response.write((json.dumps(final) + "\n").encode())
+        await response.write_eof()
+        return response
+
+    @routes.get("/health")
+    async def health(request: web.Request) -> web.Response:
+        return web.json_response(service.health(), status=503 if service.draining else 200)
+
+    app = web.Application()
+    app.add_routes(routes)
+    app["analysis_service"] = service
+    app.on_startup.append(service.start)
+    app.on_shutdown.append(service.drain)
+    return app
+
+
+def run_service(config: AnalysisServiceConfig = analysis_service_config) -> None:
+    """Serve until SIGINT/SIGTERM, then drain queued work before exiting."""
+    app = create_app(AnalysisService(config))
+    web.run_app(app, host=config.host, port=config.port, shutdown_timeout=config.drain_timeout_seconds)
@@ -0,0 +1,228 @@
+# src/tools/context_budget.py
+
+import re
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from src.config import ContextBudgetConfig, context_budget_config
+from src.models.error_analysis_state import ErrorLogSummary, LogData
+from src.tools.error_signature import is_stack_frame, normalize_message
+from src.tools.ingest_state import parse_log_timestamp
+from src.tools.keyword_index import tokenize
+
+# Frames from dependencies and the runtime rarely explain an application error
+_LIBRARY_FRAME = re.compile(r"node_modules|site-packages|dist-packages|<frozen |\(node:|\binternal/|/lib/python\d")
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Rough token count (about four characters per token for English and code)."""
+    return (len(text) + 3) // 4 if text else 0
+
+
+_TRUNCATED = " ...[truncated]"
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most `max_tokens`, marking the cut when the budget has room for the marker."""
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    keep = max_tokens * 4 - len(_TRUNCATED)
+    if keep <= 0:
+        return text[:max_tokens * 4].rstrip()
+    return text[:keep].rstrip() + _TRUNCATED
+
+
+class ContextReport(BaseModel):
+    """What the context assembly kept and dropped to fit the token budget."""
+    budget_tokens: int = 0
+    section_tokens: Dict[str, int] = Field(default_factory=dict)
+    stack_frames_dropped: int = 0
+    historical_dropped: int = 0
+    logs_received: int = 0
+    logs_collapsed: int = Field(default=0, description="Repeats folded into another log line")
+    logs_dropped: int = Field(default=0, description="Distinct log lines left out for budget")
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self.section_tokens.values())
+
+    @property
+    def dropped_anything(self) -> bool:
+        return bool(self.stack_frames_dropped or self.historical_dropped or self.logs_dropped)
+
+    def summary(self) -> str:
+        return (f"Context {self.total_tokens}/{self.budget_tokens} tokens: "
+                f"dropped {self.stack_frames_dropped} stack frames, {self.historical_dropped} historical errors, "
+                f"{self.logs_dropped} of {self.logs_received - self.logs_collapsed} distinct related logs "
+                f"({self.logs_collapsed} repeats collapsed)")
+
+
+def truncate_stack_trace(stack_trace: str, max_frames: int, max_tokens: int) -> Tuple[str, int]:
+    """
+    Keep the exception lines and the meaningful frames of a stack trace.
+
+    Library and runtime frames go first; if application frames still exceed
+    `max_frames`, the outermost and innermost ones are kept (covering both
+    innermost-first and innermost-last trace formats). Returns the trace and
+    the number of frames dropped.
+    """
+    # Group each frame with the source lines printed under it (Python tracebacks)
+    blocks: List[Tuple[bool, List[str]]] = []
+    for line in stack_trace.strip().splitlines():
+        if is_stack_frame(line):
+            blocks.append((True, [line]))
+        elif blocks and blocks[-1][0] and line.startswith((" ", "\t")) and not line.strip().startswith("at "):
+            blocks[-1][1].append(line)
+        else:
+            blocks.append((False, [line]))
+
+    frames = [i for i, (is_frame, _) in enumerate(blocks) if is_frame]
+    keep = [i for i in frames if not _LIBRARY_FRAME.search(blocks[i][1][0])]
+    if len(keep) > max_frames:
+        head = max_frames // 2
+        keep = keep[:head] + keep[len(keep) - (max_frames - head):]
+    keep = set(keep)
+
+    lines, omitted = [], 0
+    for i, (is_frame, block) in enumerate(blocks):
+        if is_frame and i not in keep:
+            omitted += 1
+            continue
+        if omitted:
+            lines.append(f"    ... {omitted} frames omitted")
+            omitted = 0
+        lines.extend(block)
+    if omitted:
+        lines.append(f"    ... {omitted} frames omitted")
+
+    return truncate_to_tokens("\n".join(lines), max_tokens), len(frames) - len(keep)
+
+
+def rank_related_logs(logs: List[LogData],
+                      error_message: str,
+                      stack_trace: Optional[str] = None,
+                      trace_id: Optional[str] = None,
+                      service: Optional[str] = None) -> List[Tuple[LogData, int]]:
+    """
+    Collapse repeated log lines and order the rest by relevance to the error.
+
+    Repeats share a service and normalized message; the most recent one stands
+    for the group together with its count. Relevance is keyword overlap with the
+    error message and stack trace, plus a bonus when the group contains the
+    error's trace or shares its service; recency breaks ties.
+    """
+    groups: "OrderedDict[Tuple[str, str], List[LogData]]" = OrderedDict()
+    for log in logs:
+        groups.setdefault((log.service, normalize_message(log.message)), []).append(log)
+
+    error_terms = set(tokenize(f"{error_message} {stack_trace or ''}"))
+    scored = []
+    for group in groups.values():
+        latest = max(group, key=lambda log: parse_log_timestamp(log) or datetime.min)
+        terms = set(tokenize(f"{latest.message} {latest.error_type} {latest.error_code}"))
+        relevance = len(terms & error_terms) / (len(terms) or 1)
+        if trace_id and any(log.trace_id == trace_id for log in group):
+            relevance += 1.0
+        if service and latest.service == service:
+            relevance += 0.5
+        scored.append((relevance, parse_log_timestamp(latest) or datetime.min, latest, len(group)))
+
+    scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+    return [(log, count) for _, _, log, count in scored]
+
+
+def format_related_log(log: LogData, count: int) -> str:
+    repeats = f" (x{count})" if count > 1 else ""
+    return f"[{log.timestamp}] {log.service}: {log.message}{repeats}"
+
+
+def format_log_summary(summary: ErrorLogSummary) -> str:
+    """Compact text of an error log summary: the total, the top values of each facet and the timeline."""
+    def top(counts) -> str:
+        return ", ".join(f"{count.value} ({count.count})" for count in counts) or "none"
+
+    lines = [
+        f"{summary.total} logs matching {summary.query} in the last {summary.hours}h",
+        f"Top services: {top(summary.services)}",
+        f"Top error types: {top(summary.error_types)}",
+        f"Top error codes: {top(summary.error_codes)}",
+    ]
+    if summary.timeline:
+        lines.append(f"Count per {summary.interval}: "
+                     + ", ".join(f"{bucket.time} {bucket.count}" for bucket in summary.timeline))
+    return "\n".join(lines)
+
+
+def assemble_context(error_message: str,
+                     stack_trace: Optional[str],
+                     historical_entries: List[str],
+                     related_logs: List[LogData],
+                     trace_id: Optional[str] = None,
+                     service: Optional[str] = None,
+                     log_summary: Optional[ErrorLogSummary] = None,
+                     config: ContextBudgetConfig = context_budget_config) -> Tuple[Dict[str, str], ContextReport]:
+    """
+    Fit the prompt's variable sections into the token budget.
+
+    Sections are filled in priority order: the error message, the stack trace
+    (trimmed to meaningful frames), historical errors (best matches first, up to
+    their own cap), the error log summary and finally related logs
+    (deduplicated and ranked) in whatever budget remains. Returns the section
+    texts and a report of what was dropped.
+    """
+    report = ContextReport(budget_tokens=config.total_tokens, logs_received=len(related_logs))
+    remaining = config.total_tokens
+
+    message = truncate_to_tokens(error_message, min(max(remaining // 4, 1), remaining))
+    report.section_tokens["error_message"] = estimate_tokens(message)
+    remaining -= report.section_tokens["error_message"]
+
+    stack_text = ""
+    if stack_trace:
+        stack_text, report.stack_frames_dropped = truncate_stack_trace(
+            stack_trace, config.max_stack_frames, min(config.stack_trace_tokens, remaining)
+        )
+    report.section_tokens["stack_trace"] = estimate_tokens(stack_text)
+    remaining -= report.section_tokens["stack_trace"]
+
+    kept_history, used = [], 0
+    history_budget = min(config.historical_tokens, remaining)
+    for entry in historical_entries:
+        tokens = estimate_tokens(entry) + 1
+        if used + tokens > history_budget:
+            report.historical_dropped += 1
+            continue
+        kept_history.append(entry)
+        used += tokens
+    report.section_tokens["historical_data"] = used
+    remaining -= used
+
+    summary_text = truncate_to_tokens(format_log_summary(log_summary), remaining) if log_summary else ""
+    report.section_tokens["log_summary"] = estimate_tokens(summary_text)
+    remaining -= report.section_tokens["log_summary"]
+
+    ranked = rank_related_logs(related_logs, error_message, stack_trace, trace_id, service)
+    report.logs_collapsed = len(related_logs) - len(ranked)
+    kept_logs, used = [], 0
+    for log, count in ranked:
+        line = format_related_log(log, count)
+        tokens = estimate_tokens(line) + 1
+        if used + tokens > remaining:
+            report.logs_dropped += 1
+            continue
+        kept_logs.append(line)
+        used += tokens
+    report.section_tokens["related_logs"] = used
+
+    return {
+        "error_message": message,
+        "stack_trace": stack_text,
+        "historical_data": "\n".join(kept_history),
+        "log_summary": summary_text,
+        "related_logs": "\n".join(kept_logs),
+    }, report
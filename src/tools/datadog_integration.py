@@ -1,87 +1,606 @@
 # src/tools/datadog_integration.py
 
-from datadog_api_client import ApiClient, Configuration
-from datadog_api_client.v2.api.logs_api import LogsApi
-from datadog_api_client.v2.models import LogsSort, LogsListRequest, LogsQueryFilter
+import asyncio
+import atexit
+import copy
+import functools
+import json
+import os
+import socket
+import threading
+
 from datetime import datetime, timedelta
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict
+from typing import TYPE_CHECKING, Optional, List, Dict, Iterator, AsyncIterator, Tuple
+
+from src.config import datadog_fetch_config, get_datadog_config, local_state_config, trace_log_cache_config
+from src.models.error_analysis_state import ErrorLogSummary, FacetCount, LogData, TimeBucket
+from src.tools.ingest_state import IngestWatermark, WatermarkStore, parse_timestamp
+from src.tools.lazy import lazy_singleton
+from src.tools.log_batch import LogBatch
+from src.tools.single_flight import SingleFlight
+from src.tools.trace_log_cache import TraceLogCache, TraceLogEntry
+
+if TYPE_CHECKING:
+    import aiohttp
+    from datadog_api_client import ApiClient
+    from datadog_api_client.v2.model.logs_aggregate_request import LogsAggregateRequest
+    from datadog_api_client.v2.model.logs_list_request import LogsListRequest
+    from datadog_api_client.v2.model.logs_query_filter import LogsQueryFilter
+    from datadog_api_client.v2.model.logs_sort import LogsSort
+
+
+# ErrorLogSummary fields and the Datadog facets they count logs by
+SUMMARY_FACETS = {"services": "service", "error_types": "@error.type", "error_codes": "@error.code"}
+
+
+@functools.lru_cache(maxsize=None)
+def _pooled_api_client_class():
+    """
+    ApiClient whose urllib3 pool holds `pool_size` connections per host.
 
-from src.config import datadog_config
-from src.models.error_analysis_state import LogData
-from src.tools.vector_store import vector_store
+    ApiClient ignores `Configuration.connection_pool_maxsize` and builds its
+    RESTClientObject with urllib3's default of 4, so the pool size is passed
+    in here. Defined on first use to keep datadog_api_client out of import time.
+    """
+    from datadog_api_client import ApiClient
+    from datadog_api_client.rest import RESTClientObject
+
+    class PooledApiClient(ApiClient):
+        def __init__(self, configuration, pool_size: int):
+            self.pool_size = pool_size
+            super().__init__(configuration)
+
+        def _build_rest_client(self):
+            return RESTClientObject(self.configuration, maxsize=self.pool_size)
+
+    return PooledApiClient
 
 
 class DatadogLogFetcher:
-    def __init__(self, config=datadog_config):
-        self.config = config
+    """
+    Datadog logs client shared by the workflow, the analysis tools and the ingest scripts.
+
+    datadog_api_client and aiohttp are imported when the first request is made,
+    and only the model modules a logs query needs are loaded (the
+    `datadog_api_client.v2.models` package imports every model, which takes
+    seconds).
+    """
+
+    def __init__(self,
+                 config=None,
+                 page_size: int = datadog_fetch_config.page_size,
+                 pool_size: int = datadog_fetch_config.pool_size,
+                 keep_alive: bool = datadog_fetch_config.keep_alive,
+                 trace_cache_config=trace_log_cache_config,
+                 summary_top: int = datadog_fetch_config.summary_top,
+                 summary_interval: str = datadog_fetch_config.summary_interval,
+                 ingest_lag_seconds: float = datadog_fetch_config.ingest_lag_seconds):
+        self.config = config or get_datadog_config()
+        self.page_size = page_size
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.summary_top = summary_top
+        self.summary_interval = summary_interval
+        self.ingest_lag = timedelta(seconds=ingest_lag_seconds)
+        self._api_client: Optional["ApiClient"] = None
+        self._client_lock = threading.Lock()
+        self._async_sessions: Dict[asyncio.AbstractEventLoop, "aiohttp.ClientSession"] = {}
+
+        # Logs already fetched per trace id, so repeated analyses of a trace only query what is new
+        self.trace_cache: Optional[TraceLogCache] = None
+        if trace_cache_config.enabled:
+            self.trace_cache = TraceLogCache(
+                refresh_seconds=trace_cache_config.refresh_seconds,
+                ttl_seconds=trace_cache_config.ttl_seconds,
+                lag_seconds=trace_cache_config.lag_seconds,
+                max_entries=trace_cache_config.max_entries,
+                path=os.path.join(local_state_config.state_dir, "trace_log_cache.sqlite")
+                if trace_cache_config.persist else None,
+            )
+        # Concurrent fetches of one trace wait for each other instead of querying twice
+        self._trace_locks = [threading.Lock() for _ in range(64)]
+        self._trace_flights = SingleFlight(ttl_seconds=0)
+
+    @property
+    def api_client(self) -> "ApiClient":
+        """
+        Long-lived, pooled ApiClient shared by every query issued by this fetcher.
+
+        The client is created on first use and keeps its HTTP connection pool
+        (and TLS sessions) open until `close()` is called. The underlying
+        urllib3 pool is thread-safe, so one fetcher can serve concurrent callers.
+        """
+        if self._api_client is None:
+            with self._client_lock:
+                if self._api_client is None:
+                    # The Configuration may be shared (get_datadog_config), so tune a copy of it
+                    config = copy.deepcopy(self.config)
+                    if self.keep_alive:
+                        from urllib3.connection import HTTPConnection
+                        config.socket_options = HTTPConnection.default_socket_options + [
+                            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+                        ]
+                    self._api_client = _pooled_api_client_class()(config, self.pool_size)
+        return self._api_client
+
+    async def async_session(self) -> "aiohttp.ClientSession":
+        """
+        Pooled aiohttp session for the async methods, bound to the running event loop.
+
+        aiohttp sessions cannot be shared across event loops, so one is kept per
+        loop. Sessions left behind by loops that have since closed (one per
+        `asyncio.run`) are closed here, before a new one is opened.
+        """
+        loop = asyncio.get_running_loop()
+        session = self._async_sessions.get(loop)
+        if session is not None and not session.closed:
+            return session
+
+        with self._client_lock:
+            stale = [self._async_sessions.pop(other) for other in list(self._async_sessions)
+                     if other is loop or other.is_closed()]
+        for old_session in stale:
+            # The connections of a closed loop are already gone; this only releases the connector
+            await old_session.close()
+
+        import aiohttp
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            force_close=not self.keep_alive,
+            ssl=None if self.config.verify_ssl else False,
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            headers={
+                "DD-API-KEY": self.config.api_key.get("apiKeyAuth") or "",
+                "DD-APPLICATION-KEY": self.config.api_key.get("appKeyAuth") or "",
+                "Accept": "application/json",
+            },
+            raise_for_status=True,
+        )
+        with self._client_lock:
+            self._async_sessions[loop] = session
+        return session
+
+    def close(self) -> None:
+        """Close the pooled ApiClient and release its connections."""
+        with self._client_lock:
+            if self._api_client is not None:
+                self._api_client.close()
+                self._api_client = None
+
+    async def aclose(self) -> None:
+        """
+        Close the aiohttp session of the running event loop, and those of loops that have closed.
+
+        Sessions of loops still running in other threads are left to those loops.
+        """
+        loop = asyncio.get_running_loop()
+        with self._client_lock:
+            sessions = [self._async_sessions.pop(other) for other in list(self._async_sessions)
+                        if other is loop or other.is_closed()]
+        for session in sessions:
+            await session.close()
+
+    def __enter__(self) -> "DatadogLogFetcher":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
 
 
     def fetch_logs_by_trace_id(self, trace_id: str, hours: int = 1) -> List[LogData]:
-        """Fetch logs associated with a specific trace ID from Datadog."""
-        start_time = datetime.utcnow() - timedelta(hours=hours)
-        return self._execute_query(f"@trace_id:{trace_id}", start_time)
+        """
+        Fetch logs associated with a specific trace ID from Datadog.
+
+        With the trace cache, a trace fetched within the refresh interval is
+        served from memory, and later requests only query the time ranges not
+        covered yet (typically the minutes since the last fetch).
+        """
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(hours=hours)
+        query = f"@trace_id:{trace_id}"
+        if self.trace_cache is None:
+            return self._execute_query(query, start_time, end_time)
+
+        with self._trace_locks[hash(trace_id) % len(self._trace_locks)]:
+            entry = self.trace_cache.get(trace_id)
+            windows = self.trace_cache.missing_windows(entry, start_time, end_time)
+            try:
+                if windows:
+                    logs = [log for window in windows for log in self._execute_query(query, *window, strict=True)]
+                    entry = self.trace_cache.merge(trace_id, entry, logs, windows)
+            except Exception as e:
+                print(f"Error fetching logs: {e}")
+        return self.trace_cache.select(entry, start_time, end_time) if entry else []
+
+    async def afetch_logs_by_trace_id(self, trace_id: str, hours: int = 1) -> List[LogData]:
+        """
+        Async variant of `fetch_logs_by_trace_id` using non-blocking HTTP.
 
+        Concurrent calls for the same trace share one Datadog query.
+        """
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(hours=hours)
+        query = f"@trace_id:{trace_id}"
+        if self.trace_cache is None:
+            return await self._aexecute_query(query, start_time, end_time)
+
+        entry = await self._trace_flights.run(f"{trace_id}\0{hours}", lambda: self._arefresh_trace(
+            trace_id, query, start_time, end_time))
+        return self.trace_cache.select(entry, start_time, end_time) if entry else []
+
+    async def _arefresh_trace(self, trace_id: str, query: str,
+                              start_time: datetime, end_time: datetime) -> Optional[TraceLogEntry]:
+        """Query the ranges of a trace not covered by its cache entry and merge them in."""
+        entry = self.trace_cache.get(trace_id)
+        windows = self.trace_cache.missing_windows(entry, start_time, end_time)
+        try:
+            if windows:
+                logs = []
+                for window in windows:
+                    logs.extend(await self._aexecute_query(query, *window, strict=True))
+                entry = self.trace_cache.merge(trace_id, entry, logs, windows)
+        except Exception as e:
+            print(f"Error fetching logs: {e}")
+        return entry
 
 
-    def fetch_past_error_logs_and_store(self, hours: int = 24) -> List[LogData]:
+    def summarize_error_logs(self, hours: int = 24, query: str = "@status:error") -> Optional[ErrorLogSummary]:
+        """
+        Summarize the logs matching `query` over the last `hours` without fetching them.
+
+        Datadog's aggregate endpoint counts the logs server side: the total, the
+        top `summary_top` services, error types and error codes, and the count
+        per `summary_interval` bucket. The summary is a few hundred bytes however
+        many logs match. Returns None if an aggregation fails.
+        """
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(hours=hours)
+        try:
+            from datadog_api_client.v2.api.logs_api import LogsApi
+            api_instance = LogsApi(self.api_client)
+            responses = {name: api_instance.aggregate_logs(body=request).to_dict()
+                         for name, request in self._summary_requests(query, start_time, end_time).items()}
+        except Exception as e:
+            print(f"Error aggregating logs: {e}")
+            return None
+        return self._to_summary(query, hours, responses)
+
+    async def asummarize_error_logs(self, hours: int = 24, query: str = "@status:error") -> Optional[ErrorLogSummary]:
+        """Async variant of `summarize_error_logs`; the aggregations run concurrently."""
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(hours=hours)
+        url = f"{self.config.host}/api/v2/logs/analytics/aggregate"
+        from datadog_api_client.model_utils import data_to_dict
+
+        async def aggregate(request: "LogsAggregateRequest") -> Dict:
+            session = await self.async_session()
+            async with session.post(url, json=data_to_dict(request)) as http_response:
+                return json.loads(await http_response.text())
+
+        try:
+            requests = self._summary_requests(query, start_time, end_time)
+            results = await asyncio.gather(*(aggregate(request) for request in requests.values()))
+        except Exception as e:
+            print(f"Error aggregating logs: {e}")
+            return None
+        return self._to_summary(query, hours, dict(zip(requests, results)))
+
+    def _summary_requests(self, query: str, start_time: datetime,
+                          end_time: datetime) -> Dict[str, "LogsAggregateRequest"]:
+        """One aggregate request per summary facet, plus one for the total and the timeline."""
+        from datadog_api_client.v2.model.logs_aggregate_request import LogsAggregateRequest
+        from datadog_api_client.v2.model.logs_aggregate_sort import LogsAggregateSort
+        from datadog_api_client.v2.model.logs_aggregate_sort_type import LogsAggregateSortType
+        from datadog_api_client.v2.model.logs_aggregation_function import LogsAggregationFunction
+        from datadog_api_client.v2.model.logs_compute import LogsCompute
+        from datadog_api_client.v2.model.logs_compute_type import LogsComputeType
+        from datadog_api_client.v2.model.logs_group_by import LogsGroupBy
+        from datadog_api_client.v2.model.logs_sort_order import LogsSortOrder
+        count = LogsAggregationFunction.COUNT
+        requests = {
+            name: LogsAggregateRequest(
+                filter=self._query_filter(query, start_time, end_time),
+                compute=[LogsCompute(aggregation=count, type=LogsComputeType.TOTAL)],
+                group_by=[LogsGroupBy(facet=facet, limit=self.summary_top, sort=LogsAggregateSort(
+                    aggregation=count, order=LogsSortOrder.DESCENDING, type=LogsAggregateSortType.MEASURE
+                ))],
+            )
+            for name, facet in SUMMARY_FACETS.items()
+        }
+        # Ungrouped, so c0 is the timeline and c1 the total
+        requests["timeline"] = LogsAggregateRequest(
+            filter=self._query_filter(query, start_time, end_time),
+            compute=[LogsCompute(aggregation=count, type=LogsComputeType.TIMESERIES, interval=self.summary_interval),
+                     LogsCompute(aggregation=count, type=LogsComputeType.TOTAL)],
+        )
+        return requests
+
+    def _to_summary(self, query: str, hours: int, responses: Dict[str, Dict]) -> ErrorLogSummary:
+        """Build an ErrorLogSummary from the aggregate responses of `_summary_requests`, as dicts."""
+        def buckets(name: str) -> List[Dict]:
+            return (responses[name].get("data") or {}).get("buckets") or []
+
+        summary = ErrorLogSummary(query=query, hours=hours, interval=self.summary_interval)
+        for name, facet in SUMMARY_FACETS.items():
+            setattr(summary, name, [
+                FacetCount(value=str(bucket.get("by", {}).get(facet)), count=int(bucket.get("computes", {}).get("c0") or 0))
+                for bucket in buckets(name)
+            ])
+        for bucket in buckets("timeline"):
+            computes = bucket.get("computes", {})
+            summary.timeline = [TimeBucket(time=str(point.get("time")), count=int(point.get("value") or 0))
+                                for point in computes.get("c0") or []]
+            summary.total = int(computes.get("c1") or 0)
+        return summary
+
+    def fetch_past_error_logs_and_store(self, hours: int = 24) -> LogBatch:
         """
         Fetch past error logs from Datadog and store them in Pinecone.
         
         This method:
-        1. Fetches error logs from Datadog
+        1. Fetches error logs from Datadog, following pagination cursors
         2. Enriches them with additional context
-        3. Stores them in the vector database with proper chunking
+        3. Stores them in the vector database with proper chunking, one page at a time
         4. Each log entry is split into multiple chunks for better semantic search
         5. Maintains metadata for filtering and resolution tracking
+
+        The fetched logs are also returned as one columnar LogBatch, so the whole
+        window is held in memory. Use `store_new_error_logs` when only the
+        ingest is needed: it streams pages into storage one at a time. Logs
+        at or below the ingest watermark are returned but not re-embedded
+        (those within the ingest lag of it go through the dedup index).
         """
+        from src.tools.vector_store import get_vector_store
+        vector_store = get_vector_store()
         start_time = datetime.utcnow() - timedelta(hours=hours)
-        logs: List[LogData] = self._execute_query("@status:error", start_time)
+        watermark = WatermarkStore().load()
+        logs = LogBatch()
         
-        if logs:
+        for page in self.iter_log_pages("@status:error", start_time):
             # Store in vector database with proper chunking and metadata
-            vector_store.store_vectors(logs)
+            new_logs = watermark.newer_logs(page, self.ingest_lag)
+            if new_logs:
+                vector_store.store_vectors(new_logs)
+            logs.extend(page)
         
         return logs
-    
 
+    def store_new_error_logs(self,
+                             watermark_store: Optional[WatermarkStore] = None,
+                             default_hours: int = 5) -> int:
+        """
+        Incrementally ingest error logs newer than the persisted watermark.
+
+        Pages are fetched oldest-first and the watermark (last stored timestamp
+        plus the cursor of the next page) is committed after each successful
+        upsert. A run interrupted mid-window resumes from its saved cursor; the
+        first run ever falls back to the last `default_hours`.
+
+        Each window starts `ingest_lag` before the watermark, so logs Datadog
+        indexes late with an older timestamp are still picked up. Logs in that
+        overlap that were already stored are skipped by the vector store's dedup index.
+
+        Returns:
+            int: Number of logs stored
+        """
+        watermark_store = watermark_store or WatermarkStore()
+        watermark = watermark_store.load()
+        stored = 0
+
+        # Finish a window that a previous run was interrupted in
+        if watermark.cursor and watermark.window_start and watermark.window_end:
+            stored += self._ingest_window(watermark_store, watermark,
+                                          watermark.window_start, watermark.window_end,
+                                          cursor=watermark.cursor)
+
+        if watermark.last_timestamp:
+            start_time = watermark.last_timestamp - self.ingest_lag
+        else:
+            start_time = datetime.utcnow() - timedelta(hours=default_hours)
+        stored += self._ingest_window(watermark_store, watermark, start_time, datetime.utcnow())
+        return stored
+
+    def _ingest_window(self,
+                       watermark_store: WatermarkStore,
+                       watermark: IngestWatermark,
+                       start_time: datetime,
+                       end_time: datetime,
+                       cursor: Optional[str] = None) -> int:
+        """Store one window page by page, committing the watermark after each upsert."""
+        from datadog_api_client.v2.model.logs_sort import LogsSort
+        from src.tools.vector_store import get_vector_store
+        vector_store = get_vector_store()
+        stored = 0
+
+        for logs, next_cursor in self._iter_pages_with_cursor("@status:error", start_time, end_time,
+                                                               sort=LogsSort.TIMESTAMP_ASCENDING,
+                                                               cursor=cursor):
+            # Skip logs older than the overlap; the dedup index skips the ones in it already stored
+            new_logs = watermark.newer_logs(logs, self.ingest_lag)
+            failed_timestamps = []
+            if new_logs:
+                summary = vector_store.store_vectors(new_logs)
+                stored += summary.logs_stored
+                timestamps = new_logs.column("timestamp")
+                failed_timestamps = [parse_timestamp(timestamps[position]) for position in summary.failed_logs]
+
+            if failed_timestamps:
+                # Hold the watermark before the earliest failed log and drop the window,
+                # so the next run fetches the failed logs again
+                if None not in failed_timestamps:
+                    watermark.advance(logs, before=min(failed_timestamps))
+                watermark.cursor = watermark.window_start = watermark.window_end = None
+                watermark_store.commit(watermark)
+                print(f"Stopped the ingest window: {len(failed_timestamps)} logs failed to store; "
+                      f"the next run retries them")
+                return stored
+
+            watermark.advance(logs)
+            watermark.cursor = next_cursor
+            watermark.window_start = start_time if next_cursor else None
+            watermark.window_end = end_time if next_cursor else None
+            watermark_store.commit(watermark)
+
+        # The window is done (or its cursor expired); later runs continue from last_timestamp
+        if watermark.cursor:
+            watermark.cursor = watermark.window_start = watermark.window_end = None
+            watermark_store.commit(watermark)
+        return stored
+
+    def iter_log_pages(self,
+                       query: str,
+                       start_time: datetime,
+                       end_time: Optional[datetime] = None,
+                       page_size: Optional[int] = None) -> Iterator[LogBatch]:
+        """
+        Execute a logs query and yield the logs one LogBatch page at a time.
+
+        Follows the `meta.page.after` cursor until Datadog reports no further
+        pages. Each yielded batch holds at most `page_size` logs.
+        """
+        for logs, _ in self._iter_pages_with_cursor(query, start_time, end_time, page_size=page_size):
+            yield logs
+
+    def _iter_pages_with_cursor(self,
+                                query: str,
+                                start_time: datetime,
+                                end_time: Optional[datetime] = None,
+                                page_size: Optional[int] = None,
+                                sort: Optional["LogsSort"] = None,
+                                cursor: Optional[str] = None,
+                                strict: bool = False) -> Iterator[Tuple[LogBatch, Optional[str]]]:
+        """
+        Yield each page of logs together with the cursor of the page after it.
 
-    def _execute_query(self, query: str, start_time: datetime, end_time: Optional[datetime] = None) -> List[LogData]:
-        """Execute a logs query and return LogData objects."""
+        Pages are columnar LogBatches built straight from the response records,
+        with no LogData validated per log.
+
+        Errors end the iteration with a printed message, or are raised with `strict`.
+        """
         end_time = end_time or datetime.utcnow()
+        page_size = page_size or self.page_size
         
         try:
-            with ApiClient(self.config) as api_client:
-                api_instance = LogsApi(api_client)
-                filter = LogsQueryFilter(
-                    query=query,
-                    _from=start_time.isoformat() + "Z",
-                    to=end_time.isoformat() + "Z"
-                )
-                response = api_instance.list_logs(
-                    body=LogsListRequest(
-                        filter=filter,
-                        # sort=LogsSort("timestamp")
-                    )
-                )
-                return [
-                    LogData(
-                        trace_id=str(log.attributes.get("trace_id")) if hasattr(log, 'attributes') else "unknown",
-                        message=str(log.attributes.get("message")) if hasattr(log, 'attributes') else "",
-                        timestamp=str(log.attributes.get("timestamp")) if hasattr(log, 'attributes') else "",
-                        service=str(log.attributes.get("service", "unknown")) if hasattr(log, 'attributes') else "unknown",
-                        error_code=str(log.attributes.get("error.code")) if hasattr(log, 'attributes') else "unknown",
-                        error_type=str(log.attributes.get("error.type")) if hasattr(log, 'attributes') else "unknown",
-                        stack_trace=str(log.attributes.get("error.stack")) if hasattr(log, 'attributes') else "",
-                        host=str(log.attributes.get("hostname")) if hasattr(log, 'attributes') else "unknown",
-                        environment=str(log.attributes.get("env")) if hasattr(log, 'attributes') else "unknown",
-                        # additional_context=self._extract_additional_context(log.attributes) if hasattr(log, 'attributes') else {}
-                    )
-                    for log in (response.data if hasattr(response, 'data') else [])
-                ]
+            from datadog_api_client.v2.api.logs_api import LogsApi
+            api_instance = LogsApi(self.api_client)
+            while True:
+                request = self._list_request(query, start_time, end_time, page_size, sort, cursor)
+                response = api_instance.list_logs(body=request)
+                logs = self._to_log_batch(response)
+                cursor = self._next_cursor(response)
+                if logs:
+                    yield logs, cursor
+
+                if not cursor or not logs:
+                    break
+        except Exception as e:
+            if strict:
+                raise
+            print(f"Error fetching logs: {e}")
+
+    async def _aiter_pages_with_cursor(self,
+                                       query: str,
+                                       start_time: datetime,
+                                       end_time: Optional[datetime] = None,
+                                       page_size: Optional[int] = None,
+                                       sort: Optional["LogsSort"] = None,
+                                       cursor: Optional[str] = None,
+                                       strict: bool = False) -> AsyncIterator[Tuple[LogBatch, Optional[str]]]:
+        """Async variant of `_iter_pages_with_cursor` that posts list_logs requests through aiohttp."""
+        end_time = end_time or datetime.utcnow()
+        page_size = page_size or self.page_size
+        url = f"{self.config.host}/api/v2/logs/events/search"
+
+        try:
+            from datadog_api_client.model_utils import data_to_dict
+            from datadog_api_client.v2.model.logs_list_response import LogsListResponse
+            while True:
+                request = self._list_request(query, start_time, end_time, page_size, sort, cursor)
+                session = await self.async_session()
+                async with session.post(url, json=data_to_dict(request)) as http_response:
+                    body = await http_response.text()
+                response = self.api_client.deserialize(body, (LogsListResponse,), True)
+                logs = self._to_log_batch(response)
+                cursor = self._next_cursor(response)
+                if logs:
+                    yield logs, cursor
+
+                if not cursor or not logs:
+                    break
         except Exception as e:
+            if strict:
+                raise
             print(f"Error fetching logs: {e}")
-            return []
+
+    def _list_request(self,
+                      query: str,
+                      start_time: datetime,
+                      end_time: datetime,
+                      page_size: int,
+                      sort: Optional["LogsSort"] = None,
+                      cursor: Optional[str] = None) -> "LogsListRequest":
+        """Build one list_logs request body for the given window and page."""
+        from datadog_api_client.v2.model.logs_list_request import LogsListRequest
+        from datadog_api_client.v2.model.logs_list_request_page import LogsListRequestPage
+        page = LogsListRequestPage(limit=page_size)
+        if cursor:
+            page.cursor = cursor
+        request = LogsListRequest(filter=self._query_filter(query, start_time, end_time), page=page)
+        if sort:
+            request.sort = sort
+        return request
+
+    def _query_filter(self, query: str, start_time: datetime, end_time: datetime) -> "LogsQueryFilter":
+        from datadog_api_client.v2.model.logs_query_filter import LogsQueryFilter
+        return LogsQueryFilter(
+            query=query,
+            _from=start_time.isoformat() + "Z",
+            to=end_time.isoformat() + "Z"
+        )
+
+    def _execute_query(self, query: str, start_time: datetime, end_time: Optional[datetime] = None,
+                       strict: bool = False) -> List[LogData]:
+        """Execute a logs query and return LogData objects from every page."""
+        return [log for page, _ in self._iter_pages_with_cursor(query, start_time, end_time, strict=strict)
+                for log in page]
+
+    async def _aexecute_query(self, query: str, start_time: datetime, end_time: Optional[datetime] = None,
+                              strict: bool = False) -> List[LogData]:
+        """Async variant of `_execute_query`."""
+        return [log async for page, _ in self._aiter_pages_with_cursor(query, start_time, end_time, strict=strict)
+                for log in page]
+
+    def _next_cursor(self, response) -> Optional[str]:
+        """Extract the cursor of the next page from a list_logs response, if any."""
+        try:
+            return response.meta.page.after
+        except AttributeError:
+            return None
+
+    def _to_log_batch(self, response) -> LogBatch:
+        """Convert the log records of a list_logs response into a LogBatch."""
+        return LogBatch.from_rows(self._to_log_row(log) for log in (response.data if hasattr(response, 'data') else []))
+
+    def _to_log_row(self, log) -> Dict[str, str]:
+        """Map a single Datadog log record onto LogData fields."""
+        if not hasattr(log, 'attributes'):
+            return {"stack_trace": ""}
+        attributes = log.attributes
+        return {
+            "trace_id": str(attributes.get("trace_id")),
+            "message": str(attributes.get("message")),
+            "timestamp": str(attributes.get("timestamp")),
+            "service": str(attributes.get("service", "unknown")),
+            "error_code": str(attributes.get("error.code")),
+            "error_type": str(attributes.get("error.type")),
+            "stack_trace": str(attributes.get("error.stack")),
+            "host": str(attributes.get("hostname")),
+            "environment": str(attributes.get("env")),
+            # "additional_context": self._extract_additional_context(attributes)
+        }
 
     def _extract_additional_context(self, attributes) -> Dict:
         """Extract additional context from log attributes that might be useful for error analysis."""
@@ -109,4 +628,19 @@ class DatadogLogFetcher:
             
         return context
 
-    
\ No newline at end of file
+
+# Shared fetcher whose pooled client is reused by the graph, the analysis tools
+# and the ingest scripts, created on first use. Its connections are closed when
+# the process exits.
+@lazy_singleton
+def get_datadog_fetcher() -> DatadogLogFetcher:
+    fetcher = DatadogLogFetcher()
+    atexit.register(fetcher.close)
+    return fetcher
+
+
+def __getattr__(name: str):
+    # `datadog_fetcher` stays importable by name but is only built when accessed
+    if name == "datadog_fetcher":
+        return get_datadog_fetcher()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,148 @@
+# src/tools/dedup_index.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.config import local_state_config
+
+
+def hash_chunk_text(text: str) -> str:
+    """Stable content hash used to recognise identical chunk texts."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class DedupIndex:
+    """
+    Local on-disk record of what has already been embedded and upserted.
+
+    Four tables are kept in SQLite:
+    - logs: vector ids of whole log entries already stored, with their chunk count
+    - chunks: content hash of each embedded chunk text -> the chunk id holding its vector
+    - occurrences: per error fingerprint, how often and where it has been seen
+    - occurrence_keys: identity of every occurrence already counted, so a log
+      that is ingested again (retries, overlapping windows) is counted once
+
+    Rows are only written after a successful upsert, so the index never claims
+    more than the vector store actually contains.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(local_state_config.state_dir, "dedup_index.sqlite")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS logs (vector_id TEXT PRIMARY KEY, chunk_count INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks (text_hash TEXT PRIMARY KEY, chunk_id TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS occurrences (vector_id TEXT PRIMARY KEY, count INTEGER NOT NULL, "
+                "first_seen TEXT NOT NULL, last_seen TEXT NOT NULL, hosts TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS occurrence_keys (occurrence_key TEXT PRIMARY KEY, vector_id TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS occurrence_keys_vector_id ON occurrence_keys (vector_id)"
+            )
+
+    def known_logs(self, vector_ids: Iterable[str]) -> set:
+        """Return the subset of `vector_ids` that are already stored."""
+        return {row[0] for row in self._select_in("SELECT vector_id FROM logs WHERE vector_id IN ({})", vector_ids)}
+
+    def chunk_counts(self, vector_ids: Iterable[str]) -> Dict[str, int]:
+        """Map each stored vector id to its number of chunks."""
+        return dict(self._select_in("SELECT vector_id, chunk_count FROM logs WHERE vector_id IN ({})", vector_ids))
+
+    def known_chunks(self, text_hashes: Iterable[str]) -> Dict[str, str]:
+        """Map each already-embedded text hash to the chunk id holding its vector."""
+        return dict(self._select_in("SELECT text_hash, chunk_id FROM chunks WHERE text_hash IN ({})", text_hashes))
+
+    def record(self, logs: List[Tuple[str, int]], chunks: List[Tuple[str, str]]) -> None:
+        """Record stored logs as (vector_id, chunk_count) and chunks as (text_hash, chunk_id)."""
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO logs VALUES (?, ?)", logs)
+            self._conn.executemany("INSERT OR IGNORE INTO chunks VALUES (?, ?)", chunks)
+
+    def merge_occurrences(self, batch: Dict[str, Dict], max_hosts: int = 20, commit: bool = True) -> Dict[str, Dict]:
+        """
+        Fold a batch of occurrences into the stored totals.
+
+        `batch` maps vector id -> {"keys", "first_seen", "last_seen", "hosts"}, where
+        `keys` identifies each occurrence (e.g. its trace id and timestamp). Keys
+        already counted are not counted again, and vector ids with no new key
+        are left out. The merged totals are returned in the shape
+        {"count", "first_seen", "last_seen", "hosts"}, ready to use as metadata.
+
+        With `commit=False` nothing is written, so callers can preview the totals,
+        upsert them, and merge for real only once the upsert succeeded.
+        """
+        merged = {}
+        with self._lock, self._conn:
+            all_keys = [key for occurrence in batch.values() for key in occurrence["keys"]]
+            counted = {row[0] for row in self._select_in_locked(
+                "SELECT occurrence_key FROM occurrence_keys WHERE occurrence_key IN ({})", all_keys)}
+            new_keys = {vector_id: [key for key in occurrence["keys"] if key not in counted]
+                        for vector_id, occurrence in batch.items()}
+            new_keys = {vector_id: keys for vector_id, keys in new_keys.items() if keys}
+
+            existing = {row[0]: row[1:] for row in self._select_in_locked(
+                "SELECT vector_id, count, first_seen, last_seen, hosts FROM occurrences WHERE vector_id IN ({})",
+                list(new_keys))}
+
+            for vector_id, keys in new_keys.items():
+                occurrence = batch[vector_id]
+                count, first_seen, last_seen, hosts = existing.get(vector_id, (0, "", "", "[]"))
+                seen = [value for value in (first_seen, last_seen, occurrence["first_seen"], occurrence["last_seen"]) if value]
+                host_list = json.loads(hosts)
+                for host in sorted(occurrence["hosts"]):
+                    if host not in host_list and len(host_list) < max_hosts:
+                        host_list.append(host)
+                merged[vector_id] = {
+                    "count": count + len(keys),
+                    "first_seen": min(seen) if seen else "",
+                    "last_seen": max(seen) if seen else "",
+                    "hosts": host_list,
+                }
+
+            if commit:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO occurrences VALUES (?, ?, ?, ?, ?)",
+                    [(vector_id, o["count"], o["first_seen"], o["last_seen"], json.dumps(o["hosts"]))
+                     for vector_id, o in merged.items()]
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO occurrence_keys VALUES (?, ?)",
+                    [(key, vector_id) for vector_id, keys in new_keys.items() for key in keys]
+                )
+        return merged
+
+    def forget(self, chunk_ids: Iterable[str]) -> None:
+        """Drop deleted chunk ids, and the logs they belong to, from the index."""
+        chunk_ids = list(chunk_ids)
+        vector_ids = {chunk_id.rsplit("_", 1)[0] for chunk_id in chunk_ids}
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(i,) for i in chunk_ids])
+            self._conn.executemany("DELETE FROM logs WHERE vector_id = ?", [(i,) for i in vector_ids])
+            self._conn.executemany("DELETE FROM occurrences WHERE vector_id = ?", [(i,) for i in vector_ids])
+            self._conn.executemany("DELETE FROM occurrence_keys WHERE vector_id = ?", [(i,) for i in vector_ids])
+
+    def _select_in(self, query: str, values: Iterable[str], batch_size: int = 500) -> List[tuple]:
+        with self._lock:
+            return self._select_in_locked(query, values, batch_size)
+
+    def _select_in_locked(self, query: str, values: Iterable[str], batch_size: int = 500) -> List[tuple]:
+        values = list(values)
+        rows = []
+        for start in range(0, len(values), batch_size):
+            batch = values[start:start + batch_size]
+            placeholders = ",".join("?" * len(batch))
+            rows.extend(self._conn.execute(query.format(placeholders), batch).fetchall())
+        return rows
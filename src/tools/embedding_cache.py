@@ -0,0 +1,115 @@
+# src/tools/embedding_cache.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from src.config import embedding_cache_config, local_state_config
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Persistent cache in front of any LangChain embeddings object.
+
+    Vectors are stored as packed float32 blobs in SQLite, keyed by a hash of the
+    model name, the embedding kind (document or query) and the text. Entries are
+    evicted least-recently-used once `max_entries` is exceeded.
+    """
+
+    def __init__(self,
+                 embeddings: Embeddings,
+                 model_name: str,
+                 path: Optional[str] = None,
+                 max_entries: int = embedding_cache_config.max_entries):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.path = path or os.path.join(local_state_config.state_dir, "embedding_cache.sqlite")
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, only sending cache misses to the wrapped model."""
+        vectors = self.lookup(texts, kind="document")
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            for i, vector in zip(missing, self.embed_uncached([texts[i] for i in missing])):
+                vectors[i] = vector
+        return vectors
+
+    def embed_uncached(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents already known to be cache misses and cache the results."""
+        embedded = self.embeddings.embed_documents(texts)
+        self.store(texts, embedded, kind="document")
+        return embedded
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a search query, served from the cache when the same query was seen before."""
+        vector = self.lookup([text], kind="query")[0]
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.store([text], [vector], kind="query")
+        return vector
+
+    def lookup(self, texts: List[str], kind: str = "document") -> List[Optional[List[float]]]:
+        """Return cached vectors for `texts` (None for misses) and count hits and misses."""
+        keys = [self._key(text, kind) for text in texts]
+        found: Dict[str, bytes] = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                found.update(self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall())
+            if found:
+                now = time.time()
+                with self._conn:
+                    self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                           [(now, key) for key in found])
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+
+        return [array("f", found[key]).tolist() if key in found else None for key in keys]
+
+    def store(self, texts: List[str], vectors: List[List[float]], kind: str = "document") -> None:
+        """Add vectors to the cache and evict the least recently used entries beyond the limit."""
+        now = time.time()
+        rows = [(self._key(text, kind), array("f", vector).tobytes(), now) for text, vector in zip(texts, vectors)]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters since this process started."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+    def _key(self, text: str, kind: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{kind}\0{text}".encode("utf-8")).hexdigest()
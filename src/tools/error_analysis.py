@@ -1,135 +1,420 @@
 # src/tools/error_analysis.py
 
-from langchain_ollama import ChatOllama
-from langchain.prompts import PromptTemplate
-from langchain.output_parsers import PydanticOutputParser
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Iterator, Optional, Tuple
 from datetime import datetime, timedelta
-import json
-
-from src.models.error_analysis_state import ErrorAnalysisOutput, ErrorAnalysisInput
-from src.tools.vector_store import vector_store
-from src.tools.datadog_integration import DatadogLogFetcher
-
-# Initialize the Ollama LLM and DatadogLogFetcher
-llm = ChatOllama(model="llama3.2", temperature=0.2)
-datadog_fetcher = DatadogLogFetcher()
-
-# Create the output parser using our Pydantic model
-output_parser = PydanticOutputParser(pydantic_object=ErrorAnalysisOutput)
-
-# Define the prompt template for error analysis
-prompt_template = PromptTemplate(
-    template=(
-        "You are an AI assistant specialized in system error analysis.\n\n"
-        "Error Message:\n{error_message}\n\n"
-        "Stack Trace:\n{stack_trace}\n\n"
-        "Service Information:\n{service_info}\n\n"
-        "Historical Similar Errors:\n{historical_data}\n\n"
-        "Related Trace Logs:\n{related_logs}\n\n"
-        "Based on the above information, provide a detailed analysis of the error.\n"
-        "Consider patterns in historical errors and the current service context.\n\n"
-        "Your response should be a JSON object with the following structure:\n"
-        "{{\n"
-        '    "analysis": "A detailed analysis of the error",\n'
-        '    "possible_causes": ["cause1", "cause2", "cause3"],\n'
-        '    "recommendations": ["recommendation1", "recommendation2", "recommendation3"]\n'
-        "}}\n\n"
-        "Example response:\n"
-        "{{\n"
-        '    "analysis": "The connection timeout error occurred in the payment service, indicating potential network or service availability issues.",\n'
-        '    "possible_causes": ["Database connection pool exhaustion", "Network latency issues", "Service under high load"],\n'
-        '    "recommendations": ["Increase connection timeout settings", "Monitor connection pool metrics", "Check network latency between services"]\n'
-        "}}\n"
-    ),
-    input_variables=["error_message", "stack_trace", "service_info", "historical_data", "related_logs"]
+import asyncio
+
+from src.config import llm_cache_config, structured_output_config
+
+from src.models.error_analysis_state import AnalysisStreamEvent, ErrorAnalysisOutput, ErrorAnalysisInput
+from src.tools.context_budget import assemble_context, truncate_to_tokens
+from src.tools.lazy import lazy_singleton
+from src.tools.llm_cache import LLMResponseCache
+from src.tools.streaming_json import AnalysisStreamParser
+from src.tools.structured_output import ParseStats, output_schema, repair_output, validate_output
+
+# Placeholder output returned instead of raising when an analysis fails
+ANALYSIS_FAILURE_PREFIX = "Error analyzing the issue: "
+ANALYSIS_FAILURE_CAUSE = "Error during analysis"
+
+# Prompt for error analysis
+ANALYSIS_PROMPT = (
+    "You are an AI assistant specialized in system error analysis.\n\n"
+    "Error Message:\n{error_message}\n\n"
+    "Stack Trace:\n{stack_trace}\n\n"
+    "Service Information:\n{service_info}\n\n"
+    "Historical Similar Errors:\n{historical_data}\n\n"
+    "Related Trace Logs:\n{related_logs}\n\n"
+    "Recent Error Activity:\n{log_summary}\n\n"
+    "Based on the above information, provide a detailed analysis of the error.\n"
+    "Consider patterns in historical errors and the current service context.\n\n"
+    "Your response should be a JSON object with the following structure:\n"
+    "{{\n"
+    '    "analysis": "A detailed analysis of the error",\n'
+    '    "possible_causes": ["cause1", "cause2", "cause3"],\n'
+    '    "recommendations": ["recommendation1", "recommendation2", "recommendation3"]\n'
+    "}}\n\n"
+    "Example response:\n"
+    "{{\n"
+    '    "analysis": "The connection timeout error occurred in the payment service, indicating potential network or service availability issues.",\n'
+    '    "possible_causes": ["Database connection pool exhaustion", "Network latency issues", "Service under high load"],\n'
+    '    "recommendations": ["Increase connection timeout settings", "Monitor connection pool metrics", "Check network latency between services"]\n'
+    "}}\n"
+)
+
+# Prompt for fixing a response that failed schema validation and could not be repaired locally
+REPAIR_PROMPT = (
+    "The response below was supposed to be a JSON object describing an error analysis, "
+    "but it failed validation.\n\n"
+    "Validation error:\n{error}\n\n"
+    "Response:\n{completion}\n\n"
+    "{format_instructions}\n"
+    "Return only the corrected JSON object, keeping the content of the original response."
 )
 
-# Create the analysis chain using LCEL
-chain = prompt_template | llm
+# The LLM, prompts and chains are built on first use: importing langchain and
+# the Ollama client is the bulk of this module's import time.
 
-def format_historical_data(historical_results: List[Dict]) -> str:
-    """Format historical error data for the prompt."""
+@lazy_singleton
+def get_llm():
+    """The Ollama LLM. In structured-output mode decoding is constrained to the ErrorAnalysisOutput schema."""
+    from langchain_ollama import ChatOllama
+    return ChatOllama(
+        model="llama3.2",
+        temperature=0.2,
+        format=output_schema(ErrorAnalysisOutput) if structured_output_config.enabled else None
+    )
+
+@lazy_singleton
+def get_output_parser():
+    """Output parser for our Pydantic model."""
+    from langchain_core.output_parsers import PydanticOutputParser
+    return PydanticOutputParser(pydantic_object=ErrorAnalysisOutput)
+
+@lazy_singleton
+def get_prompt_template():
+    from langchain_core.prompts import PromptTemplate
+    return PromptTemplate(
+        template=ANALYSIS_PROMPT,
+        input_variables=["error_message", "stack_trace", "service_info", "historical_data", "related_logs",
+                         "log_summary"]
+    )
+
+@lazy_singleton
+def get_chain():
+    """The analysis chain (LCEL)."""
+    return get_prompt_template() | get_llm()
+
+@lazy_singleton
+def get_repair_chain():
+    from langchain_core.prompts import PromptTemplate
+    repair_prompt = PromptTemplate(
+        template=REPAIR_PROMPT,
+        input_variables=["error", "completion"],
+        partial_variables={"format_instructions": get_output_parser().get_format_instructions()}
+    )
+    return repair_prompt | get_llm()
+
+@lazy_singleton
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Persistent cache of analysis responses for byte-identical prompts (None when disabled)."""
+    return LLMResponseCache() if llm_cache_config.enabled else None
+
+# How analyses were parsed (first-pass valid, repaired, or unstructured)
+parse_stats = ParseStats()
+
+# Names that used to be module-level singletons, still importable but built when accessed
+_LAZY_ATTRIBUTES = {
+    "llm": get_llm,
+    "output_parser": get_output_parser,
+    "prompt_template": get_prompt_template,
+    "chain": get_chain,
+    "repair_chain": get_repair_chain,
+    "llm_cache": get_llm_cache,
+}
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def format_historical_entries(historical_results: List[Dict]) -> List[str]:
+    """Format each historical error for the prompt, best match first."""
     formatted_data = []
     for result in historical_results:
         status = f"[{result.get('resolution_status', 'pending').upper()}]"
         resolution = f"Resolution: {result.get('resolution_notes', 'No resolution notes yet')}"
         error_info = f"Error: {result.get('error_type')} in {result.get('service')}"
         timestamp = f"Occurred: {result.get('timestamp')}"
+        if result.get('occurrence_count'):
+            timestamp = (f"Occurred: {int(result['occurrence_count'])} times "
+                         f"between {result.get('first_seen')} and {result.get('last_seen')}")
         
         formatted_data.append(f"{status}\n{error_info}\n{timestamp}\n{resolution}\n")
     
+    return formatted_data
+
+def format_historical_data(historical_results: List[Dict]) -> str:
+    """Format historical error data for the prompt."""
+    formatted_data = format_historical_entries(historical_results)
     return "\n".join(formatted_data) if formatted_data else "No historical data available."
 
-def analyze_error(error_analysis_input: ErrorAnalysisInput) -> ErrorAnalysisOutput:
+def search_historical_errors(error_message: str, service: Optional[str] = None, k: int = 5) -> List[Dict]:
+    """Retrieve similar historical errors, filtered to the service when it is known."""
+    from src.tools.vector_store import get_vector_store
+    return get_vector_store().hybrid_search(
+        query=f"{error_message}",
+        metadata_filter={
+            "service": service
+        } if service else None,
+        k=k
+    )
+
+async def asearch_historical_errors(error_message: str, service: Optional[str] = None, k: int = 5) -> List[Dict]:
+    """
+    Async variant of `search_historical_errors`.
+
+    The vector backends and embedding cache are synchronous (Pinecone client,
+    SQLite, NumPy), so the search runs on a worker thread instead of blocking
+    the event loop.
+    """
+    return await asyncio.to_thread(search_historical_errors, error_message, service, k)
+
+def analyze_error(error_analysis_input: ErrorAnalysisInput, use_cache: bool = True) -> ErrorAnalysisOutput:
     """
     Analyze an error using the LLM and provide insights and resolution suggestions.
     
     This function:
-    1. Retrieves similar historical errors using hybrid search
+    1. Retrieves similar historical errors using hybrid search (or uses the ones
+       already gathered by the workflow)
     2. Fetches related logs from the same trace
     3. Combines all information for LLM analysis
     4. Returns structured analysis output
     
     Args:
         error_analysis_input (ErrorAnalysisInput): Details about the error to analyze
+        use_cache (bool): Answer byte-identical prompts from the LLM response cache
         
     Returns:
         ErrorAnalysisOutput: Structured analysis including root cause and resolution steps
     """
     try:
-        # Prepare service information
-        service_info = f"Service: {error_analysis_input.service}"
-        
-        # Search for similar historical errors using hybrid search
-        historical_results = vector_store.hybrid_search(
-            query=f"{error_analysis_input.error_message}",
-            metadata_filter={
-                "service": error_analysis_input.service
-            } if error_analysis_input.service else None,
-            k=5
-        )
-        
-        # Format historical data
-        historical_data = format_historical_data(historical_results)
-        
-        # Format related logs
-        related_logs_text = ""
-        if error_analysis_input.related_logs:
-            related_logs_text = "\n".join([
-                f"[{log.timestamp}] {log.service}: {log.message}"
-                for log in error_analysis_input.related_logs
-            ])
-        
-        # Run the analysis chain
-        result = chain.invoke({
-            "error_message": error_analysis_input.error_message,
-            "stack_trace": error_analysis_input.stack_trace or "No stack trace available",
-            "service_info": service_info,
-            "historical_data": historical_data,
-            "related_logs": related_logs_text or "No related logs found"
-        })  # This will return an AIMessage type
-        
-        # Get the content from AIMessage
-        content = result.content if hasattr(result, 'content') else str(result)
-        
-        try:
-            # Try to parse as JSON
-            parsed_json = json.loads(content)
-            return ErrorAnalysisOutput(**parsed_json)
-        except (json.JSONDecodeError, TypeError) as e:
-            print(f"Failed to parse JSON: {str(e)}")
-            # If JSON parsing fails, try to extract information from the text
-            return ErrorAnalysisOutput(
-                analysis=content,
-                possible_causes=["Unable to parse structured output"],
-                recommendations=["Please check the raw analysis above"]
+        # Search for similar historical errors using hybrid search (unless the workflow already did)
+        historical_results = error_analysis_input.historical_results
+        if historical_results is None:
+            historical_results = search_historical_errors(
+                error_analysis_input.error_message,
+                error_analysis_input.service
             )
+        
+        # Run the analysis chain (unless the same prompt was answered before)
+        variables, cache_key, content = _prepare_prompt(error_analysis_input, historical_results, use_cache)
+        if content is None:
+            result = get_chain().invoke(variables)  # This will return an AIMessage type
+            content = _cache_response(cache_key, result)
+        return _parse_analysis(content) or _repair_analysis(content)
             
     except Exception as e:
         print(f"Error in analyze_error: {str(e)}")
-        return ErrorAnalysisOutput(
-            analysis=f"Error analyzing the issue: {str(e)}",
-            possible_causes=["Error during analysis"],
-            recommendations=["Please try again or contact support"]
-        )
+        return _analysis_failure(e)
+
+async def aanalyze_error(error_analysis_input: ErrorAnalysisInput, use_cache: bool = True) -> ErrorAnalysisOutput:
+    """
+    Async variant of `analyze_error`.
+
+    The LLM call uses `ainvoke`, so many analyses can share one event loop.
+    """
+    try:
+        historical_results = error_analysis_input.historical_results
+        if historical_results is None:
+            historical_results = await asearch_historical_errors(
+                error_analysis_input.error_message,
+                error_analysis_input.service
+            )
+
+        variables, cache_key, content = _prepare_prompt(error_analysis_input, historical_results, use_cache)
+        if content is None:
+            result = await get_chain().ainvoke(variables)
+            content = _cache_response(cache_key, result)
+        return _parse_analysis(content) or await _arepair_analysis(content)
+
+    except Exception as e:
+        print(f"Error in aanalyze_error: {str(e)}")
+        return _analysis_failure(e)
+
+def stream_analysis(error_analysis_input: ErrorAnalysisInput, use_cache: bool = True) -> Iterator[AnalysisStreamEvent]:
+    """
+    Streaming variant of `analyze_error`.
+
+    Yields the analysis text and then each possible cause and recommendation as
+    soon as the LLM finishes writing it, followed by a final "result" event with
+    the complete (repaired if necessary) ErrorAnalysisOutput.
+    """
+    try:
+        historical_results = error_analysis_input.historical_results
+        if historical_results is None:
+            historical_results = search_historical_errors(
+                error_analysis_input.error_message,
+                error_analysis_input.service
+            )
+
+        variables, cache_key, cached = _prepare_prompt(error_analysis_input, historical_results, use_cache)
+        parser = AnalysisStreamParser()
+        chunks = [cached] if cached is not None else (chunk.content for chunk in get_chain().stream(variables))
+        content = []
+        for chunk in chunks:
+            content.append(chunk)
+            for field, text in parser.feed(chunk):
+                yield AnalysisStreamEvent(field=field, text=text)
+
+        content = "".join(content)
+        if cached is None:
+            _cache_response(cache_key, content)
+        yield AnalysisStreamEvent(field="result", output=_parse_analysis(content) or _repair_analysis(content))
+
+    except Exception as e:
+        print(f"Error in stream_analysis: {str(e)}")
+        yield AnalysisStreamEvent(field="result", output=_analysis_failure(e))
+
+async def astream_analysis(error_analysis_input: ErrorAnalysisInput,
+                           use_cache: bool = True) -> AsyncIterator[AnalysisStreamEvent]:
+    """Async variant of `stream_analysis` using `astream` on the analysis chain."""
+    try:
+        historical_results = error_analysis_input.historical_results
+        if historical_results is None:
+            historical_results = await asearch_historical_errors(
+                error_analysis_input.error_message,
+                error_analysis_input.service
+            )
+
+        variables, cache_key, cached = _prepare_prompt(error_analysis_input, historical_results, use_cache)
+        parser = AnalysisStreamParser()
+        content = []
+        if cached is not None:
+            content.append(cached)
+            for field, text in parser.feed(cached):
+                yield AnalysisStreamEvent(field=field, text=text)
+        else:
+            async for chunk in get_chain().astream(variables):
+                content.append(chunk.content)
+                for field, text in parser.feed(chunk.content):
+                    yield AnalysisStreamEvent(field=field, text=text)
+
+        content = "".join(content)
+        if cached is None:
+            _cache_response(cache_key, content)
+        output = _parse_analysis(content) or await _arepair_analysis(content)
+        yield AnalysisStreamEvent(field="result", output=output)
+
+    except Exception as e:
+        print(f"Error in astream_analysis: {str(e)}")
+        yield AnalysisStreamEvent(field="result", output=_analysis_failure(e))
+
+def _prepare_prompt(error_analysis_input: ErrorAnalysisInput,
+                    historical_results: List[Dict],
+                    use_cache: bool) -> Tuple[Dict[str, str], Optional[str], Optional[str]]:
+    """Prompt variables, their LLM cache key (None if not caching) and the cached response, if any."""
+    variables = _chain_input(error_analysis_input, historical_results)
+    cache_key = _cache_key(variables) if use_cache else None
+    return variables, cache_key, get_llm_cache().get(cache_key) if cache_key else None
+
+def _chain_input(error_analysis_input: ErrorAnalysisInput, historical_results: List[Dict]) -> Dict[str, str]:
+    """Build the prompt variables for the analysis chain, fitted into the context token budget."""
+    # Prepare service information
+    service_info = f"Service: {error_analysis_input.service}"
+
+    # Rank, dedupe and trim the error details, history and related logs to the budget
+    context, report = assemble_context(
+        error_message=error_analysis_input.error_message,
+        stack_trace=error_analysis_input.stack_trace,
+        historical_entries=format_historical_entries(historical_results),
+        related_logs=error_analysis_input.related_logs or [],
+        trace_id=error_analysis_input.trace_id,
+        service=error_analysis_input.service,
+        log_summary=error_analysis_input.log_summary
+    )
+    if report.dropped_anything:
+        print(report.summary())
+
+    return {
+        "error_message": context["error_message"],
+        "stack_trace": context["stack_trace"] or "No stack trace available",
+        "service_info": service_info,
+        "historical_data": context["historical_data"] or "No historical data available.",
+        "related_logs": context["related_logs"] or "No related logs found",
+        "log_summary": context["log_summary"] or "No error summary available"
+    }
+
+def _cache_key(variables: Dict[str, str]) -> Optional[str]:
+    """LLM cache key for the prompt variables, or None when the cache is disabled."""
+    llm_cache, llm = get_llm_cache(), get_llm()
+    if llm_cache is None:
+        return None
+    return llm_cache.key(llm.model, llm.temperature, ANALYSIS_PROMPT, variables, llm.format)
+
+def _cache_response(cache_key: Optional[str], result) -> str:
+    """Return the response text, caching it when it passed validation (failed parses are retried next time)."""
+    content = result.content if hasattr(result, 'content') else str(result)
+    if cache_key and validate_output(content, ErrorAnalysisOutput)[0] is not None:
+        get_llm_cache().put(cache_key, content)
+    return content
+
+def _parse_analysis(result) -> Optional[ErrorAnalysisOutput]:
+    """
+    Parse the LLM response into ErrorAnalysisOutput without another LLM call.
+
+    Output that passes schema validation is returned as is (the fast path with
+    constrained decoding). Otherwise truncated or invalid JSON is repaired
+    locally by closing open strings and containers or recovering the fields
+    already completed. Returns None when neither works.
+    """
+    # Get the content from AIMessage
+    content = result.content if hasattr(result, 'content') else str(result)
+
+    output, error = validate_output(content, ErrorAnalysisOutput)
+    if output is not None:
+        parse_stats.record("valid")
+        return output
+
+    output = repair_output(content, ErrorAnalysisOutput)
+    if output is not None:
+        print(f"Failed to parse JSON: {error}; using repaired output")
+        parse_stats.record("repaired")
+    return output
+
+def _repair_analysis(content: str) -> ErrorAnalysisOutput:
+    """Ask the LLM to fix a response that failed validation, up to `max_repair_attempts` times."""
+    for _ in range(structured_output_config.max_repair_attempts):
+        try:
+            result = get_repair_chain().invoke(_repair_input(content))
+        except Exception as e:
+            print(f"Error repairing analysis output: {str(e)}")
+            break
+        output, _ = validate_output(result.content, ErrorAnalysisOutput)
+        if output is not None:
+            parse_stats.record("llm_repaired")
+            return output
+        content = result.content
+    return _unstructured_analysis(content)
+
+async def _arepair_analysis(content: str) -> ErrorAnalysisOutput:
+    """Async variant of `_repair_analysis`."""
+    for _ in range(structured_output_config.max_repair_attempts):
+        try:
+            result = await get_repair_chain().ainvoke(_repair_input(content))
+        except Exception as e:
+            print(f"Error repairing analysis output: {str(e)}")
+            break
+        output, _ = validate_output(result.content, ErrorAnalysisOutput)
+        if output is not None:
+            parse_stats.record("llm_repaired")
+            return output
+        content = result.content
+    return _unstructured_analysis(content)
+
+def _repair_input(content: str) -> Dict[str, str]:
+    _, error = validate_output(content, ErrorAnalysisOutput)
+    return {"error": error, "completion": truncate_to_tokens(content, 1500)}
+
+def _unstructured_analysis(content: str) -> ErrorAnalysisOutput:
+    """Last resort: keep the raw response as the analysis."""
+    print("Failed to parse JSON: returning the raw analysis")
+    parse_stats.record("failed")
+    return ErrorAnalysisOutput(
+        analysis=content,
+        possible_causes=["Unable to parse structured output"],
+        recommendations=["Please check the raw analysis above"]
+    )
+
+def _analysis_failure(e: Exception) -> ErrorAnalysisOutput:
+    return ErrorAnalysisOutput(
+        analysis=f"{ANALYSIS_FAILURE_PREFIX}{str(e)}",
+        possible_causes=[ANALYSIS_FAILURE_CAUSE],
+        recommendations=["Please try again or contact support"]
+    )
+
+def analysis_failure_message(output: ErrorAnalysisOutput) -> Optional[str]:
+    """The error behind the placeholder output of a failed analysis, or None for a real analysis."""
+    if output.possible_causes == [ANALYSIS_FAILURE_CAUSE] and output.analysis.startswith(ANALYSIS_FAILURE_PREFIX):
+        return output.analysis[len(ANALYSIS_FAILURE_PREFIX):]
+    return None
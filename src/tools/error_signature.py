@@ -0,0 +1,75 @@
+# src/tools/error_signature.py
+
+import functools
+import hashlib
+import re
+from typing import Dict, Optional
+
+# Volatile parts of error messages, masked so repeats of one error share a signature.
+# Order matters: broader patterns (UUIDs, timestamps, IPs) run before bare numbers.
+_VOLATILE_PATTERNS = [
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.IGNORECASE), "<uuid>"),
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?\b"), "<timestamp>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<ip>"),
+    (re.compile(r"\b0x[0-9a-f]+\b", re.IGNORECASE), "<hex>"),
+    (re.compile(r"\b[0-9a-f]{16,}\b", re.IGNORECASE), "<hex>"),
+    (re.compile(r"\b[A-Za-z0-9_-]*\d[A-Za-z0-9_-]*[-_][A-Za-z0-9_-]*\d[A-Za-z0-9_-]*\b"), "<id>"),
+    (re.compile(r"\b\d+(?:\.\d+)?(?:ms|s|m|h|kb|mb|gb)?\b", re.IGNORECASE), "<num>"),
+]
+_STATUS_CODE = re.compile(r"[1-5]\d\d")  # HTTP-style status codes carry meaning and are kept
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_message(message: Optional[str]) -> str:
+    """Mask ids, numbers, UUIDs, IPs and timestamps and collapse whitespace."""
+    normalized = message or ""
+    for pattern, replacement in _VOLATILE_PATTERNS:
+        normalized = pattern.sub(
+            lambda match: match.group(0) if _STATUS_CODE.fullmatch(match.group(0)) else replacement,
+            normalized
+        )
+    return _WHITESPACE.sub(" ", normalized).strip().lower()
+
+
+# Stack frames in JavaScript ("at Fn (file:line)") and Python ('File "x.py", line N, in fn') form
+_FRAME_LINE = re.compile(r"^\s*(?:at\s+\S|File\s+\")")
+_LINE_NUMBERS = re.compile(r"(?::\d+)+(?=\)|$)|,\s*line\s+\d+")
+
+
+def is_stack_frame(line: str) -> bool:
+    """True if a stack trace line is a frame rather than an exception message or source line."""
+    return bool(_FRAME_LINE.match(line))
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize_stack_trace(stack_trace: Optional[str], max_frames: int = 5) -> str:
+    """
+    Reduce a stack trace to its top frames with line numbers and volatile values masked.
+
+    Falls back to the normalized first line when no frames are recognised, so
+    traces that only differ in line numbers or addresses share a signature.
+    Every occurrence of an error carries the same trace, so results are memoized.
+    """
+    if not stack_trace or stack_trace in ("unknown", "None"):
+        return ""
+    lines = stack_trace.strip().splitlines()
+    frames = [_LINE_NUMBERS.sub("", line.strip()) for line in lines if is_stack_frame(line)]
+    if not frames:
+        return normalize_message(lines[0])
+    return "\n".join(normalize_message(frame) for frame in frames[:max_frames])
+
+
+def error_fingerprint(log: Dict) -> str:
+    """
+    Stable fingerprint of an error: service, error type and code, normalized
+    message and normalized top stack frames. Every occurrence of the same
+    exception maps to the same fingerprint regardless of trace id, timestamp or host.
+    """
+    parts = [
+        log.get("service") or "",
+        log.get("error_type") or "",
+        log.get("error_code") or "",
+        normalize_message(log.get("message")),
+        normalize_stack_trace(log.get("stack_trace")),
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
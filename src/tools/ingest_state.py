@@ -0,0 +1,91 @@
+# src/tools/ingest_state.py
+
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from src.config import local_state_config
+from src.models.error_analysis_state import LogData
+from src.tools.log_batch import LogBatch
+
+
+class IngestWatermark(BaseModel):
+    """High-water mark of the last successful error log ingest."""
+    last_timestamp: Optional[datetime] = Field(default=None, description="Newest log timestamp already stored")
+    cursor: Optional[str] = Field(default=None, description="Datadog cursor of the next page of an interrupted window")
+    window_start: Optional[datetime] = Field(default=None, description="Start of the window the cursor belongs to")
+    window_end: Optional[datetime] = Field(default=None, description="End of the window the cursor belongs to")
+    updated_at: Optional[datetime] = Field(default=None, description="When the watermark was last committed")
+
+    def advance(self, logs, before: Optional[datetime] = None) -> None:
+        """
+        Move last_timestamp forward to the newest parsable timestamp in `logs`.
+
+        With `before`, only timestamps earlier than it count, so the watermark
+        stays behind a log that failed to store and the next run fetches it again.
+        """
+        values = logs.column("timestamp") if isinstance(logs, LogBatch) else [log.timestamp for log in logs]
+        for value in values:
+            timestamp = parse_timestamp(value)
+            if timestamp and (before is None or timestamp < before) and \
+                    (self.last_timestamp is None or timestamp > self.last_timestamp):
+                self.last_timestamp = timestamp
+
+    def newer_logs(self, logs: LogBatch, lag: timedelta = timedelta(0)) -> LogBatch:
+        """The logs of a batch at or after the watermark minus `lag`, read from its timestamp column."""
+        if self.last_timestamp is None:
+            return logs
+        indices = [index for index, value in enumerate(logs.column("timestamp")) if self._is_newer(value, lag)]
+        return logs if len(indices) == len(logs) else logs.select(indices)
+
+    def _is_newer(self, value: Optional[str], lag: timedelta = timedelta(0)) -> bool:
+        if self.last_timestamp is None:
+            return True
+        timestamp = parse_timestamp(value)
+        return timestamp is None or timestamp >= self.last_timestamp - lag
+
+
+def parse_log_timestamp(log: LogData) -> Optional[datetime]:
+    """Parse a LogData timestamp into a naive UTC datetime, if possible."""
+    return parse_timestamp(log.timestamp)
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse a log timestamp string into a naive UTC datetime, if possible."""
+    try:
+        timestamp = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (ValueError, AttributeError):
+        return None
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+class WatermarkStore:
+    """Persists an IngestWatermark as JSON in a local state file."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(local_state_config.state_dir, "ingest_watermark.json")
+
+    def load(self) -> IngestWatermark:
+        """Load the watermark, or an empty one if no ingest has completed yet."""
+        try:
+            with open(self.path, "r") as f:
+                return IngestWatermark(**json.load(f))
+        except FileNotFoundError:
+            return IngestWatermark()
+        except (json.JSONDecodeError, ValueError) as e:
+            print(f"Ignoring unreadable ingest watermark at {self.path}: {e}")
+            return IngestWatermark()
+
+    def commit(self, watermark: IngestWatermark) -> None:
+        """Atomically persist the watermark so a crash never leaves a torn file."""
+        watermark.updated_at = datetime.utcnow()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(watermark.model_dump_json())
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,154 @@
+# src/tools/keyword_index.py
+
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from src.tools.vector_backends import metadata_matches
+
+# Identifiers, dotted names, paths and file:line references are kept whole
+_TOKEN_RE = re.compile(r"[A-Za-z0-9_$][A-Za-z0-9_$.\-/:]*[A-Za-z0-9_$]|[A-Za-z0-9_$]")
+_SEPARATOR_RE = re.compile(r"[.\-/:]+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+# Common English filler plus the labels every chunk text carries ("Error Type:", "Stack Trace:", ...)
+STOPWORDS = {
+    "a", "an", "and", "at", "by", "for", "from", "in", "is", "of", "on", "or", "the", "to", "was", "with",
+    "error", "type", "message", "service", "code", "stack", "trace",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Tokenize error text for keyword search.
+
+    Tuned for stack traces and identifiers: each raw token is kept whole
+    (`usermodel.findone`, `/src/db/pool.js:89`, `etimedout`) and is also split on
+    dots, slashes and colons and on camelCase boundaries, so a query for
+    `findOne` or `pool.js` still matches.
+    """
+    tokens = []
+    for raw in _TOKEN_RE.findall(text):
+        parts = [part for part in _SEPARATOR_RE.split(raw) if part]
+        pieces = {raw.lower()}
+        if len(parts) > 1:
+            pieces.update(part.lower() for part in parts)
+        for part in parts:
+            camel = _CAMEL_RE.findall(part)
+            if len(camel) > 1:
+                pieces.update(piece.lower() for piece in camel)
+        tokens.extend(piece for piece in pieces if len(piece) > 1 and piece not in STOPWORDS)
+    return tokens
+
+
+class KeywordIndex:
+    """
+    Incremental BM25 inverted index over stored chunk texts, persisted in SQLite.
+
+    Each document is one chunk, keyed by chunk id, and carries its metadata (minus
+    the text) so keyword-only hits can be returned and filtered like dense ones.
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS docs "
+                "(chunk_id TEXT PRIMARY KEY, vector_id TEXT, length INTEGER NOT NULL, metadata TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS docs_vector_id ON docs (vector_id)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS postings "
+                "(term TEXT NOT NULL, chunk_id TEXT NOT NULL, tf INTEGER NOT NULL, PRIMARY KEY (term, chunk_id))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS postings_chunk_id ON postings (chunk_id)")
+
+    def add(self, documents: Iterable[Tuple[str, str, Dict]]) -> None:
+        """Index (chunk_id, text, metadata) documents, replacing any previous version."""
+        docs, postings, chunk_ids = [], [], []
+        for chunk_id, text, metadata in documents:
+            terms = Counter(tokenize(text))
+            metadata = {key: value for key, value in metadata.items() if key != "text"}
+            chunk_ids.append((chunk_id,))
+            docs.append((chunk_id, metadata.get("vector_id"), sum(terms.values()), json.dumps(metadata)))
+            postings.extend((term, chunk_id, tf) for term, tf in terms.items())
+
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM postings WHERE chunk_id = ?", chunk_ids)
+            self._conn.executemany("INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?)", docs)
+            self._conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", postings)
+
+    def search(self, query: str, k: int, filter: Optional[Dict] = None) -> List[Tuple[Dict, float]]:
+        """Return the k best BM25 (metadata, score) pairs matching the filter, best first."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            doc_count, avg_length = self._conn.execute("SELECT COUNT(*), AVG(length) FROM docs").fetchone()
+            if not doc_count:
+                return []
+
+            scores: Dict[str, float] = {}
+            for term in terms:
+                rows = self._conn.execute(
+                    "SELECT p.chunk_id, p.tf, d.length FROM postings p JOIN docs d ON d.chunk_id = p.chunk_id "
+                    "WHERE p.term = ?", (term,)
+                ).fetchall()
+                if not rows:
+                    continue
+                idf = math.log(1 + (doc_count - len(rows) + 0.5) / (len(rows) + 0.5))
+                for chunk_id, tf, length in rows:
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+            results = []
+            for chunk_id in sorted(scores, key=scores.get, reverse=True):
+                metadata = json.loads(self._conn.execute(
+                    "SELECT metadata FROM docs WHERE chunk_id = ?", (chunk_id,)
+                ).fetchone()[0])
+                if metadata_matches(metadata, filter):
+                    results.append((metadata, scores[chunk_id]))
+                    if len(results) >= k:
+                        break
+        return results
+
+    def update_metadata(self, vector_id: str, metadata: Dict) -> Set[str]:
+        """Merge `metadata` into every indexed chunk of a log entry; return the services touched."""
+        return self.update_metadata_many({vector_id: metadata})
+
+    def update_metadata_many(self, updates: Dict[str, Dict], batch_size: int = 500) -> Set[str]:
+        """Merge metadata into the chunks of many log entries (vector id -> metadata) in one transaction."""
+        vector_ids = list(updates)
+        updated = []
+        with self._lock, self._conn:
+            for start in range(0, len(vector_ids), batch_size):
+                batch = vector_ids[start:start + batch_size]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT chunk_id, vector_id, metadata FROM docs WHERE vector_id IN ({placeholders})", batch
+                ).fetchall()
+                updated.extend((chunk_id, {**json.loads(stored), **updates[vector_id]})
+                               for chunk_id, vector_id, stored in rows)
+            self._conn.executemany(
+                "UPDATE docs SET metadata = ? WHERE chunk_id = ?",
+                [(json.dumps(merged), chunk_id) for chunk_id, merged in updated]
+            )
+        return {merged.get("service") for _, merged in updated if merged.get("service")}
+
+    def delete(self, chunk_ids: Iterable[str]) -> None:
+        """Remove chunks from the index."""
+        chunk_ids = [(chunk_id,) for chunk_id in chunk_ids]
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM postings WHERE chunk_id = ?", chunk_ids)
+            self._conn.executemany("DELETE FROM docs WHERE chunk_id = ?", chunk_ids)
@@ -0,0 +1,31 @@
+# src/tools/lazy.py
+
+import functools
+import threading
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+
+def lazy_singleton(factory: Callable[[], T]) -> Callable[[], T]:
+    """
+    Turn a zero-argument factory into an accessor for a shared instance.
+
+    The instance is built on the first call (under a lock, so concurrent first
+    callers share one) and returned by every later call. Module-level clients
+    are exposed this way so importing a module never connects to anything.
+    `accessor.built()` reports whether the instance exists yet.
+    """
+    lock = threading.Lock()
+    instance = []
+
+    @functools.wraps(factory)
+    def accessor() -> T:
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+
+    accessor.built = lambda: bool(instance)
+    return accessor
@@ -0,0 +1,77 @@
+# src/tools/llm_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from src.config import llm_cache_config, local_state_config
+
+
+class LLMResponseCache:
+    """
+    Persistent cache of LLM responses.
+
+    Responses are stored as text in SQLite, keyed by a hash of the model name,
+    the temperature, the prompt template, the prompt variables and the output
+    format constraint, so a byte-identical request is answered without calling
+    the model. Entries are evicted least-recently-used once `max_entries` is
+    exceeded.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = llm_cache_config.max_entries):
+        self.max_entries = max_entries
+        self.path = path or os.path.join(local_state_config.state_dir, "llm_cache.sqlite")
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, response TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    def key(self, model: str, temperature: Optional[float], template: str, variables: Dict[str, Any],
+            output_format: Any = None) -> str:
+        payload = json.dumps([model, temperature, template, variables, output_format], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for `key` (None on a miss) and count the hit or miss."""
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        """Cache a response and evict the least recently used entries beyond the limit."""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, response, time.time()))
+            count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters since this process started."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,135 @@
+# src/tools/log_batch.py
+
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from src.models.error_analysis_state import LogData
+
+# Low-cardinality fields (and stack traces, which repeat with their error) are
+# dictionary-encoded: each distinct value is stored once and rows hold its code
+DICTIONARY_FIELDS = ("service", "error_code", "error_type", "stack_trace", "host", "environment", "resolution")
+# Mostly-unique fields are kept as one plain list per field
+TEXT_FIELDS = ("trace_id", "message", "timestamp")
+
+_DEFAULTS = {name: field.get_default(call_default_factory=True) for name, field in LogData.model_fields.items()}
+
+
+class LogBatch:
+    """
+    Column-oriented batch of logs for bulk ingest and analysis.
+
+    Rows are appended as plain values without pydantic validation, one list or
+    code array per field instead of one object per log. Repeated values
+    (service, host, environment, error type, stack trace...) are stored once
+    per batch, Arrow-dictionary style. Logs are only turned into `LogData` when
+    a caller indexes or iterates the batch, and `rows()` hands out plain dicts
+    for code that works on dicts anyway (vector ids, chunking).
+
+    Rows are not validated on append, so callers building a batch by hand must
+    pass LogData-typed values (strings, and a dict for additional_context).
+    """
+
+    def __init__(self):
+        self._text: Dict[str, List[str]] = {field: [] for field in TEXT_FIELDS}
+        self._codes: Dict[str, array] = {field: array("I") for field in DICTIONARY_FIELDS}
+        self._values: Dict[str, List[Optional[str]]] = {field: [] for field in DICTIONARY_FIELDS}
+        self._lookup: Dict[str, Dict[Optional[str], int]] = {field: {} for field in DICTIONARY_FIELDS}
+        self._context: Dict[int, dict] = {}  # additional_context, for the rows that have any
+        self._size = 0
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "LogBatch":
+        """Build a batch from dicts with LogData keys; missing keys take the LogData defaults."""
+        batch = cls()
+        for row in rows:
+            batch.append(**row)
+        return batch
+
+    @classmethod
+    def from_logs(cls, logs: Union["LogBatch", Iterable[LogData]]) -> "LogBatch":
+        """Build a batch from LogData objects (a batch is returned as is)."""
+        if isinstance(logs, LogBatch):
+            return logs
+        batch = cls()
+        for log in logs:
+            batch.append(**{field: getattr(log, field) for field in LogData.model_fields})
+        return batch
+
+    def append(self, **fields: Any) -> None:
+        """Add one log; unknown keys are ignored and missing ones take the LogData defaults."""
+        for field, column in self._text.items():
+            column.append(fields.get(field, _DEFAULTS[field]))
+        for field, codes in self._codes.items():
+            value = fields.get(field, _DEFAULTS[field])
+            code = self._lookup[field].get(value)
+            if code is None:
+                code = self._lookup[field][value] = len(self._values[field])
+                self._values[field].append(value)
+            codes.append(code)
+        if fields.get("additional_context"):
+            self._context[self._size] = fields["additional_context"]
+        self._size += 1
+
+    def extend(self, other: Union["LogBatch", Iterable[LogData]]) -> None:
+        """Append every log of another batch (or of LogData objects)."""
+        for row in LogBatch.from_logs(other).rows():
+            self.append(**row)
+
+    def select(self, indices: Sequence[int]) -> "LogBatch":
+        """A new batch holding the rows at `indices`, in that order, copied column by column."""
+        batch = LogBatch()
+        for field, column in self._text.items():
+            batch._text[field] = [column[i] for i in indices]
+        for field, codes in self._codes.items():
+            batch._codes[field] = array("I", [codes[i] for i in indices])
+            batch._values[field] = list(self._values[field])
+            batch._lookup[field] = dict(self._lookup[field])
+        batch._context = {new: self._context[old] for new, old in enumerate(indices) if old in self._context}
+        batch._size = len(indices)
+        return batch
+
+    def column(self, field: str) -> List[Any]:
+        """All values of one field, in row order."""
+        if field in self._text:
+            return list(self._text[field])
+        if field in self._codes:
+            values = self._values[field]
+            return [values[code] for code in self._codes[field]]
+        if field == "additional_context":
+            return [self._context.get(i) or {} for i in range(self._size)]
+        raise KeyError(field)
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """One log as a plain dict with every LogData field."""
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("LogBatch index out of range")
+        row = {field: column[index] for field, column in self._text.items()}
+        for field, codes in self._codes.items():
+            row[field] = self._values[field][codes[index]]
+        row["additional_context"] = self._context.get(index) or {}
+        return row
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """Every log as a plain dict, built one at a time."""
+        for index in range(self._size):
+            yield self.row(index)
+
+    def to_logs(self) -> List[LogData]:
+        return list(self)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[LogData, "LogBatch"]:
+        if isinstance(index, slice):
+            return self.select(range(*index.indices(self._size)))
+        return LogData.model_validate(self.row(index))
+
+    def __iter__(self) -> Iterator[LogData]:
+        for row in self.rows():
+            yield LogData.model_validate(row)
+
+    def __repr__(self) -> str:
+        return f"LogBatch({self._size} logs)"
@@ -0,0 +1,95 @@
+# src/tools/query_cache.py
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+from src.tools.error_signature import normalize_message
+
+
+def filter_services(metadata_filter: Optional[Dict]) -> Optional[Set[str]]:
+    """Services a filter is restricted to, or None if it can match any service."""
+    if not metadata_filter or "service" not in metadata_filter:
+        return None
+    condition = metadata_filter["service"]
+    if isinstance(condition, str):
+        return {condition}
+    if isinstance(condition, dict):
+        if "$eq" in condition:
+            return {condition["$eq"]}
+        if "$in" in condition:
+            return set(condition["$in"])
+    return None
+
+
+class QueryCache:
+    """
+    TTL + LRU cache of hybrid_search results.
+
+    Keys combine the normalized error signature of the query (ids, numbers,
+    UUIDs and timestamps masked), the metadata filter, k and the search settings,
+    so repeats of one error during an incident share a single search. Entries
+    are dropped when vectors for a service they could match are written.
+    """
+
+    def __init__(self, ttl_seconds: float = 300, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved_ms = 0.0
+
+    def key(self, query: str, metadata_filter: Optional[Dict], k: int, settings: Dict) -> str:
+        return json.dumps([normalize_message(query), metadata_filter, k, settings], sort_keys=True, default=str)
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Return cached results for `key`, counting the hit or miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry["created_at"] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.latency_saved_ms += entry["latency_ms"]
+            return [dict(result) for result in entry["results"]]
+
+    def put(self, key: str, results: List[Dict], metadata_filter: Optional[Dict], latency_ms: float) -> None:
+        """Cache results along with how long they took to compute."""
+        with self._lock:
+            self._entries[key] = {
+                "results": [dict(result) for result in results],
+                "services": filter_services(metadata_filter),
+                "latency_ms": latency_ms,
+                "created_at": time.monotonic(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, services: Optional[Set[str]] = None) -> None:
+        """Drop entries that could include results from `services` (all entries if None)."""
+        with self._lock:
+            if services is None:
+                self._entries.clear()
+                return
+            for key in [key for key, entry in self._entries.items()
+                        if entry["services"] is None or entry["services"] & services]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, float]:
+        """Hit ratio and total search latency avoided since this process started."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "latency_saved_ms": self.latency_saved_ms,
+            "entries": len(self._entries),
+        }
@@ -0,0 +1,81 @@
+# src/tools/single_flight.py
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from src.tools.error_signature import error_fingerprint
+
+
+def incident_signature(code: Optional[str], message: Optional[str], service: Optional[str]) -> str:
+    """
+    Coalescing key of an incoming error: its code, normalized message and service.
+
+    Trace ids, timestamps and other volatile values are ignored, so every alert
+    of one error during a storm maps to the same key.
+    """
+    return error_fingerprint({"error_code": code, "message": message, "service": service})
+
+
+class SingleFlight:
+    """
+    Async single-flight with a short-lived result cache.
+
+    The first caller for a key starts the work; concurrent callers with the same
+    key await that one task instead of starting their own. A successful result
+    is then served to later callers for `ttl_seconds`. Failures are shared with
+    the callers already waiting but never cached. The shared task is shielded,
+    so a caller that gives up (timeout, disconnect) does not cancel it for the others.
+    """
+
+    def __init__(self, ttl_seconds: float = 300, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._results: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
+        self.started = 0
+        self.joined = 0
+        self.cache_hits = 0
+
+    async def run(self, key: str, work: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the result for `key`, running `work()` only if no equal call is in flight or cached."""
+        cached = self._results.get(key)
+        if cached is not None:
+            created_at, result = cached
+            if time.monotonic() - created_at <= self.ttl_seconds:
+                self._results.move_to_end(key)
+                self.cache_hits += 1
+                return result
+            del self._results[key]
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self.started += 1
+            task = asyncio.ensure_future(work())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done, key=key: self._finish(key, done))
+        else:
+            self.joined += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Future) -> None:
+        self._in_flight.pop(key, None)
+        if task.cancelled() or task.exception() is not None or self.ttl_seconds <= 0:
+            return
+        self._results[key] = (time.monotonic(), task.result())
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """How many requests ran, joined an in-flight run, or were served from the result cache."""
+        total = self.started + self.joined + self.cache_hits
+        return {
+            "started": self.started,
+            "joined": self.joined,
+            "cache_hits": self.cache_hits,
+            "coalesced_ratio": (self.joined + self.cache_hits) / total if total else 0.0,
+            "in_flight": len(self._in_flight),
+            "cached": len(self._results),
+        }
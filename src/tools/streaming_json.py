@@ -0,0 +1,154 @@
+# src/tools/streaming_json.py
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# Fields of ErrorAnalysisOutput whose list items are emitted one by one
+LIST_FIELDS = ("possible_causes", "recommendations")
+
+
+class AnalysisStreamParser:
+    """
+    Incremental parser for the analysis JSON object the LLM writes.
+
+    Fed the completion chunk by chunk, it tracks just enough JSON structure
+    (containers, keys, strings) to report the top-level "analysis" string and
+    each "possible_causes" / "recommendations" item the moment its closing quote
+    arrives. Anything before the first "{" (prose, code fences) is skipped.
+
+    `result()` then returns the parsed object, repairing truncated or invalid
+    JSON by closing open strings and containers, or falling back to the values
+    already seen, so a broken completion still yields structured fields.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {"analysis": None, "possible_causes": [], "recommendations": []}
+        self._buffer: List[str] = []
+        self._stack: List[Dict[str, Any]] = []  # {"type": "object"|"array", "key": ..., "parent_key": ..., "expect_key": ...}
+        self._started = False
+        self._done = False
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []
+        self._string_is_key = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """Consume a chunk and return the (field, text) values it completed."""
+        events = []
+        for char in chunk:
+            if self._done:
+                break
+            if not self._started:
+                if char != "{":
+                    continue
+                self._started = True
+            self._buffer.append(char)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    self._string.append(char)
+                elif char == "\\":
+                    self._escape = True
+                    self._string.append(char)
+                elif char == '"':
+                    self._in_string = False
+                    events.extend(self._end_string(_decode("".join(self._string))))
+                else:
+                    self._string.append(char)
+                continue
+
+            top = self._stack[-1] if self._stack else None
+            if char == '"':
+                self._in_string = True
+                self._string = []
+                self._string_is_key = bool(top and top["type"] == "object" and top["expect_key"])
+            elif char in "{[":
+                parent_key = top["key"] if top and top["type"] == "object" else None
+                self._stack.append({"type": "object" if char == "{" else "array", "key": None,
+                                    "parent_key": parent_key, "expect_key": char == "{"})
+            elif char in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if not self._stack:
+                    self._done = True
+            elif char == ":" and top and top["type"] == "object":
+                top["expect_key"] = False
+            elif char == "," and top and top["type"] == "object":
+                top["expect_key"] = True
+                top["key"] = None
+        return events
+
+    def _end_string(self, value: str) -> List[Tuple[str, str]]:
+        top = self._stack[-1] if self._stack else None
+        if top is None:
+            return []
+        if self._string_is_key:
+            top["key"] = value
+            return []
+        if len(self._stack) == 1 and top["type"] == "object" and top["key"] == "analysis":
+            self.fields["analysis"] = value
+            return [("analysis", value)]
+        if len(self._stack) == 2 and top["type"] == "array" and top["parent_key"] in LIST_FIELDS:
+            self.fields[top["parent_key"]].append(value)
+            return [(top["parent_key"], value)]
+        return []
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """
+        The analysis object: parsed as-is, repaired, or rebuilt from the values seen.
+
+        Returns None when the completion held no recognisable analysis at all.
+        """
+        text = "".join(self._buffer)
+        for candidate in (text, self._repaired(text)):
+            try:
+                parsed = json.loads(candidate)
+            except (json.JSONDecodeError, TypeError):
+                continue
+            if isinstance(parsed, dict):
+                return parsed
+
+        recovered = dict(self.fields)
+        if recovered["analysis"] is None and self._in_string and not self._string_is_key \
+                and len(self._stack) == 1 and self._stack[0]["key"] == "analysis":
+            recovered["analysis"] = _decode("".join(self._string))  # Cut off mid-sentence
+        if recovered["analysis"] is None and not any(recovered[field] for field in LIST_FIELDS):
+            return None
+        recovered["analysis"] = recovered["analysis"] or ""
+        return recovered
+
+    def _repaired(self, text: str) -> str:
+        """Close an open string and all open containers, dropping a dangling separator or key."""
+        if not self._started:
+            return text
+        repaired = text
+        if self._in_string:
+            if self._string_is_key:
+                repaired = repaired[:repaired.rfind('"')]  # Drop the half-written key
+            else:
+                repaired += "\\" if self._escape else ""
+                repaired += '"'
+        repaired = repaired.rstrip()
+        if repaired.endswith(","):
+            repaired = repaired[:-1]
+        elif repaired.endswith(":"):
+            repaired += " null"
+        for frame in reversed(self._stack):
+            repaired += "}" if frame["type"] == "object" else "]"
+        return repaired
+
+
+def parse_analysis_json(content: str) -> Optional[Dict[str, Any]]:
+    """Parse (and if needed repair) a complete or truncated analysis completion."""
+    parser = AnalysisStreamParser()
+    parser.feed(content)
+    return parser.result()
+
+
+def _decode(raw: str) -> str:
+    """Decode JSON string escapes, keeping the raw text if they are malformed."""
+    try:
+        return json.loads(f'"{raw}"')
+    except json.JSONDecodeError:
+        return raw
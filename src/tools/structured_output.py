@@ -0,0 +1,86 @@
+# src/tools/structured_output.py
+
+import json
+import threading
+from typing import Any, Dict, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from src.tools.streaming_json import parse_analysis_json
+
+
+def output_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    JSON schema for constrained decoding of `model`.
+
+    Every field is marked required (the pydantic schema leaves defaulted fields
+    optional, which would let a constrained model emit `{}`) and examples are
+    dropped, since they only inflate the grammar.
+    """
+    schema = model.model_json_schema()
+    schema.pop("examples", None)
+    schema["required"] = list(schema.get("properties", {}))
+    return schema
+
+
+def validate_output(content: str, model: Type[BaseModel]) -> Tuple[Optional[BaseModel], Optional[str]]:
+    """
+    Schema-validated fast path: (output, None) when `content` is a complete, valid
+    object, otherwise (None, reason) with the reason fed back to a repair prompt.
+    """
+    try:
+        parsed = json.loads(content)
+    except (json.JSONDecodeError, TypeError) as e:
+        return None, f"Invalid JSON: {e}"
+    if not isinstance(parsed, dict):
+        return None, f"Expected a JSON object, got {type(parsed).__name__}"
+    missing = [field for field in output_schema(model)["required"] if field not in parsed]
+    if missing:
+        return None, f"Missing required fields: {', '.join(missing)}"
+    try:
+        return model(**parsed), None
+    except ValidationError as e:
+        return None, str(e)
+
+
+def repair_output(content: str, model: Type[BaseModel]) -> Optional[BaseModel]:
+    """Local repair without another LLM call: close truncated JSON or recover the completed fields."""
+    repaired = parse_analysis_json(content)
+    if repaired is None:
+        return None
+    try:
+        return model(**repaired)
+    except (TypeError, ValidationError):
+        return None
+
+
+class ParseStats:
+    """
+    How analyses were turned into structured output.
+
+    Each parse ends as "valid" (passed the schema first time), "repaired"
+    (fixed locally), "llm_repaired" (fixed by a repair prompt) or "failed" (raw
+    text fallback). The parse-failure rate is the share that were not valid on
+    the first pass.
+    """
+
+    OUTCOMES = ("valid", "repaired", "llm_repaired", "failed")
+
+    def __init__(self):
+        self.counts = dict.fromkeys(self.OUTCOMES, 0)
+        self._lock = threading.Lock()
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Outcome counters since this process started."""
+        with self._lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        return {
+            **counts,
+            "parse_failure_rate": (total - counts["valid"]) / total if total else 0.0,
+            "unstructured_rate": counts["failed"] / total if total else 0.0,
+        }
@@ -1,15 +1,31 @@
 # src/tools/tool_selection.py
 
+import hashlib
+import json
+import os
+import threading
 from typing import List
-from langchain_ollama import ChatOllama
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, Optional
+
+from src.config import local_state_config
+from src.tools.lazy import lazy_singleton
+
+# The LLM, prompt and chain are built on first use (importing langchain is slow),
+# and are not needed at all while the rule-based router decides
+LLM_MODEL = "llama3.2"
+
+@lazy_singleton
+def get_llm():
+    from langchain_ollama import ChatOllama
+    return ChatOllama(model=LLM_MODEL, temperature=0)
 
-# Initialize the LLM
-llm = ChatOllama(model="llama3.2", temperature=0)
+# Tools the LLM can pick from, and the workflow tool each one enables
+AVAILABLE_TOOLS = {
+    "vector_store_search": ("For historical error data and resolutions.", "vector_store"),
+    "datadog_fetch": ("For real-time logs and traces.", "datadog"),
+    "retrieve_knowledge": ("For fetching relevant API documentation.", "api_docs"),
+}
 
 # Define the prompt template for tool selection
 
@@ -19,27 +35,37 @@ class ToolSelectionOutput(BaseModel):
     tools: List[str]
 
 # Define the Pydantic output parser
-output_parser = PydanticOutputParser(pydantic_object=ToolSelectionOutput)
+@lazy_singleton
+def get_output_parser():
+    from langchain_core.output_parsers import PydanticOutputParser
+    return PydanticOutputParser(pydantic_object=ToolSelectionOutput)
 
-prompt_template = PromptTemplate(
-    
-    template=(
-        "You are an AI assistant that selects the appropriate tools based on user queries.\n\n"
-        "Task Description:\n{task_description}\n\n"
-        "Available Tools:\n"
-        "1. vector_store_search: For historical error data and resolutions.\n"
-        "2. datadog_fetch: For real-time logs and traces.\n"
-        "3. retrieve_knowledge: For fetching relevant API documentation.\n\n"
-        "Determine which tools are necessary to address the user's query and provide a structured output with only "
-        "the tool names in a list."
-        "{format_instructions}\n"
-    ),
-    input_variables=["task_description"],
-    partial_variables={"format_instructions": output_parser.get_format_instructions()}
-)
+@lazy_singleton
+def get_prompt_template():
+    from langchain_core.prompts import PromptTemplate
+    return PromptTemplate(
+        template=(
+            "You are an AI assistant that selects the appropriate tools based on user queries.\n\n"
+            "Task Description:\n{task_description}\n\n"
+            "Available Tools:\n"
+            "{available_tools}\n\n"
+            "Determine which tools are necessary to address the user's query and provide a structured output with only "
+            "the tool names in a list."
+            "{format_instructions}\n"
+        ),
+        input_variables=["task_description"],
+        partial_variables={
+            "format_instructions": get_output_parser().get_format_instructions(),
+            "available_tools": "\n".join(
+                f"{i}. {name}: {description}" for i, (name, (description, _)) in enumerate(AVAILABLE_TOOLS.items(), 1)
+            ),
+        }
+    )
 
 # Create the LLMChain for tool selection with the Pydantic output parser
-tool_selection_chain = prompt_template | llm | output_parser
+@lazy_singleton
+def get_tool_selection_chain():
+    return get_prompt_template() | get_llm() | get_output_parser()
 
 
 def select_tools(task_description: str) -> List[str]:
@@ -53,15 +79,122 @@ def select_tools(task_description: str) -> List[str]:
         List[str]: A list of selected tools to address the query.
     """
     # Run the tool selection chain
-    tool_selection_response = tool_selection_chain.invoke({"task_description": task_description})
+    tool_selection_response = get_tool_selection_chain().invoke({"task_description": task_description})
     
     # Parse the response to extract selected tools
-    selected_tools = []
-    if "vector_store_search" in tool_selection_response.tools:
-        selected_tools.append("vector_store")
-    if "datadog_fetch" in tool_selection_response.tools:
-        selected_tools.append("datadog")
-    if "retrieve_knowledge" in tool_selection_response.tools:
-        selected_tools.append("api_docs")
-
-    return selected_tools
+    return _workflow_tools(tool_selection_response)
+
+
+async def aselect_tools(task_description: str) -> List[str]:
+    """Async variant of `select_tools` using `ainvoke` on the selection chain."""
+    tool_selection_response = await get_tool_selection_chain().ainvoke({"task_description": task_description})
+    return _workflow_tools(tool_selection_response)
+
+
+def _workflow_tools(tool_selection_response: ToolSelectionOutput) -> List[str]:
+    """Map the tool names chosen by the LLM to the workflow tools they enable."""
+    return [workflow_tool for name, (_, workflow_tool) in AVAILABLE_TOOLS.items()
+            if name in tool_selection_response.tools]
+
+
+class ToolRouter:
+    """
+    Decides which tools a workflow run needs without an LLM call whenever possible.
+
+    1. Rule-based fast path: when the incoming error carries a trace id or a
+       service name the choice is deterministic (historical search always, Datadog
+       for traces and services, API docs when the service is known).
+    2. Otherwise the LLM decision for the task description is memoized, keyed by
+       the description, the tool set and the model, and persisted across runs.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(local_state_config.state_dir, "tool_routes.json")
+        self._lock = threading.Lock()
+        self._routes: Dict[str, List[str]] = self._load()
+
+    def route(self,
+              task_description: str,
+              trace_id: Optional[str] = None,
+              service: Optional[str] = None) -> List[str]:
+        """Return the workflow tools to use for a task and the fields known about the error."""
+        tools = self._rule_route(trace_id, service)
+        if tools is not None:
+            return tools
+
+        key = self._key(task_description)
+        with self._lock:
+            if key in self._routes:
+                return list(self._routes[key])
+
+        return self._remember(key, select_tools(task_description))
+
+    async def aroute(self,
+                     task_description: str,
+                     trace_id: Optional[str] = None,
+                     service: Optional[str] = None) -> List[str]:
+        """Async variant of `route`; only a memo miss awaits the LLM."""
+        tools = self._rule_route(trace_id, service)
+        if tools is not None:
+            return tools
+
+        key = self._key(task_description)
+        with self._lock:
+            if key in self._routes:
+                return list(self._routes[key])
+
+        return self._remember(key, await aselect_tools(task_description))
+
+    def _rule_route(self, trace_id: Optional[str], service: Optional[str]) -> Optional[List[str]]:
+        """Deterministic choice when the error identifies its trace or service, else None."""
+        if trace_id or service:
+            tools = ["vector_store", "datadog"]
+            if service:
+                tools.append("api_docs")
+            return tools
+        return None
+
+    def _remember(self, key: str, tools: List[str]) -> List[str]:
+        with self._lock:
+            self._routes[key] = tools
+            self._persist()
+        return list(tools)
+
+    def _key(self, task_description: str) -> str:
+        tool_set = json.dumps(AVAILABLE_TOOLS, sort_keys=True)
+        return hashlib.sha256(f"{LLM_MODEL}\0{tool_set}\0{task_description.strip()}".encode("utf-8")).hexdigest()
+
+    def _load(self) -> Dict[str, List[str]]:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _persist(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._routes, f)
+        os.replace(tmp_path, self.path)
+
+
+@lazy_singleton
+def get_tool_router() -> ToolRouter:
+    return ToolRouter()
+
+
+# Names that used to be module-level singletons, still importable but built when accessed
+_LAZY_ATTRIBUTES = {
+    "llm": get_llm,
+    "output_parser": get_output_parser,
+    "prompt_template": get_prompt_template,
+    "tool_selection_chain": get_tool_selection_chain,
+    "tool_router": get_tool_router,
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
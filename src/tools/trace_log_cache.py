@@ -0,0 +1,173 @@
+# src/tools/trace_log_cache.py
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from src.config import trace_log_cache_config
+from src.models.error_analysis_state import LogData
+from src.tools.ingest_state import parse_log_timestamp
+
+Window = Tuple[datetime, datetime]
+
+
+class TraceLogEntry(BaseModel):
+    """Cached logs of one trace and the time range they were fetched for."""
+    trace_id: str
+    logs: List[LogData] = Field(default_factory=list)
+    covered_from: datetime
+    covered_to: datetime
+    fetched_at: float = Field(description="time.time() of the last Datadog query for this trace")
+
+
+class TraceLogCache:
+    """
+    Bounded cache of Datadog logs per trace id.
+
+    Each entry remembers the time range its logs cover. Within `refresh_seconds`
+    of the last fetch a trace is served entirely from the cache; after that only
+    the uncovered ranges (usually the minutes since the last fetch) are queried
+    and merged in. A refresh starts `lag_seconds` before the end of the covered
+    range, since Datadog indexes logs with a delay and a trace fetched right
+    after its error would otherwise miss logs that arrive later. Entries expire `ttl_seconds` after their last fetch and are
+    evicted least-recently-used beyond `max_entries`. With a `path`, entries are
+    also kept in SQLite so they survive restarts.
+    """
+
+    def __init__(self,
+                 refresh_seconds: float = trace_log_cache_config.refresh_seconds,
+                 ttl_seconds: float = trace_log_cache_config.ttl_seconds,
+                 lag_seconds: float = trace_log_cache_config.lag_seconds,
+                 max_entries: int = trace_log_cache_config.max_entries,
+                 path: Optional[str] = None):
+        self.refresh_seconds = refresh_seconds
+        self.ttl_seconds = ttl_seconds
+        self.lag = timedelta(seconds=lag_seconds)
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.refreshes = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, TraceLogEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            with self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS trace_logs "
+                    "(trace_id TEXT PRIMARY KEY, entry TEXT NOT NULL, last_used REAL NOT NULL)"
+                )
+
+    def get(self, trace_id: str) -> Optional[TraceLogEntry]:
+        """The live entry of a trace (from memory, else disk), or None if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(trace_id)
+            if entry is None and self._conn is not None:
+                row = self._conn.execute("SELECT entry FROM trace_logs WHERE trace_id = ?", (trace_id,)).fetchone()
+                entry = TraceLogEntry.model_validate_json(row[0]) if row else None
+            if entry is None:
+                return None
+            if time.time() - entry.fetched_at > self.ttl_seconds:
+                self._drop(trace_id)
+                return None
+            self._remember(entry, persist=False)
+            return entry
+
+    def missing_windows(self, entry: Optional[TraceLogEntry], start: datetime, end: datetime) -> List[Window]:
+        """Time ranges that still have to be queried to answer [start, end] for a trace."""
+        if entry is None:
+            windows = [(start, end)]
+        else:
+            windows = []
+            if start < entry.covered_from:
+                windows.append((start, entry.covered_from))
+            if end > entry.covered_to and time.time() - entry.fetched_at > self.refresh_seconds:
+                windows.append((max(entry.covered_to - self.lag, entry.covered_from), end))
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            elif windows:
+                self.refreshes += 1
+            else:
+                self.hits += 1
+        return windows
+
+    def merge(self, trace_id: str, entry: Optional[TraceLogEntry], logs: List[LogData],
+              windows: List[Window]) -> TraceLogEntry:
+        """Fold the logs fetched for `windows` (from `missing_windows`) into a trace's entry and store it."""
+        merged: Dict[str, LogData] = {}
+        for log in (entry.logs if entry else []) + logs:
+            merged.setdefault(log.model_dump_json(), log)  # Window edges can return a log twice
+
+        covered_from = min([start for start, _ in windows] + ([entry.covered_from] if entry else []))
+        covered_to = max([end for _, end in windows] + ([entry.covered_to] if entry else []))
+        refreshed = entry is None or covered_to > entry.covered_to
+        updated = TraceLogEntry(
+            trace_id=trace_id,
+            logs=sorted(merged.values(), key=lambda log: parse_log_timestamp(log) or datetime.min),
+            covered_from=covered_from,
+            covered_to=covered_to,
+            fetched_at=time.time() if refreshed else entry.fetched_at,
+        )
+        with self._lock:
+            self._remember(updated, persist=True)
+        return updated
+
+    def select(self, entry: TraceLogEntry, start: datetime, end: datetime) -> List[LogData]:
+        """Logs of an entry inside [start, end]; logs without a parseable timestamp are always kept."""
+        selected = []
+        for log in entry.logs:
+            timestamp = parse_log_timestamp(log)
+            if timestamp is None or start <= timestamp <= end:
+                selected.append(log)
+        return selected
+
+    def stats(self) -> Dict[str, float]:
+        """Requests served from the cache, by a delta query, or by a full query since this process started."""
+        total = self.hits + self.refreshes + self.misses
+        return {
+            "hits": self.hits,
+            "refreshes": self.refreshes,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+        }
+
+    def _remember(self, entry: TraceLogEntry, persist: bool) -> None:
+        self._entries[entry.trace_id] = entry
+        self._entries.move_to_end(entry.trace_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        if self._conn is None:
+            return
+        with self._conn:
+            if persist:
+                self._conn.execute("INSERT OR REPLACE INTO trace_logs VALUES (?, ?, ?)",
+                                   (entry.trace_id, entry.model_dump_json(), time.time()))
+            else:
+                self._conn.execute("UPDATE trace_logs SET last_used = ? WHERE trace_id = ?",
+                                   (time.time(), entry.trace_id))
+            count = self._conn.execute("SELECT COUNT(*) FROM trace_logs").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM trace_logs WHERE trace_id IN "
+                    "(SELECT trace_id FROM trace_logs ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+
+    def _drop(self, trace_id: str) -> None:
+        self._entries.pop(trace_id, None)
+        if self._conn is not None:
+            with self._conn:
+                self._conn.execute("DELETE FROM trace_logs WHERE trace_id = ?", (trace_id,))
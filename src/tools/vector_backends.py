@@ -0,0 +1,439 @@
+# src/tools/vector_backends.py
+
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+def metadata_matches(metadata: Dict, filter: Optional[Dict]) -> bool:
+    """Evaluate a Pinecone-style metadata filter against a single metadata dict."""
+    if not filter:
+        return True
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(metadata_matches(metadata, sub_filter) for sub_filter in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(metadata_matches(metadata, sub_filter) for sub_filter in condition):
+                return False
+            continue
+
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for operator, expected in condition.items():
+            if operator == "$eq":
+                matched = value == expected
+            elif operator == "$ne":
+                matched = value != expected
+            elif operator == "$in":
+                matched = value in expected
+            elif operator == "$nin":
+                matched = value not in expected
+            else:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+            if not matched:
+                return False
+    return True
+
+
+class VectorBackend(ABC):
+    """
+    Storage interface behind VectorStore.
+
+    Vectors are addressed by chunk id and carry a flat metadata dict. Filters use
+    the Pinecone metadata filter syntax ({"field": value}, $eq, $ne, $in, $nin,
+    $and, $or), so VectorStore behaves the same whichever backend is configured.
+    """
+
+    @abstractmethod
+    def upsert(self, vectors: List[Tuple[str, List[float], Dict]]) -> None:
+        """Insert or overwrite (id, values, metadata) tuples."""
+
+    @abstractmethod
+    def fetch(self, ids: List[str]) -> Dict[str, List[float]]:
+        """Return stored vector values by id; unknown ids are omitted."""
+
+    @abstractmethod
+    def query(self, vector: List[float], k: int, filter: Optional[Dict] = None) -> List[Tuple[Dict, float]]:
+        """Return the k nearest (metadata, score) pairs, best first."""
+
+    @abstractmethod
+    def update_metadata(self, filter: Dict, metadata: Dict) -> None:
+        """Merge `metadata` into every vector matching `filter`."""
+
+    @abstractmethod
+    def update_ids(self, ids: List[str], metadata: Dict) -> None:
+        """Merge `metadata` into the vectors with the given ids, leaving their values untouched."""
+
+    @abstractmethod
+    def delete(self, ids: List[str]) -> None:
+        """Delete vectors by id."""
+
+    @abstractmethod
+    def iter_metadata(self, batch_size: int = 100) -> Iterator[List[Tuple[str, Dict]]]:
+        """Yield every stored (id, metadata) pair, a batch at a time."""
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Group many writes; a backend may defer persisting them until the block exits."""
+        yield
+
+
+class PineconeBackend(VectorBackend):
+    """
+    Remote Pinecone index.
+
+    Pinecone updates the metadata of one id per request, so `update_ids` sends
+    the requests of a batch concurrently on a pool of `update_workers` threads
+    shared by every caller.
+    """
+
+    def __init__(self, index, update_workers: int = 16):
+        self.index = index
+        self.update_workers = update_workers
+        self._update_pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def upsert(self, vectors: List[Tuple[str, List[float], Dict]]) -> None:
+        self.index.upsert(vectors=vectors)
+
+    def fetch(self, ids: List[str], batch_size: int = 100) -> Dict[str, List[float]]:
+        vectors = {}
+        for start in range(0, len(ids), batch_size):
+            response = self.index.fetch(ids=ids[start:start + batch_size])
+            for vector_id, vector in response.vectors.items():
+                vectors[vector_id] = list(vector.values)
+        return vectors
+
+    def query(self, vector: List[float], k: int, filter: Optional[Dict] = None) -> List[Tuple[Dict, float]]:
+        response = self.index.query(vector=vector, top_k=k, filter=filter or None, include_metadata=True)
+        return [(dict(match.metadata or {}), match.score) for match in response.matches]
+
+    def update_metadata(self, filter: Dict, metadata: Dict) -> None:
+        # Note: This is a simplified version. In production, you'd want to use
+        # Pinecone's update operations to modify the metadata while preserving
+        # the vectors and other metadata fields.
+        self.index.update(filter=filter, metadata=metadata)
+
+    def update_ids(self, ids: List[str], metadata: Dict) -> None:
+        if len(ids) <= 1 or self.update_workers <= 1:
+            for vector_id in ids:
+                self.index.update(id=vector_id, set_metadata=metadata)
+            return
+        futures = [self._updates().submit(self.index.update, id=vector_id, set_metadata=metadata) for vector_id in ids]
+        # Wait for every request before reporting a failure, so a retry never overlaps them
+        errors = [error for error in (future.exception() for future in futures) if error is not None]
+        if errors:
+            raise errors[0]
+
+    def delete(self, ids: List[str]) -> None:
+        self.index.delete(ids=ids)
+
+    def _updates(self) -> ThreadPoolExecutor:
+        if self._update_pool is None:
+            with self._pool_lock:
+                if self._update_pool is None:
+                    self._update_pool = ThreadPoolExecutor(max_workers=self.update_workers,
+                                                           thread_name_prefix="pinecone-update")
+        return self._update_pool
+
+    def iter_metadata(self, batch_size: int = 100) -> Iterator[List[Tuple[str, Dict]]]:
+        # list() pages through the ids of a serverless index
+        for ids in self.index.list(limit=batch_size):
+            response = self.index.fetch(ids=list(ids))
+            yield [(vector_id, dict(vector.metadata or {})) for vector_id, vector in response.vectors.items()]
+
+
+class LocalBackend(VectorBackend):
+    """
+    In-process index for offline use and CI.
+
+    Embeddings are L2-normalized float32 rows in a memory-mapped .npy matrix, so
+    cosine similarity is a single matrix-vector product. Metadata is kept
+    columnar (one list per field, aligned with the rows) and persisted as a JSON
+    snapshot plus an append-only journal of the rows each write changed, so a
+    write costs what it touched rather than a rewrite of the whole index. The
+    journal is folded into the snapshot once it holds more rows than the index
+    (and at least `compact_rows`). Deleted rows are tombstoned and reused by
+    later upserts.
+    """
+
+    def __init__(self, path: str, initial_capacity: int = 1024, compact_rows: int = 10_000):
+        self.path = path
+        self.initial_capacity = initial_capacity
+        self.compact_rows = compact_rows
+        self._matrix_path = os.path.join(path, "vectors.npy")
+        self._meta_path = os.path.join(path, "metadata.json")
+        self._journal_path = os.path.join(path, "metadata.journal")
+        self._lock = threading.RLock()
+
+        self.ids: List[Optional[str]] = []
+        self.columns: Dict[str, List[Any]] = {}
+        self._rows: Dict[str, int] = {}
+        self._free_rows: List[int] = []
+        self._matrix: Optional[np.memmap] = None
+        self._column_arrays: Dict[str, np.ndarray] = {}  # Vectorized views of columns, rebuilt after writes
+        self._deferred = 0  # Open batch() blocks; metadata is written to disk when the last one exits
+        self._pending: List[Dict] = []  # Journal entries not yet written
+        self._journal_rows = 0  # Rows recorded in the journal since the last snapshot
+
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    def upsert(self, vectors: List[Tuple[str, List[float], Dict]]) -> None:
+        if not vectors:
+            return
+        with self._lock:
+            values = self._normalize(np.asarray([v for _, v, _ in vectors], dtype=np.float32))
+            self._ensure_capacity(len(self.ids) + len(vectors), values.shape[1])
+
+            for (vector_id, _, metadata), row_values in zip(vectors, values):
+                row = self._rows.get(vector_id)
+                if row is None:
+                    row = self._free_rows.pop() if self._free_rows else self._append_row()
+                    self._rows[vector_id] = row
+                    self.ids[row] = vector_id
+                self._matrix[row] = row_values
+                self._set_metadata(row, metadata)
+                self._pending.append({"op": "set", "rows": [row], "id": vector_id, "metadata": metadata})
+
+            self._persist()
+
+    def fetch(self, ids: List[str]) -> Dict[str, List[float]]:
+        with self._lock:
+            return {vector_id: self._matrix[self._rows[vector_id]].tolist()
+                    for vector_id in ids if vector_id in self._rows}
+
+    def query(self, vector: List[float], k: int, filter: Optional[Dict] = None) -> List[Tuple[Dict, float]]:
+        with self._lock:
+            if not self._rows:
+                return []
+            n = len(self.ids)
+            query = self._normalize(np.asarray([vector], dtype=np.float32))[0]
+            scores = self._matrix[:n] @ query
+
+            mask = self._filter_mask(filter)
+            candidates = np.flatnonzero(mask)
+            if candidates.size == 0:
+                return []
+            candidate_scores = scores[candidates]
+            k = min(k, candidates.size)
+            top = np.argpartition(-candidate_scores, k - 1)[:k]
+            top = top[np.argsort(-candidate_scores[top])]
+            return [(self._metadata(int(candidates[i])), float(candidate_scores[i])) for i in top]
+
+    def update_metadata(self, filter: Dict, metadata: Dict) -> None:
+        with self._lock:
+            self._update_rows([int(row) for row in np.flatnonzero(self._filter_mask(filter))], metadata)
+            self._persist()
+
+    def update_ids(self, ids: List[str], metadata: Dict) -> None:
+        with self._lock:
+            self._update_rows([self._rows[vector_id] for vector_id in ids if vector_id in self._rows], metadata)
+            self._persist()
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            rows = [self._rows.pop(vector_id) for vector_id in ids if vector_id in self._rows]
+            for row in rows:
+                self._clear_row(row)
+                self._matrix[row] = 0.0
+                self._free_rows.append(row)
+            if rows:
+                self._pending.append({"op": "delete", "rows": rows})
+            self._persist()
+
+    def iter_metadata(self, batch_size: int = 100) -> Iterator[List[Tuple[str, Dict]]]:
+        with self._lock:
+            entries = [(vector_id, self._metadata(row)) for vector_id, row in self._rows.items()]
+        for start in range(0, len(entries), batch_size):
+            yield entries[start:start + batch_size]
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        with self._lock:
+            self._deferred += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._deferred -= 1
+                self._persist()
+
+    def _filter_mask(self, filter: Optional[Dict]) -> np.ndarray:
+        """Boolean mask over rows of live vectors matching a Pinecone-style filter."""
+        n = len(self.ids)
+        mask = self._column_array("__id__") != None  # noqa: E711 - elementwise comparison
+        if filter:
+            mask &= self._match(filter, n)
+        return mask
+
+    def _match(self, filter: Dict, n: int) -> np.ndarray:
+        mask = np.ones(n, dtype=bool)
+        for key, condition in filter.items():
+            if key == "$and":
+                for sub_filter in condition:
+                    mask &= self._match(sub_filter, n)
+                continue
+            if key == "$or":
+                any_mask = np.zeros(n, dtype=bool)
+                for sub_filter in condition:
+                    any_mask |= self._match(sub_filter, n)
+                mask &= any_mask
+                continue
+
+            column = self._column_array(key)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for operator, expected in condition.items():
+                if operator == "$eq":
+                    mask &= column == expected
+                elif operator == "$ne":
+                    mask &= column != expected
+                elif operator == "$in":
+                    mask &= self._in_set(column, expected)
+                elif operator == "$nin":
+                    mask &= ~self._in_set(column, expected)
+                else:
+                    raise ValueError(f"Unsupported filter operator: {operator}")
+        return mask
+
+    def _in_set(self, column: np.ndarray, expected) -> np.ndarray:
+        expected = set(expected)
+        return np.frompyfunc(lambda value: value in expected, 1, 1)(column).astype(bool)
+
+    def _column_array(self, key: str) -> np.ndarray:
+        """Object array view of a metadata column (or of the ids for "__id__"), cached until the next write."""
+        if key not in self._column_arrays:
+            values = self.ids if key == "__id__" else self.columns.get(key, [None] * len(self.ids))
+            array = np.empty(len(values), dtype=object)
+            array[:] = values
+            self._column_arrays[key] = array
+        return self._column_arrays[key]
+
+    def _update_rows(self, rows: List[int], metadata: Dict) -> None:
+        for row in rows:
+            for key, value in metadata.items():
+                self._column(key)[row] = value
+        if rows:
+            self._pending.append({"op": "update", "rows": rows, "metadata": metadata})
+
+    def _clear_row(self, row: int) -> None:
+        self.ids[row] = None
+        for column in self.columns.values():
+            column[row] = None
+
+    def _metadata(self, row: int) -> Dict:
+        return {key: column[row] for key, column in self.columns.items() if column[row] is not None}
+
+    def _set_metadata(self, row: int, metadata: Dict) -> None:
+        for key, column in self.columns.items():
+            column[row] = metadata.get(key)
+        for key, value in metadata.items():
+            self._column(key)[row] = value
+
+    def _column(self, key: str) -> List[Any]:
+        if key not in self.columns:
+            self.columns[key] = [None] * len(self.ids)
+        return self.columns[key]
+
+    def _append_row(self) -> int:
+        self.ids.append(None)
+        for column in self.columns.values():
+            column.append(None)
+        return len(self.ids) - 1
+
+    def _ensure_capacity(self, rows: int, dimension: int) -> None:
+        """Create or grow the memory-mapped matrix (doubling) to hold `rows` rows."""
+        if self._matrix is not None:
+            if self._matrix.shape[1] != dimension:
+                raise ValueError(f"Vector dimension {dimension} does not match index dimension {self._matrix.shape[1]}")
+            if rows <= self._matrix.shape[0]:
+                return
+
+        capacity = self._matrix.shape[0] if self._matrix is not None else self.initial_capacity
+        while capacity < rows:
+            capacity *= 2
+
+        tmp_path = f"{self._matrix_path}.tmp"
+        grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(capacity, dimension))
+        if self._matrix is not None:
+            grown[:self._matrix.shape[0]] = self._matrix
+            del self._matrix
+        grown.flush()
+        del grown
+        os.replace(tmp_path, self._matrix_path)
+        self._matrix = np.load(self._matrix_path, mmap_mode="r+")
+
+    def _normalize(self, values: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(values, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return values / norms
+
+    def _load(self) -> None:
+        if os.path.exists(self._matrix_path):
+            self._matrix = np.load(self._matrix_path, mmap_mode="r+")
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r") as f:
+                stored = json.load(f)
+            self.ids = stored["ids"]
+            self.columns = stored["columns"]
+        self._replay_journal()
+        self._rows = {vector_id: row for row, vector_id in enumerate(self.ids) if vector_id is not None}
+        self._free_rows = [row for row, vector_id in enumerate(self.ids) if vector_id is None]
+
+    def _replay_journal(self) -> None:
+        """Apply the journal written since the last snapshot; a torn last line from a crash is ignored."""
+        if not os.path.exists(self._journal_path):
+            return
+        with open(self._journal_path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                for row in entry["rows"]:
+                    while row >= len(self.ids):
+                        self._append_row()
+                    if entry["op"] == "set":
+                        self.ids[row] = entry["id"]
+                        self._set_metadata(row, entry["metadata"])
+                    elif entry["op"] == "update":
+                        for key, value in entry["metadata"].items():
+                            self._column(key)[row] = value
+                    else:
+                        self._clear_row(row)
+                self._journal_rows += len(entry["rows"])
+
+    def _persist(self) -> None:
+        self._column_arrays.clear()
+        if self._deferred:
+            return
+        if self._matrix is not None:
+            self._matrix.flush()
+        if self._pending:
+            with open(self._journal_path, "a") as f:
+                f.write("".join(json.dumps(entry) + "\n" for entry in self._pending))
+            self._journal_rows += sum(len(entry["rows"]) for entry in self._pending)
+            self._pending = []
+        if self._journal_rows > max(len(self.ids), self.compact_rows):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Write a full metadata snapshot and start an empty journal."""
+        tmp_path = f"{self._meta_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"ids": self.ids, "columns": self.columns}, f)
+        os.replace(tmp_path, self._meta_path)
+        # Replaying a journal over the snapshot it was folded into gives the same state,
+        # so a crash between these two steps loses nothing
+        open(self._journal_path, "w").close()
+        self._journal_rows = 0
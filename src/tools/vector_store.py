@@ -1,41 +1,134 @@
 import os
-from typing import Dict, List, Optional, Union
-import pinecone
-from langchain_ollama import OllamaEmbeddings
-from langchain_pinecone import PineconeVectorStore, PineconeEmbeddings
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pydantic import BaseModel, Field
 import hashlib
 import json
+import time
 
-from src.config import pinecone_config
+from src.config import (embedding_cache_config, hybrid_search_config, ingest_pipeline_config,
+                        local_state_config, get_pinecone_config, query_cache_config, vector_store_config)
 from src.models.error_analysis_state import LogData
+from src.tools.dedup_index import DedupIndex, hash_chunk_text
+from src.tools.embedding_cache import CachedEmbeddings
+from src.tools.error_signature import error_fingerprint
+from src.tools.keyword_index import KeywordIndex
+from src.tools.lazy import lazy_singleton
+from src.tools.log_batch import LogBatch
+from src.tools.query_cache import QueryCache
+from src.tools.vector_backends import LocalBackend, PineconeBackend, VectorBackend
+
+
+class StoreSummary(BaseModel):
+    """Outcome and throughput of a store_vectors run."""
+    logs_received: int = 0
+    logs_skipped: int = Field(default=0, description="Logs already stored, skipped by dedup")
+    occurrences_merged: int = Field(default=0, description="Logs folded into an existing fingerprint's counts")
+    logs_stored: int = Field(default=0, description="Logs whose every chunk was written")
+    chunks_stored: int = 0
+    chunks_failed: int = 0
+    failed_vector_ids: List[str] = Field(
+        default_factory=list,
+        description="Vector ids not (fully) written, or whose occurrence update failed; safe to store again"
+    )
+    failed_logs: List[int] = Field(default_factory=list, description="Positions in the input of the logs of failed_vector_ids")
+    texts_embedded: int = Field(default=0, description="Distinct chunk texts resolved to vectors")
+    failed_batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks_stored / self.seconds if self.seconds else 0.0
+
+
+class ResolutionSummary(BaseModel):
+    """Per-id outcomes and throughput of an update_resolutions run."""
+    outcomes: Dict[str, str] = Field(
+        default_factory=dict,
+        description="vector_id -> updated, not_found (no chunks in the local id index) or failed"
+    )
+    errors: Dict[str, str] = Field(default_factory=dict, description="vector_id -> error of its failed batch")
+    chunks_updated: int = 0
+    failed_batches: int = 0
+    seconds: float = 0.0
+
+    def count(self, outcome: str) -> int:
+        return sum(1 for value in self.outcomes.values() if value == outcome)
 
 
 class VectorStore:
-    def __init__(self, index_name: str = "datadoglogs"):
-        # Initialize Pinecone client
-        # Initialize Pinecone client and create index if needed
-        pinecone_client = pinecone.Pinecone(
-            api_key=pinecone_config.api_key,
-            # environment=pinecone_config.environment,
-            host=pinecone_config.host,
-        )
-
-        self.pc_index = pinecone_client.Index(index_name, host=pinecone_config.host)
-        
-        # if index_name not in [index.name for index in pinecone_client.list_indexes()]:
-        #     pinecone_client.create_index(
-        #         name=index_name,
-        #         dimension=4096,  # Ollama's llama embedding dimension
-        #         metric="cosine"
-        #     )
-        
-        # Initialize embeddings and vector store
-        self.embeddings = PineconeEmbeddings(model="multilingual-e5-large")
-        self.vectorstore = PineconeVectorStore(index=self.pc_index, embedding=self.embeddings)
+    def __init__(self,
+                 index_name: str = "datadoglogs",
+                 config=vector_store_config,
+                 state_dir: str = local_state_config.state_dir):
+        if config.backend == "local":
+            self.backend: VectorBackend = LocalBackend(config.local_path)
+        elif config.backend == "pinecone":
+            import pinecone
+            pinecone_config = get_pinecone_config()
+            # Initialize Pinecone client
+            # Initialize Pinecone client and create index if needed
+            pinecone_client = pinecone.Pinecone(
+                api_key=pinecone_config.api_key,
+                # environment=pinecone_config.environment,
+                host=pinecone_config.host,
+            )
+
+            self.pc_index = pinecone_client.Index(index_name, host=pinecone_config.host)
+            
+            # if index_name not in [index.name for index in pinecone_client.list_indexes()]:
+            #     pinecone_client.create_index(
+            #         name=index_name,
+            #         dimension=4096,  # Ollama's llama embedding dimension
+            #         metric="cosine"
+            #     )
+            self.backend = PineconeBackend(self.pc_index, update_workers=ingest_pipeline_config.update_workers)
+        else:
+            raise ValueError(f"Unknown vector backend: {config.backend}")
+        
+        # Initialize embeddings (behind the local embedding cache)
+        if config.embedding_provider == "ollama":
+            from langchain_ollama import OllamaEmbeddings
+            self.embeddings = OllamaEmbeddings(model=config.embedding_model)
+        else:
+            from langchain_pinecone import PineconeEmbeddings
+            self.embeddings = PineconeEmbeddings(model=config.embedding_model)
+        if embedding_cache_config.enabled:
+            self.embeddings = CachedEmbeddings(self.embeddings, model_name=config.embedding_model)
+
+        self.fingerprinting = config.fingerprinting
+
+        # Local record of stored logs and embedded chunk texts, used to skip re-embedding.
+        # Kept per backend and index so switching backends never skips unstored logs.
+        self.dedup_index = DedupIndex(os.path.join(
+            state_dir, f"dedup_index_{config.backend}_{index_name}.sqlite"
+        ))
+
+        # BM25 index over the same chunks, fused with dense results in hybrid_search
+        self.keyword_index = KeywordIndex(os.path.join(
+            state_dir, f"keyword_index_{config.backend}_{index_name}.sqlite"
+        ))
+
+        # Repeated searches for the same error signature are served from memory
+        self.query_cache: Optional[QueryCache] = None
+        if query_cache_config.enabled:
+            self.query_cache = QueryCache(ttl_seconds=query_cache_config.ttl_seconds,
+                                          max_entries=query_cache_config.max_entries)
 
     def _generate_vector_id(self, log: Dict) -> str:
-        """Generate a unique, deterministic ID for a log entry."""
+        """
+        Generate a unique, deterministic ID for a log entry.
+
+        With fingerprinting enabled every occurrence of the same error (same
+        normalized message and stack frames) shares one ID and one vector.
+        """
+        if self.fingerprinting:
+            return error_fingerprint(log)
+        return self._occurrence_id(log)
+
+    def _occurrence_id(self, log: Dict) -> str:
+        """Identity of one occurrence of an error (one log line), stable across re-ingests."""
         # Create a unique identifier using relevant fields
         unique_fields = {
             'trace_id': log.get('trace_id'),
@@ -101,15 +194,53 @@ class VectorStore:
         
         return chunks
 
-    def store_vectors(self, logs: List[LogData]) -> None:
-        """Store log vectors in Pinecone with proper chunking and metadata."""
-        texts = []
-        metadatas = []
-        ids = []
+    def store_vectors(self,
+                      logs: Union[List[LogData], LogBatch],
+                      embed_batch_size: int = ingest_pipeline_config.embed_batch_size,
+                      upsert_batch_size: int = ingest_pipeline_config.upsert_batch_size,
+                      embed_workers: int = ingest_pipeline_config.embed_workers,
+                      upsert_workers: int = ingest_pipeline_config.upsert_workers,
+                      max_retries: int = ingest_pipeline_config.max_retries) -> StoreSummary:
+        """
+        Store log vectors in Pinecone with proper chunking and metadata.
+
+        Embedding is deduplicated before any remote call:
+        - Logs whose vector id was already stored (in this batch or a previous run) are skipped;
+          with fingerprinting their occurrence count, first/last seen and hosts are
+          updated on the existing vector as a metadata-only write. Occurrences are
+          counted once per trace id and timestamp, and only after the write succeeded,
+          so re-ingesting the same logs never inflates the counts
+        - Each distinct chunk text is embedded at most once per batch
+        - Chunk texts embedded in a previous run reuse the stored vector instead of re-embedding
+
+        Ingest is pipelined: chunk texts are embedded in batches on one worker pool
+        while earlier batches are upserted on another. Each batch is retried on its
+        own, so a failure only loses that batch; the returned summary reports what
+        was stored, which logs failed (`failed_logs`, positions in `logs`, so a
+        checkpointing caller can hold back for them) and the throughput in chunks/sec.
+
+        `logs` may be a columnar LogBatch, whose rows are read as plain dicts
+        without building a LogData per log; each log is converted to a dict once.
+        """
+        started = time.perf_counter()
+        summary = StoreSummary(logs_received=len(logs))
+        records = []  # (chunk_id, text_hash, text, metadata)
+        chunk_counts: Dict[str, int] = {}
+        seen_vector_ids = set()
+        
+        rows = logs.rows() if isinstance(logs, LogBatch) else (log.dict() for log in logs)
+        prepared = [(self._generate_vector_id(log), log) for log in rows]
+        already_stored = self.dedup_index.known_logs(vector_id for vector_id, _ in prepared)
+        # Totals are only previewed here and merged into the index once their vectors are written
+        occurrence_batch = self._occurrence_batch(prepared) if self.fingerprinting else {}
+        occurrences = self._occurrence_metadata(occurrence_batch, commit=False)
         
-        for log in logs:
-            vector_id_base = self._generate_vector_id(log.dict())
-            chunks = self._prepare_chunks(log.dict())
+        for vector_id_base, log in prepared:
+            if vector_id_base in seen_vector_ids or vector_id_base in already_stored:
+                summary.logs_skipped += 1
+                continue
+            seen_vector_ids.add(vector_id_base)
+            chunks = self._prepare_chunks(log)
             
             for i, chunk in enumerate(chunks):
                 # Create a unique ID for each chunk
@@ -117,77 +248,461 @@ class VectorStore:
                 
                 # Prepare metadata with searchable fields and resolution tracking
                 metadata = {
+                    'text': chunk['text'],
                     'vector_id': vector_id_base,
                     'chunk_id': chunk_id,
                     'chunk_type': chunk['chunk_type'],
-                    'trace_id': log.trace_id,
-                    'service': log.service,
-                    'error_type': log.error_type,
-                    'error_code': log.error_code,
-                    'timestamp': log.timestamp,
+                    'trace_id': log['trace_id'],
+                    'service': log['service'],
+                    'error_type': log['error_type'],
+                    'error_code': log['error_code'],
+                    'timestamp': log['timestamp'],
                     'resolution_status': 'pending',  # Can be: pending, in_progress, resolved
                     'resolution_notes': '',
                     'resolution_timestamp': '',
                     'stored_at': datetime.utcnow().isoformat()
                 }
+                metadata.update(occurrences.get(vector_id_base, {}))
                 
-                texts.append(chunk['text'])
-                metadatas.append(metadata)
-                ids.append(chunk_id)
+                records.append((chunk_id, hash_chunk_text(chunk['text']), chunk['text'], metadata))
+            chunk_counts[vector_id_base] = len(chunks)
+        
+        # Fingerprints that already have a vector only get their counts refreshed, never re-embedded
+        existing = {vector_id: occurrence for vector_id, occurrence in occurrences.items() if vector_id in already_stored}
+        counted = set()
+        failed_vector_ids = set()
+        if existing:
+            summary.occurrences_merged = sum(1 for vector_id, _ in prepared if vector_id in existing)
+            updated = self._update_occurrences(existing)
+            counted |= updated
+            failed_vector_ids |= existing.keys() - updated
+        
+        if records:
+            with self.backend.batch():
+                stored_ids = self._run_pipeline(records, summary, embed_batch_size, upsert_batch_size,
+                                                embed_workers, upsert_workers, max_retries)
+            
+            # Only record logs whose every chunk made it into the index
+            failed_chunks = {metadata['vector_id'] for chunk_id, _, _, metadata in records if chunk_id not in stored_ids}
+            failed_vector_ids |= failed_chunks
+            canonical_chunks = {}
+            for chunk_id, text_hash, _, _ in records:
+                if chunk_id in stored_ids:
+                    canonical_chunks.setdefault(text_hash, chunk_id)
+            self.dedup_index.record(
+                [(vector_id, count) for vector_id, count in chunk_counts.items() if vector_id not in failed_vector_ids],
+                list(canonical_chunks.items())
+            )
+            counted |= set(chunk_counts) - failed_vector_ids
+            summary.logs_stored = len(set(chunk_counts) - failed_vector_ids)
+            self.keyword_index.add(
+                (chunk_id, text, metadata) for chunk_id, _, text, metadata in records if chunk_id in stored_ids
+            )
+            if self.query_cache and stored_ids:
+                self.query_cache.invalidate({metadata['service'] for _, _, _, metadata in records})
+        
+        if counted & occurrence_batch.keys():
+            self._occurrence_metadata({vector_id: occurrence_batch[vector_id]
+                                       for vector_id in counted & occurrence_batch.keys()})
         
-        # Add texts and metadata to Pinecone
-        self.vectorstore.add_texts(
-            texts=texts,
-            metadatas=metadatas,
-            ids=ids
-        )
+        summary.failed_vector_ids = sorted(failed_vector_ids)
+        summary.failed_logs = [position for position, (vector_id, _) in enumerate(prepared) if vector_id in failed_vector_ids]
+        
+        summary.seconds = time.perf_counter() - started
+        print(f"Stored {summary.chunks_stored} chunks from {summary.logs_stored} logs "
+              f"({summary.logs_skipped} skipped, {summary.occurrences_merged} merged into existing fingerprints, "
+              f"{len(summary.failed_logs)} failed, {summary.chunks_failed} chunks) "
+              f"in {summary.seconds:.2f}s - {summary.chunks_per_second:.1f} chunks/sec")
+        return summary
+
+    def _occurrence_batch(self, prepared: List[tuple]) -> Dict[str, Dict]:
+        """Aggregate the occurrences of each fingerprint in this batch, keyed by occurrence identity."""
+        batch: Dict[str, Dict] = {}
+        for vector_id, log in prepared:
+            occurrence = batch.setdefault(vector_id, {"keys": set(), "first_seen": "", "last_seen": "", "hosts": set()})
+            occurrence["keys"].add(self._occurrence_id(log))
+            timestamp, host = log['timestamp'], log['host']
+            if timestamp and timestamp != "None":
+                occurrence["first_seen"] = min(filter(None, [occurrence["first_seen"], timestamp]))
+                occurrence["last_seen"] = max(occurrence["last_seen"], timestamp)
+            if host and host not in ("unknown", "None"):
+                occurrence["hosts"].add(host)
+        return batch
+
+    def _occurrence_metadata(self, batch: Dict[str, Dict], commit: bool = True) -> Dict[str, Dict]:
+        """Fold occurrences into the stored totals and return them as vector metadata."""
+        if not batch:
+            return {}
+        merged = self.dedup_index.merge_occurrences(batch, commit=commit)
+        return {
+            vector_id: {
+                'occurrence_count': occurrence['count'],
+                'first_seen': occurrence['first_seen'],
+                'last_seen': occurrence['last_seen'],
+                'hosts': occurrence['hosts'],
+            }
+            for vector_id, occurrence in merged.items()
+        }
+
+    def _update_occurrences(self, occurrences: Dict[str, Dict]) -> set:
+        """Write refreshed occurrence metadata to every chunk of already stored fingerprints; return those updated."""
+        chunk_counts = self.dedup_index.chunk_counts(occurrences.keys())
+        services = set()
+        updated = set()
+        with self.backend.batch():
+            for vector_id, metadata in occurrences.items():
+                chunk_ids = [f"{vector_id}_{i}" for i in range(chunk_counts.get(vector_id, 0))]
+                try:
+                    self.backend.update_ids(chunk_ids, metadata)
+                except Exception as e:
+                    print(f"Error updating occurrence counts for {vector_id}: {e}")
+                    continue
+                updated.add(vector_id)
+                services |= self.keyword_index.update_metadata(vector_id, metadata)
+        if self.query_cache and services:
+            self.query_cache.invalidate(services)
+        return updated
+
+    def _run_pipeline(self,
+                      records: List[tuple],
+                      summary: StoreSummary,
+                      embed_batch_size: int,
+                      upsert_batch_size: int,
+                      embed_workers: int,
+                      upsert_workers: int,
+                      max_retries: int) -> set:
+        """Embed and upsert records in overlapping batches; return the chunk ids stored."""
+        # Partition records so each distinct text is embedded in the first batch that needs it.
+        # A batch's records then only depend on vectors from that batch or earlier ones.
+        batches = []  # (texts_by_hash, records)
+        assigned = set()
+        texts_by_hash: Dict[str, str] = {}
+        batch_records = []
+        for record in records:
+            _, text_hash, text, _ = record
+            if text_hash not in assigned:
+                if len(texts_by_hash) >= embed_batch_size:
+                    batches.append((texts_by_hash, batch_records))
+                    texts_by_hash, batch_records = {}, []
+                assigned.add(text_hash)
+                texts_by_hash[text_hash] = text
+            batch_records.append(record)
+        batches.append((texts_by_hash, batch_records))
+        
+        vectors_by_hash: Dict[str, List[float]] = {}
+        stored_ids = set()
+        
+        with ThreadPoolExecutor(max_workers=embed_workers) as embed_pool, \
+                ThreadPoolExecutor(max_workers=upsert_workers) as upsert_pool:
+            embed_futures = [
+                embed_pool.submit(self._with_retry, self._resolve_embeddings, max_retries, batch_texts)
+                for batch_texts, _ in batches
+            ]
+            upsert_futures = []
+            
+            # Consume embeddings in order; later batches keep embedding while these upload
+            for (batch_texts, batch_records), embed_future in zip(batches, embed_futures):
+                try:
+                    vectors_by_hash.update(embed_future.result())
+                    summary.texts_embedded += len(batch_texts)
+                except Exception as e:
+                    print(f"Embedding batch failed after {max_retries} attempts: {e}")
+                    summary.failed_batches += 1
+                
+                ready = [record for record in batch_records if record[1] in vectors_by_hash]
+                summary.chunks_failed += len(batch_records) - len(ready)
+                for start in range(0, len(ready), upsert_batch_size):
+                    upsert_batch = [
+                        (chunk_id, vectors_by_hash[text_hash], metadata)
+                        for chunk_id, text_hash, _, metadata in ready[start:start + upsert_batch_size]
+                    ]
+                    future = upsert_pool.submit(self._with_retry, self._upsert, max_retries, upsert_batch)
+                    upsert_futures.append((upsert_batch, future))
+            
+            for upsert_batch, future in upsert_futures:
+                try:
+                    future.result()
+                    stored_ids.update(chunk_id for chunk_id, _, _ in upsert_batch)
+                    summary.chunks_stored += len(upsert_batch)
+                except Exception as e:
+                    print(f"Upsert batch failed after {max_retries} attempts: {e}")
+                    summary.failed_batches += 1
+                    summary.chunks_failed += len(upsert_batch)
+        
+        return stored_ids
+
+    def _upsert(self, vectors: List[tuple]) -> None:
+        """Upsert (id, values, metadata) tuples to the configured backend."""
+        self.backend.upsert(vectors)
+
+    def _with_retry(self, fn: Callable, max_retries: int, *args):
+        """Call fn(*args), retrying with exponential backoff up to max_retries attempts (at least one)."""
+        max_retries = max(max_retries, 1)
+        for attempt in range(1, max_retries + 1):
+            try:
+                return fn(*args)
+            except Exception as e:
+                if attempt == max_retries:
+                    raise
+                delay = 0.5 * 2 ** (attempt - 1)
+                print(f"{fn.__name__} failed (attempt {attempt}/{max_retries}), retrying in {delay:.1f}s: {e}")
+                time.sleep(delay)
+
+    def _resolve_embeddings(self, texts_by_hash: Dict[str, str]) -> Dict[str, List[float]]:
+        """
+        Embed each distinct chunk text once.
+
+        Vectors come from the local embedding cache first, then from chunks already
+        stored in the backend, and only the remaining texts hit the embedding model.
+        """
+        vectors_by_hash: Dict[str, List[float]] = {}
+        cached = isinstance(self.embeddings, CachedEmbeddings)
+        
+        if cached:
+            hashes = list(texts_by_hash)
+            for text_hash, vector in zip(hashes, self.embeddings.lookup([texts_by_hash[h] for h in hashes])):
+                if vector is not None:
+                    vectors_by_hash[text_hash] = vector
+        
+        remaining = [text_hash for text_hash in texts_by_hash if text_hash not in vectors_by_hash]
+        known_chunks = self.dedup_index.known_chunks(remaining)
+        if known_chunks:
+            fetched = self._fetch_vectors(list(set(known_chunks.values())))
+            reused = {text_hash: fetched[chunk_id] for text_hash, chunk_id in known_chunks.items() if chunk_id in fetched}
+            vectors_by_hash.update(reused)
+            if cached and reused:
+                self.embeddings.store([texts_by_hash[h] for h in reused], list(reused.values()))
+        
+        missing = [text_hash for text_hash in texts_by_hash if text_hash not in vectors_by_hash]
+        if missing:
+            texts = [texts_by_hash[text_hash] for text_hash in missing]
+            embeddings = self.embeddings.embed_uncached(texts) if cached else self.embeddings.embed_documents(texts)
+            vectors_by_hash.update(zip(missing, embeddings))
+        
+        return vectors_by_hash
+
+    def _fetch_vectors(self, ids: List[str]) -> Dict[str, List[float]]:
+        """Fetch stored vector values by chunk id; ids no longer in the index are omitted."""
+        try:
+            return self.backend.fetch(ids)
+        except Exception as e:
+            print(f"Error fetching stored vectors, re-embedding instead: {e}")
+            return {}
 
     def hybrid_search(self, 
                      query: str, 
                      metadata_filter: Optional[Dict] = None,
-                     k: int = 5) -> List[Dict]:
+                     k: int = 5,
+                     config=hybrid_search_config) -> List[Dict]:
         """
-        Perform hybrid search combining semantic similarity with metadata filtering.
+        Perform hybrid search combining semantic similarity, BM25 keyword matching
+        and metadata filtering.
+
+        Dense and keyword candidates are merged with weighted reciprocal rank
+        fusion, so exact tokens like error codes, class names and file paths from
+        stack traces rank well even when their embeddings are not close. The
+        keyword index only covers chunks written by store_vectors; vectors stored
+        before it existed are added by `src.scripts.backfill_keyword_index`.
         
         Args:
             query: The search query for semantic similarity
             metadata_filter: Dictionary of metadata fields to filter on
             k: Number of results to return
         """
-        filter = {}
-        if metadata_filter:
-            filter = metadata_filter
-            
-        results = self.vectorstore.similarity_search(
-            query=query,
+        if self.query_cache is None:
+            return self._search(query, metadata_filter, k, config)
+        
+        cache_key = self.query_cache.key(query, metadata_filter, k, config.model_dump())
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        started = time.perf_counter()
+        results = self._search(query, metadata_filter, k, config)
+        self.query_cache.put(cache_key, results, metadata_filter, (time.perf_counter() - started) * 1000)
+        return results
+
+    def _search(self, query: str, metadata_filter: Optional[Dict], k: int, config) -> List[Dict]:
+        """Run the dense and keyword retrievers and fuse their results; a retriever with weight 0 is skipped."""
+        dense_enabled = not config.keyword_enabled or config.dense_weight > 0
+        keyword_enabled = config.keyword_enabled and config.keyword_weight > 0
+        fused = dense_enabled and keyword_enabled
+        candidates = k * config.candidate_multiplier if fused else k
+        
+        dense_results = []
+        if dense_enabled:
+            dense_results = self.backend.query(
+                vector=self.embeddings.embed_query(query),
+                k=candidates,
+                filter=metadata_filter or None
+            )
+        if not keyword_enabled:
+            return [self._strip_text(metadata) for metadata, _ in dense_results]
+        
+        keyword_results = self.keyword_index.search(query, k=candidates, filter=metadata_filter or None)
+        if not fused:
+            return [self._strip_text(metadata) for metadata, _ in keyword_results]
+        return [self._strip_text(metadata) for metadata in self._fuse(
+            [(dense_results, config.dense_weight), (keyword_results, config.keyword_weight)],
             k=k,
-            filter=filter
-        )
-        return [doc.metadata for doc in results]
+            rrf_k=config.rrf_k
+        )]
+
+    def _fuse(self, ranked_lists: List[tuple], k: int, rrf_k: int) -> List[Dict]:
+        """Weighted reciprocal rank fusion of (results, weight) lists keyed by chunk id."""
+        scores: Dict[str, float] = {}
+        metadata_by_id: Dict[str, Dict] = {}
+        for results, weight in ranked_lists:
+            if weight <= 0:
+                continue  # A zero-weight list would only pad the top k with unscored candidates
+            for rank, (metadata, _) in enumerate(results):
+                chunk_id = metadata.get('chunk_id')
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + weight / (rrf_k + rank + 1)
+                metadata_by_id.setdefault(chunk_id, metadata)
+        ranked = sorted(scores, key=scores.get, reverse=True)[:k]
+        return [metadata_by_id[chunk_id] for chunk_id in ranked]
+
+    def backfill_keyword_index(self, batch_size: int = 100) -> int:
+        """
+        Add every chunk already in the vector backend to the keyword index.
+
+        The keyword index is only fed by store_vectors, so chunks stored before
+        hybrid search existed (or in another checkout) are not keyword-searchable
+        until backfilled. Re-running is safe: chunks are replaced, not duplicated.
+
+        Returns:
+            int: Number of chunks indexed
+        """
+        indexed = 0
+        for entries in self.backend.iter_metadata(batch_size=batch_size):
+            documents = [(chunk_id, metadata['text'], metadata) for chunk_id, metadata in entries if metadata.get('text')]
+            self.keyword_index.add(documents)
+            indexed += len(documents)
+        if self.query_cache:
+            self.query_cache.invalidate()
+        return indexed
+
+    def _strip_text(self, metadata: Dict) -> Dict:
+        """Drop the stored chunk text so callers only see the searchable metadata."""
+        return {key: value for key, value in metadata.items() if key != 'text'}
 
     def update_resolution(self, 
                          vector_id: str, 
                          resolution_status: str,
                          resolution_notes: str) -> None:
-        """Update the resolution status and notes for all chunks of a log entry."""
-        filter = {"vector_id": vector_id}
+        """
+        Update the resolution status and notes for all chunks of a log entry.
+
+        Entries missing from the local id index (stored before it existed) fall
+        back to a metadata filter update on the backend.
+        """
+        summary = self.update_resolutions([(vector_id, resolution_status, resolution_notes)])
+        if summary.outcomes[vector_id] != "not_found":
+            return
+
         update = {
             "resolution_status": resolution_status,
             "resolution_notes": resolution_notes,
             "resolution_timestamp": datetime.utcnow().isoformat()
         }
-        
-        # Note: This is a simplified version. In production, you'd want to use
-        # Pinecone's update operations to modify the metadata while preserving
-        # the vectors and other metadata fields.
-        self.vectorstore._index.update(
-            filter=filter,
-            metadata=update
-        )
+        self.backend.update_metadata({"vector_id": vector_id}, update)
+        services = self.keyword_index.update_metadata(vector_id, update)
+        if self.query_cache:
+            self.query_cache.invalidate(services or None)
+
+    def update_resolutions(self,
+                           updates: Iterable[Tuple[str, str, str]],
+                           batch_size: int = ingest_pipeline_config.upsert_batch_size,
+                           workers: int = ingest_pipeline_config.upsert_workers,
+                           max_retries: int = ingest_pipeline_config.max_retries) -> ResolutionSummary:
+        """
+        Set the resolution of many log entries at once, e.g. every fingerprint of a closed incident.
+
+        `updates` are (vector_id, resolution_status, resolution_notes); a later
+        entry for the same id wins. Each vector id is resolved to its chunk ids
+        (`{vector_id}_{i}`) through the local id index, so no remote filter scan
+        is needed. Entries sharing a status and notes are sent as metadata-only
+        updates of up to `batch_size` chunks, on `workers` threads, each batch
+        retried on its own. Nothing is re-embedded or re-upserted.
+
+        Returns per-id outcomes: updated, not_found (unknown to the local id
+        index) or failed (its batch failed after `max_retries` attempts).
+        """
+        started = time.perf_counter()
+        summary = ResolutionSummary()
+        resolutions = {vector_id: (status, notes) for vector_id, status, notes in updates}
+        chunk_counts = self.dedup_index.chunk_counts(resolutions)
+        resolution_timestamp = datetime.utcnow().isoformat()
+
+        # Group by resolution so every batch carries one metadata dict; a vector's chunks stay in one batch
+        batches = []  # (vector_ids, chunk_ids, metadata)
+        groups: Dict[Tuple[str, str], List[str]] = {}
+        for vector_id, resolution in resolutions.items():
+            if chunk_counts.get(vector_id):
+                groups.setdefault(resolution, []).append(vector_id)
+            else:
+                summary.outcomes[vector_id] = "not_found"
+        for (status, notes), vector_ids in groups.items():
+            metadata = {
+                "resolution_status": status,
+                "resolution_notes": notes,
+                "resolution_timestamp": resolution_timestamp
+            }
+            batch_vector_ids, batch_chunk_ids = [], []
+            for vector_id in vector_ids:
+                if batch_chunk_ids and len(batch_chunk_ids) + chunk_counts[vector_id] > batch_size:
+                    batches.append((batch_vector_ids, batch_chunk_ids, metadata))
+                    batch_vector_ids, batch_chunk_ids = [], []
+                batch_vector_ids.append(vector_id)
+                batch_chunk_ids.extend(f"{vector_id}_{i}" for i in range(chunk_counts[vector_id]))
+            batches.append((batch_vector_ids, batch_chunk_ids, metadata))
+
+        updated: Dict[str, Dict] = {}
+        with self.backend.batch(), ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                (vector_ids, chunk_ids, metadata,
+                 pool.submit(self._with_retry, self.backend.update_ids, max_retries, chunk_ids, metadata))
+                for vector_ids, chunk_ids, metadata in batches
+            ]
+            for vector_ids, chunk_ids, metadata, future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Resolution update batch failed after {max_retries} attempts: {e}")
+                    summary.failed_batches += 1
+                    summary.outcomes.update(dict.fromkeys(vector_ids, "failed"))
+                    summary.errors.update(dict.fromkeys(vector_ids, str(e)))
+                    continue
+                summary.chunks_updated += len(chunk_ids)
+                summary.outcomes.update(dict.fromkeys(vector_ids, "updated"))
+                updated.update(dict.fromkeys(vector_ids, metadata))
+
+        if updated:
+            services = self.keyword_index.update_metadata_many(updated)
+            if self.query_cache:
+                self.query_cache.invalidate(services or None)
+
+        summary.seconds = time.perf_counter() - started
+        print(f"Updated the resolution of {summary.count('updated')} log entries ({summary.chunks_updated} chunks, "
+              f"{summary.count('not_found')} not found, {summary.count('failed')} failed) in {summary.seconds:.2f}s")
+        return summary
 
     def delete_vectors(self, ids: List[str]) -> None:
         """Delete vectors by their IDs."""
-        self.vectorstore.delete(ids=ids)
+        self.backend.delete(ids)
+        self.dedup_index.forget(ids)
+        self.keyword_index.delete(ids)
+        if self.query_cache:
+            self.query_cache.invalidate()
+
+# Shared instance, created on first use so importing this module never connects to Pinecone
+@lazy_singleton
+def get_vector_store() -> VectorStore:
+    return VectorStore()
+
 
-# Create a singleton instance
-vector_store = VectorStore()
+def __getattr__(name: str):
+    # `vector_store` stays importable by name but is only built when accessed
+    if name == "vector_store":
+        return get_vector_store()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")